@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app_google.services.calendar_jobs import processar_pendentes
+
+
+class Command(BaseCommand):
+    help = 'Processa a fila de operações no Google Calendar (criação, remarcação e cancelamento de reuniões)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Processa um único lote e encerra')
+        parser.add_argument('--batch', type=int, default=20, help='Jobs reivindicados por lote (padrão: 20)')
+        parser.add_argument('--sleep', type=float, default=2.0, help='Espera (s) quando a fila está vazia (padrão: 2)')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Processando jobs do Google Calendar...')
+        while True:
+            processados = processar_pendentes(options['batch'])
+            if processados:
+                self.stdout.write(f'{processados} job(s) processado(s)')
+            if options['once']:
+                break
+            if not processados:
+                time.sleep(options['sleep'])
@@ -13,3 +13,55 @@ class GoogleOAuthToken(models.Model):
 
     class Meta:
         unique_together = ("homologador_id", "email_google")
+
+
+class GoogleCalendarJob(models.Model):
+    """
+    Outbox de operações no Google Calendar dos homologadores.
+
+    As views apenas enfileiram o job; o comando `processar_jobs_google`
+    executa, com novas tentativas e backoff exponencial, e preenche os
+    campos google_* do agendamento ao concluir.
+    """
+    CRIAR = "criar"
+    REMARCAR = "remarcar"
+    CANCELAR = "cancelar"
+    ACAO_CHOICES = [
+        (CRIAR, "Criar evento com Meet"),
+        (REMARCAR, "Remarcar evento"),
+        (CANCELAR, "Cancelar evento"),
+    ]
+
+    PENDENTE = "pendente"
+    EXECUTANDO = "executando"
+    CONCLUIDO = "concluido"
+    FALHOU = "falhou"
+    STATUS_CHOICES = [
+        (PENDENTE, "Pendente"),
+        (EXECUTANDO, "Executando"),
+        (CONCLUIDO, "Concluído"),
+        (FALHOU, "Falhou"),
+    ]
+
+    schedule = models.ForeignKey("core.Schedule", on_delete=models.CASCADE, null=True, blank=True, related_name="google_jobs")
+    # Nulo: agendamento sem homologador, evento criado na conta Google do sistema
+    homologador_id = models.IntegerField(null=True, blank=True)
+    action = models.CharField(max_length=20, choices=ACAO_CHOICES)
+    payload = models.JSONField(default=dict, blank=True)
+    # Usado como id do evento/conferência: repetir o job não duplica a reunião
+    request_id = models.CharField(max_length=64, unique=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDENTE)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=6)
+    next_attempt_at = models.DateTimeField()
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default="")
+    result = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "next_attempt_at"])]
+
+    def __str__(self):
+        return f"{self.action} #{self.pk} ({self.status}) - agendamento {self.schedule_id}"
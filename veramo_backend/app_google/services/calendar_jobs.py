@@ -0,0 +1,364 @@
+# app_google/services/calendar_jobs.py
+"""
+Fila durável (outbox) de operações no Google Calendar.
+
+As views gravam um GoogleCalendarJob na mesma transação do agendamento e
+respondem imediatamente com meeting_status='pendente'. O comando
+`processar_jobs_google` reivindica os jobs vencidos, chama o Google e
+aplica o resultado no Schedule (e no DemissaoProcess, quando informado).
+
+Agendamentos sem homologador (homologador_id nulo) usam a conta Google do
+sistema (GoogleMeetService), também pela fila.
+
+Falhas transitórias (rede, 5xx, 429) são repetidas com backoff
+exponencial; falhas permanentes (Google não conectado, 4xx) encerram o
+job. Para criações, o request_id do job é o id do evento no Google, então
+repetir um job que chegou a ser executado não duplica a reunião.
+"""
+import datetime
+import logging
+import random
+import uuid
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from googleapiclient.errors import HttpError
+
+from app_google.models import GoogleCalendarJob, GoogleOAuthToken
+
+logger = logging.getLogger(__name__)
+
+class ErroPermanente(Exception):
+    """Falha que não adianta repetir"""
+
+
+def _backoff(tentativa):
+    base = getattr(settings, "GOOGLE_JOB_BACKOFF_SECONDS", 30)
+    teto = getattr(settings, "GOOGLE_JOB_BACKOFF_MAX_SECONDS", 3600)
+    espera = min(teto, base * (2 ** (tentativa - 1)))
+    return datetime.timedelta(seconds=espera + random.uniform(0, espera / 10))
+
+
+def google_conectado(homologador_id):
+    """Indica se o homologador tem conta Google conectada (consulta local, sem chamar o Google)"""
+    return GoogleOAuthToken.objects.filter(homologador_id=homologador_id).exclude(refresh_token="").exists()
+
+
+def _local(schedule, horario):
+    return timezone.make_aware(datetime.datetime.combine(schedule.date, horario))
+
+
+def _enfileirar(schedule, action, homologador_id, payload):
+    job = GoogleCalendarJob.objects.create(
+        schedule=schedule,
+        homologador_id=homologador_id,
+        action=action,
+        payload=payload,
+        request_id=uuid.uuid4().hex,
+        next_attempt_at=timezone.now(),
+        max_attempts=getattr(settings, "GOOGLE_JOB_MAX_ATTEMPTS", 6),
+    )
+    if schedule is not None and action != GoogleCalendarJob.CANCELAR:
+        schedule.meeting_status = "pendente"
+        schedule.save(update_fields=["meeting_status"])
+    return job
+
+
+def enfileirar_criacao(schedule, titulo, attendees=(), processo=None, notificar=False,
+                       verificar_disponibilidade=False, status_processo=None):
+    """
+    Enfileira a criação do evento com Meet na agenda do homologador do
+    agendamento. Um job de criação ainda pendente para o mesmo agendamento
+    é reaproveitado.
+    """
+    existente = (GoogleCalendarJob.objects
+                 .filter(schedule=schedule, action=GoogleCalendarJob.CRIAR,
+                         status__in=[GoogleCalendarJob.PENDENTE, GoogleCalendarJob.EXECUTANDO])
+                 .first())
+    if existente:
+        return existente
+    return _enfileirar(schedule, GoogleCalendarJob.CRIAR, schedule.union_user_id, {
+        "titulo": titulo,
+        "attendees": [email for email in attendees if email],
+        "processo_id": getattr(processo, "id", None),
+        "status_processo": status_processo,
+        "notificar": notificar,
+        "verificar_disponibilidade": verificar_disponibilidade,
+    })
+
+
+def enfileirar_remarcacao(schedule, processo=None):
+    """
+    Enfileira a atualização do evento para a data/horário atuais do
+    agendamento. Se o evento ainda não foi criado, a criação pendente já
+    usará o novo horário e nada é enfileirado.
+    """
+    if not schedule.google_calendar_event_id:
+        return (GoogleCalendarJob.objects
+                .filter(schedule=schedule, action=GoogleCalendarJob.CRIAR,
+                        status__in=[GoogleCalendarJob.PENDENTE, GoogleCalendarJob.EXECUTANDO])
+                .first())
+    return _enfileirar(schedule, GoogleCalendarJob.REMARCAR, schedule.union_user_id, {
+        "event_id": schedule.google_calendar_event_id,
+        "processo_id": getattr(processo, "id", None),
+    })
+
+
+def enfileirar_cancelamento(schedule, homologador_id, event_id):
+    """Enfileira a remoção do evento (o agendamento já foi cancelado localmente)"""
+    return _enfileirar(schedule, GoogleCalendarJob.CANCELAR, homologador_id, {"event_id": event_id})
+
+
+def _conta_do_sistema():
+    """GoogleMeetService da conta do sistema, para agendamentos sem homologador"""
+    from core.services.google_meet_service import GoogleMeetService
+
+    servico = GoogleMeetService()
+    if not servico.service:
+        raise ErroPermanente("Conta Google do sistema não configurada")
+    return servico
+
+
+def _criar_na_conta_do_sistema(job, schedule):
+    info = _conta_do_sistema().create_meeting(
+        summary=job.payload.get("titulo") or "Homologação",
+        description=f"Homologação de demissão\nData: {schedule.date:%d/%m/%Y}\n"
+                    f"Horário: {schedule.start_time:%H:%M} - {schedule.end_time:%H:%M}",
+        start_time=datetime.datetime.combine(schedule.date, schedule.start_time),
+        end_time=datetime.datetime.combine(schedule.date, schedule.end_time),
+        attendees=job.payload.get("attendees", []),
+        location="Google Meet",
+    )
+    if not info:
+        raise RuntimeError("Falha ao criar a reunião na conta Google do sistema")
+    return info
+
+
+def _homologadores_com_google(union_id, exceto):
+    """Outros homologadores conectados do sindicato: consultados no mesmo batch de free/busy"""
+    from core.models.user import User
+
+    ids = User.objects.filter(union_id=union_id).exclude(id=exceto).values_list("id", flat=True)
+    return list(GoogleOAuthToken.objects.filter(homologador_id__in=ids).exclude(refresh_token="")
+                .values_list("homologador_id", flat=True).distinct())
+
+
+def _atualizar_processo(job, meet_link):
+    from core.models.demissao_process import DemissaoProcess
+
+    processo_id = job.payload.get("processo_id")
+    if not processo_id or not meet_link:
+        return
+    campos = {"video_link": meet_link}
+    if job.payload.get("status_processo"):
+        campos["status"] = job.payload["status_processo"]
+    DemissaoProcess.objects.filter(id=processo_id).update(**campos)
+
+
+def _executar_criacao(job):
+    from .google_meet_service import criar_meet_para_homologador, verificar_disponibilidade_homologador
+
+    schedule = job.schedule
+    if schedule is None:
+        raise ErroPermanente("Agendamento removido")
+    if schedule.status == "cancelado":
+        # Cancelado antes de a reunião existir: nada a criar
+        return {"descartado": True}
+    inicio = _local(schedule, schedule.start_time)
+    fim = _local(schedule, schedule.end_time)
+
+    if job.homologador_id is None:
+        meet_info = _criar_na_conta_do_sistema(job, schedule)
+    else:
+        if job.payload.get("verificar_disponibilidade") and job.attempts == 1:
+            # Ocupação do dia buscada num só batch para o sindicato: os próximos agendamentos
+            # do mesmo dia são verificados pelo cache
+            outros = _homologadores_com_google(schedule.union_id, job.homologador_id)
+            if not verificar_disponibilidade_homologador(job.homologador_id, inicio, fim, outros):
+                raise ErroPermanente("Homologador ocupado no Google Calendar neste horário")
+
+        meet_info = criar_meet_para_homologador(
+            homologador_id=job.homologador_id,
+            titulo=job.payload.get("titulo") or "Homologação",
+            inicio_local=inicio,
+            fim_local=fim,
+            attendees_emails=job.payload.get("attendees", []),
+            request_id=job.request_id,
+        )
+
+    schedule.google_calendar_event_id = meet_info.get("event_id")
+    schedule.google_meet_conference_id = meet_info.get("conference_id")
+    schedule.google_meet_link = meet_info.get("meet_link")
+    schedule.google_calendar_link = meet_info.get("html_link")
+    schedule.meeting_created_at = timezone.now()
+    schedule.video_link = meet_info.get("meet_link") or schedule.video_link
+    schedule.meeting_status = "criada"
+    schedule.save(update_fields=[
+        "google_calendar_event_id", "google_meet_conference_id", "google_meet_link",
+        "google_calendar_link", "meeting_created_at", "video_link", "meeting_status",
+    ])
+    _atualizar_processo(job, meet_info.get("meet_link"))
+    return meet_info
+
+
+def _executar_remarcacao(job):
+    from .google_meet_service import remarcar_evento_homologador
+
+    schedule = job.schedule
+    event_id = job.payload.get("event_id") or getattr(schedule, "google_calendar_event_id", None)
+    if schedule is None or not event_id:
+        raise ErroPermanente("Agendamento sem evento no Google Calendar")
+    if schedule.status == "cancelado":
+        # O job de cancelamento remove o evento
+        return {"descartado": True}
+
+    # Usa sempre o horário atual do agendamento: remarcações seguidas convergem
+    if job.homologador_id is None:
+        meet_info = _conta_do_sistema().update_meeting(
+            event_id=event_id,
+            start_time=datetime.datetime.combine(schedule.date, schedule.start_time),
+            end_time=datetime.datetime.combine(schedule.date, schedule.end_time),
+        )
+        if not meet_info:
+            raise RuntimeError("Falha ao remarcar a reunião na conta Google do sistema")
+    else:
+        meet_info = remarcar_evento_homologador(
+            homologador_id=job.homologador_id,
+            event_id=event_id,
+            novo_inicio_local=_local(schedule, schedule.start_time),
+            novo_fim_local=_local(schedule, schedule.end_time),
+        )
+    schedule.meeting_status = "criada"
+    campos = ["meeting_status"]
+    if meet_info.get("meet_link"):
+        schedule.video_link = meet_info["meet_link"]
+        schedule.google_meet_link = meet_info["meet_link"]
+        campos += ["video_link", "google_meet_link"]
+    schedule.save(update_fields=campos)
+    _atualizar_processo(job, meet_info.get("meet_link"))
+    return meet_info
+
+
+def _executar_cancelamento(job):
+    from .google_meet_service import cancelar_evento_homologador
+
+    try:
+        cancelar_evento_homologador(job.homologador_id, job.payload["event_id"])
+    except HttpError as e:
+        # Evento já removido: o objetivo do job foi atingido
+        if e.resp.status not in (404, 410):
+            raise
+    return {"event_id": job.payload["event_id"]}
+
+
+EXECUTORES = {
+    GoogleCalendarJob.CRIAR: _executar_criacao,
+    GoogleCalendarJob.REMARCAR: _executar_remarcacao,
+    GoogleCalendarJob.CANCELAR: _executar_cancelamento,
+}
+
+
+def _permanente(erro):
+    if isinstance(erro, (ErroPermanente, PermissionError)):
+        return True
+    if isinstance(erro, HttpError):
+        return 400 <= erro.resp.status < 500 and erro.resp.status not in (408, 429)
+    return False
+
+
+def _notificar(job):
+    """Notificações do agendamento adiadas até a reunião existir (ou falhar de vez)"""
+    schedule = job.schedule
+    if schedule is None or schedule.status == "cancelado":
+        return
+    from core.models.demissao_process import DemissaoProcess
+    from core.services.notification_service import notify_agendamento, notify_homologador_pendente_meet
+
+    processo = DemissaoProcess.objects.filter(id=job.payload.get("processo_id")).first()
+    if job.status == GoogleCalendarJob.FALHOU:
+        notify_homologador_pendente_meet(schedule)
+    if not job.payload.get("notificar"):
+        return
+    if processo is not None:
+        notify_agendamento(schedule=schedule, processo=processo)
+    try:
+        from core.services.email_service import EmailService
+        EmailService().send_agendamento_email(schedule=schedule, processo=processo)
+    except Exception as e:
+        logger.error(f"Erro ao enviar email de agendamento {schedule.id}: {str(e)}")
+
+
+def _finalizar_falha(job, erro):
+    job.status = GoogleCalendarJob.FALHOU
+    job.last_error = str(erro)
+    job.locked_at = None
+    job.save(update_fields=["status", "attempts", "last_error", "locked_at", "updated_at"])
+    if job.schedule is not None and job.action != GoogleCalendarJob.CANCELAR:
+        job.schedule.meeting_status = "falhou"
+        job.schedule.save(update_fields=["meeting_status"])
+    logger.error(f"Job Google {job.pk} ({job.action}) falhou definitivamente: {erro}")
+
+
+def executar(job):
+    """Executa um job já reivindicado e registra o resultado ou agenda nova tentativa"""
+    job.attempts += 1
+    try:
+        resultado = EXECUTORES[job.action](job)
+    except Exception as erro:
+        if _permanente(erro) or job.attempts >= job.max_attempts:
+            _finalizar_falha(job, erro)
+        else:
+            job.status = GoogleCalendarJob.PENDENTE
+            job.last_error = str(erro)
+            job.locked_at = None
+            job.next_attempt_at = timezone.now() + _backoff(job.attempts)
+            job.save(update_fields=["status", "attempts", "last_error", "locked_at", "next_attempt_at", "updated_at"])
+            logger.warning(f"Job Google {job.pk} ({job.action}) falhou (tentativa {job.attempts}): {erro}")
+            return job
+    else:
+        job.status = GoogleCalendarJob.CONCLUIDO
+        job.result = resultado or {}
+        job.last_error = ""
+        job.locked_at = None
+        job.save(update_fields=["status", "attempts", "result", "last_error", "locked_at", "updated_at"])
+
+    if job.action == GoogleCalendarJob.CRIAR:
+        try:
+            _notificar(job)
+        except Exception as e:
+            logger.error(f"Falha ao notificar agendamento do job Google {job.pk}: {e}")
+    return job
+
+
+def reivindicar(limite):
+    """
+    Reivindica até `limite` jobs vencidos. A troca de status é um UPDATE
+    condicional por job, então dois workers nunca executam o mesmo job.
+    Jobs presos em execução (worker morto) voltam para a fila.
+    """
+    agora = timezone.now()
+    expiracao = agora - datetime.timedelta(seconds=getattr(settings, "GOOGLE_JOB_LOCK_TIMEOUT_SECONDS", 600))
+    GoogleCalendarJob.objects.filter(status=GoogleCalendarJob.EXECUTANDO, locked_at__lt=expiracao).update(
+        status=GoogleCalendarJob.PENDENTE, locked_at=None)
+
+    candidatos = list(GoogleCalendarJob.objects
+                      .filter(status=GoogleCalendarJob.PENDENTE, next_attempt_at__lte=agora)
+                      .order_by("next_attempt_at", "id")
+                      .values_list("id", flat=True)[:limite])
+    reivindicados = []
+    for job_id in candidatos:
+        with transaction.atomic():
+            if GoogleCalendarJob.objects.filter(id=job_id, status=GoogleCalendarJob.PENDENTE).update(
+                    status=GoogleCalendarJob.EXECUTANDO, locked_at=agora):
+                reivindicados.append(job_id)
+    return list(GoogleCalendarJob.objects.filter(id__in=reivindicados)
+                .select_related("schedule").order_by("next_attempt_at", "id"))
+
+
+def processar_pendentes(limite=20):
+    """Reivindica e executa um lote de jobs; retorna quantos foram processados"""
+    jobs = reivindicar(limite)
+    for job in jobs:
+        executar(job)
+    return len(jobs)
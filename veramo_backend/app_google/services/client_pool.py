@@ -0,0 +1,157 @@
+# app_google/services/client_pool.py
+"""
+Pool de clientes da API do Google Calendar por homologador.
+
+Cada entrada guarda o service já construído (documento de discovery
+estático, sem rede nem novo parse), as credenciais e o transporte HTTP
+autorizado, cuja conexão TLS é reaproveitada entre chamadas. As credenciais
+são renovadas sob demanda pelo próprio transporte quando expiram.
+
+O httplib2 não é thread-safe, então cada entrada tem um lock e o uso é
+feito com `with pool.cliente(homologador_id) as service:`. O pool é por
+processo (worker do gunicorn); uma reconexão feita em outro worker é
+detectada pelo updated_at do token, conferido a cada uso.
+"""
+import datetime
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import google_auth_httplib2
+import httplib2
+from django.conf import settings
+from django.utils import timezone
+from googleapiclient.discovery import build
+
+from app_google.models import GoogleOAuthToken
+
+
+class _Cliente:
+    def __init__(self, token, creds, http, service):
+        self.token = token
+        self.creds = creds
+        self.http = http
+        self.service = service
+        self.lock = threading.Lock()
+
+    def atual(self, token):
+        return token.pk == self.token.pk and token.updated_at == self.token.updated_at
+
+    def fechar(self):
+        try:
+            self.http.http.close()
+        except Exception:
+            pass
+
+
+class ClientPool:
+    def __init__(self, max_clientes=64, timeout=30):
+        self.max_clientes = max_clientes
+        self.timeout = timeout
+        self._clientes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _token(self, homologador_id):
+        token = (GoogleOAuthToken.objects
+                 .filter(homologador_id=homologador_id)
+                 .order_by("-updated_at")
+                 .first())
+        if not token or not token.refresh_token:
+            raise PermissionError("Homologador sem Google conectado.")
+        return token
+
+    def _tokens(self, homologador_ids):
+        """Token mais recente de cada homologador com Google conectado, em uma consulta"""
+        tokens = {}
+        for token in (GoogleOAuthToken.objects
+                      .filter(homologador_id__in=homologador_ids)
+                      .order_by("homologador_id", "-updated_at")):
+            tokens.setdefault(token.homologador_id, token)
+        return {hid: token for hid, token in tokens.items() if token.refresh_token}
+
+    def _construir(self, token):
+        from .google_meet_service import _build_creds
+
+        creds = _build_creds(token)
+        if token.token_expiry:
+            # google-auth compara a expiração em UTC sem timezone
+            creds.expiry = timezone.make_naive(token.token_expiry, datetime.timezone.utc)
+        http = google_auth_httplib2.AuthorizedHttp(creds, http=httplib2.Http(timeout=self.timeout))
+        service = build("calendar", "v3", http=http, static_discovery=True, cache_discovery=False)
+        return _Cliente(token, creds, http, service)
+
+    def _obter(self, homologador_id, token):
+        with self._lock:
+            cliente = self._clientes.get(homologador_id)
+            if cliente is not None and cliente.atual(token):
+                self._clientes.move_to_end(homologador_id)
+                return cliente
+
+        novo = self._construir(token)
+        with self._lock:
+            anterior = self._clientes.pop(homologador_id, None)
+            self._clientes[homologador_id] = novo
+            while len(self._clientes) > self.max_clientes:
+                _, removido = self._clientes.popitem(last=False)
+                removido.fechar()
+        if anterior is not None:
+            anterior.fechar()
+        return novo
+
+    def _persistir_token(self, cliente):
+        """Salva o access_token renovado pelo transporte durante a chamada"""
+        creds, token = cliente.creds, cliente.token
+        if creds.token and creds.token != token.access_token:
+            token.access_token = creds.token
+            token.token_expiry = (timezone.make_aware(creds.expiry, datetime.timezone.utc)
+                                  if creds.expiry else timezone.now() + datetime.timedelta(seconds=3500))
+            token.save(update_fields=["access_token", "token_expiry", "updated_at"])
+
+    @contextmanager
+    def cliente(self, homologador_id):
+        """
+        Service do Calendar do homologador, com uso exclusivo durante o bloco.
+
+        Raises:
+            PermissionError: Se homologador não tem Google conectado
+        """
+        cliente = self._obter(homologador_id, self._token(homologador_id))
+        with cliente.lock:
+            try:
+                yield cliente.service
+            finally:
+                self._persistir_token(cliente)
+
+    @contextmanager
+    def clientes(self, homologador_ids):
+        """
+        Services de vários homologadores ao mesmo tempo ({id: service}), para
+        chamadas em batch. Homologadores sem Google conectado ficam de fora.
+        """
+        tokens = self._tokens(homologador_ids)
+        obtidos = {homologador_id: self._obter(homologador_id, tokens[homologador_id])
+                   for homologador_id in sorted(tokens)}
+        # Locks adquiridos em ordem de id para não haver deadlock entre threads
+        for cliente in obtidos.values():
+            cliente.lock.acquire()
+        try:
+            yield {homologador_id: cliente.service for homologador_id, cliente in obtidos.items()}
+        finally:
+            for cliente in obtidos.values():
+                try:
+                    self._persistir_token(cliente)
+                finally:
+                    cliente.lock.release()
+
+    def invalidar(self, homologador_id):
+        """Descarta o cliente do homologador (ex.: após reconectar a conta Google)"""
+        with self._lock:
+            cliente = self._clientes.pop(homologador_id, None)
+        if cliente is not None:
+            cliente.fechar()
+
+
+pool = ClientPool(
+    max_clientes=getattr(settings, "GOOGLE_CLIENT_POOL_SIZE", 64),
+    timeout=getattr(settings, "GOOGLE_API_TIMEOUT", 30),
+)
@@ -0,0 +1,128 @@
+# app_google/services/freebusy_service.py
+"""
+Consulta de free/busy do Google Calendar dos homologadores, em lote e com cache.
+
+Cada homologador conecta a própria conta Google, então uma única chamada
+freebusy().query com vários `items` não enxerga as agendas uns dos outros.
+Em vez disso, as consultas de todos os homologadores de um dia são enviadas
+em batches HTTP da API (uma requisição por credencial), de até LIMITE_BATCH
+chamadas cada, o máximo aceito pelo Calendar; a falha de um batch afeta só
+os homologadores dele.
+
+Os intervalos ocupados retornados cobrem o dia inteiro (horário local, em
+minutos desde a meia-noite) e ficam em cache por GOOGLE_FREEBUSY_CACHE_TIMEOUT
+segundos, para que o cálculo de slots e a atribuição automática consultem a
+ocupação sem chamar o Google novamente.
+"""
+import datetime
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from app_google.services.client_pool import pool
+
+logger = logging.getLogger(__name__)
+
+PREFIXO = 'gcal:busy'
+# Máximo de chamadas em um batch HTTP da API do Calendar
+LIMITE_BATCH = 50
+
+
+def _timeout():
+    return getattr(settings, 'GOOGLE_FREEBUSY_CACHE_TIMEOUT', 120)
+
+
+def _chave(homologador_id, dia):
+    return f'{PREFIXO}:{homologador_id}:{dia.isoformat()}'
+
+
+def _limites_dia(dia):
+    inicio = timezone.make_aware(datetime.datetime.combine(dia, datetime.time.min))
+    return inicio, inicio + datetime.timedelta(days=1)
+
+
+def _para_minutos(valor, dia):
+    """Converte um instante RFC3339 do Google em minutos locais do dia (limitado a 0..1440)"""
+    instante = timezone.localtime(datetime.datetime.fromisoformat(valor.replace('Z', '+00:00')))
+    if instante.date() < dia:
+        return 0
+    if instante.date() > dia:
+        return 24 * 60
+    return instante.hour * 60 + instante.minute
+
+
+def ocupacao_em_cache(homologador_ids, dia):
+    """
+    Intervalos ocupados já conhecidos, sem chamar o Google:
+    {homologador_id: [(inicio, fim), ...]} apenas para quem está em cache.
+    """
+    chaves = {_chave(hid, dia): hid for hid in homologador_ids}
+    return {chaves[chave]: valor for chave, valor in cache.get_many(list(chaves)).items()}
+
+
+def consultar_ocupacao(homologador_ids, dia):
+    """
+    Intervalos ocupados no Google Calendar de cada homologador no dia.
+
+    Os que não estão em cache são consultados em batches HTTP de até
+    LIMITE_BATCH homologadores.
+    Homologadores sem Google conectado (ou cuja consulta falhou) ficam fora
+    do resultado.
+    """
+    homologador_ids = list(dict.fromkeys(homologador_ids))
+    resultado = ocupacao_em_cache(homologador_ids, dia)
+    faltantes = [hid for hid in homologador_ids if hid not in resultado]
+    if not faltantes:
+        return resultado
+
+    inicio, fim = _limites_dia(dia)
+    corpo = {
+        'timeMin': inicio.astimezone(datetime.timezone.utc).isoformat(),
+        'timeMax': fim.astimezone(datetime.timezone.utc).isoformat(),
+        'items': [{'id': 'primary'}],
+    }
+
+    novos = {}
+
+    def _callback(request_id, response, exception):
+        homologador_id = int(request_id)
+        if exception is not None:
+            logger.warning(f"Falha no free/busy do homologador {homologador_id}: {exception}")
+            return
+        ocupados = response['calendars']['primary'].get('busy', [])
+        novos[homologador_id] = sorted(
+            (_para_minutos(b['start'], dia), _para_minutos(b['end'], dia)) for b in ocupados
+        )
+
+    # Clientes do pool: cada requisição do batch leva o transporte autorizado do próprio homologador
+    with pool.clientes(faltantes) as services:
+        if not services:
+            return resultado
+        itens = list(services.items())
+        for posicao in range(0, len(itens), LIMITE_BATCH):
+            lote = itens[posicao:posicao + LIMITE_BATCH]
+            batch = lote[0][1].new_batch_http_request(callback=_callback)
+            for homologador_id, service in lote:
+                batch.add(service.freebusy().query(body=corpo), request_id=str(homologador_id))
+            try:
+                batch.execute()
+            except Exception as e:
+                ids = [homologador_id for homologador_id, _ in lote]
+                logger.error(f"Falha no batch de free/busy de {dia} (homologadores {ids[0]}..{ids[-1]}): {e}")
+
+    if novos:
+        cache.set_many({_chave(hid, dia): ocupados for hid, ocupados in novos.items()}, _timeout())
+    resultado.update(novos)
+    return resultado
+
+
+def invalidar_ocupacao(homologador_id, dia):
+    """Descarta a ocupação em cache (ex.: após criar ou remover um evento)"""
+    cache.delete(_chave(homologador_id, dia))
+
+
+def sobrepoe(ocupados, inicio, fim):
+    """Indica se algum intervalo (minutos) se sobrepõe a [inicio, fim)"""
+    return any(i < fim and f > inicio for i, f in ocupados)
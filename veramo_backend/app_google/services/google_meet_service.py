@@ -2,9 +2,9 @@
 import os, uuid, datetime
 from django.utils import timezone
 from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from app_google.models import GoogleOAuthToken
+from app_google.services.client_pool import pool
 
 def _build_creds(token):
     return Credentials(
@@ -16,10 +16,14 @@ def _build_creds(token):
         scopes=["https://www.googleapis.com/auth/calendar.events"],
     )
 
-def criar_meet_para_homologador(homologador_id: int, titulo: str, inicio_local, fim_local, attendees_emails, tz="America/Sao_Paulo"):
+def criar_meet_para_homologador(homologador_id: int, titulo: str, inicio_local, fim_local, attendees_emails, tz="America/Sao_Paulo", request_id=None):
     """
     Cria um evento no Google Calendar do homologador com Google Meet.
     
+    Com `request_id` a criação é idempotente: ele é usado como id do evento
+    e da conferência, então uma nova tentativa após uma falha de rede
+    recupera o evento já criado em vez de duplicá-lo.
+    
     Args:
         homologador_id: ID do homologador
         titulo: Título do evento
@@ -27,24 +31,15 @@ def criar_meet_para_homologador(homologador_id: int, titulo: str, inicio_local,
         fim_local: datetime com timezone (ex: America/Sao_Paulo)
         attendees_emails: Lista de emails dos participantes
         tz: Timezone do evento (padrão: America/Sao_Paulo)
+        request_id: ID idempotente (caracteres a-v e 0-9, ex.: uuid4().hex)
     
     Returns:
-        dict: {"event_id": str, "meet_link": str}
+        dict: {"event_id": str, "meet_link": str, "html_link": str, "conference_id": str}
     
     Raises:
         PermissionError: Se homologador não tem Google conectado
         HttpError: Se falha na API do Google
     """
-    token = (GoogleOAuthToken.objects
-             .filter(homologador_id=homologador_id)
-             .order_by("-updated_at")
-             .first())
-    if not token or not token.refresh_token:
-        raise PermissionError("Homologador sem Google conectado.")
-
-    creds = _build_creds(token)
-    service = build("calendar", "v3", credentials=creds)
-
     # Converte para UTC, mas informa o tz no body (Calendar aceita ambos)
     inicio_utc = inicio_local.astimezone(datetime.timezone.utc)
     fim_utc = fim_local.astimezone(datetime.timezone.utc)
@@ -56,39 +51,56 @@ def criar_meet_para_homologador(homologador_id: int, titulo: str, inicio_local,
         "attendees": [{"email": e} for e in attendees_emails],
         "conferenceData": {
             "createRequest": {
-                "requestId": str(uuid.uuid4()),
+                "requestId": request_id or str(uuid.uuid4()),
                 "conferenceSolutionKey": {"type": "hangoutsMeet"}
             }
         },
         "guestsCanModify": False,
         "guestsCanSeeOtherGuests": True,
     }
-
-    event = service.events().insert(
-        calendarId="primary",
-        body=body,
-        conferenceDataVersion=1,
-        sendUpdates="all",
-    ).execute()
+    if request_id:
+        body["id"] = request_id
+
+    with pool.cliente(homologador_id) as service:
+        try:
+            event = service.events().insert(
+                calendarId="primary",
+                body=body,
+                conferenceDataVersion=1,
+                sendUpdates="all",
+            ).execute()
+        except HttpError as e:
+            # 409: o evento com este id já foi criado por uma tentativa anterior
+            if not request_id or e.resp.status != 409:
+                raise
+            event = service.events().get(calendarId="primary", eventId=request_id).execute()
 
     meet = event.get("hangoutLink") or event["conferenceData"]["entryPoints"][0]["uri"]
 
-    # Salva access_token atualizado se tiver refresh automático
-    if creds.token and creds.token != token.access_token:
-        token.access_token = creds.token
-        token.token_expiry = timezone.now() + datetime.timedelta(seconds=3500)
-        token.save(update_fields=["access_token", "token_expiry"])
+    # O novo evento ocupa a agenda: descarta o free/busy em cache do dia
+    from .freebusy_service import invalidar_ocupacao
+    invalidar_ocupacao(homologador_id, timezone.localtime(inicio_local).date())
 
-    return {"event_id": event["id"], "meet_link": meet}
+    return {
+        "event_id": event["id"],
+        "meet_link": meet,
+        "html_link": event.get("htmlLink"),
+        "conference_id": (event.get("conferenceData") or {}).get("conferenceId"),
+    }
 
-def verificar_disponibilidade_homologador(homologador_id: int, inicio_local, fim_local):
+def verificar_disponibilidade_homologador(homologador_id: int, inicio_local, fim_local, homologadores_do_dia=()):
     """
     Verifica se o homologador está disponível no horário especificado.
     
+    A ocupação do dia inteiro vem do cache de free/busy; em caso de falta,
+    ela é buscada em um único batch junto com `homologadores_do_dia`, de modo
+    que os próximos agendamentos do mesmo dia não chamem o Google.
+    
     Args:
         homologador_id: ID do homologador
         inicio_local: datetime com timezone
         fim_local: datetime com timezone
+        homologadores_do_dia: IDs de outros homologadores a consultar no mesmo batch
     
     Returns:
         bool: True se disponível, False se ocupado
@@ -104,17 +116,25 @@ def verificar_disponibilidade_homologador(homologador_id: int, inicio_local, fim
     if not token or not token.refresh_token:
         raise PermissionError("Homologador sem Google conectado.")
 
-    creds = _build_creds(token)
-    service = build("calendar", "v3", credentials=creds)
+    inicio = timezone.localtime(inicio_local)
+    fim = timezone.localtime(fim_local)
+    if inicio.date() == fim.date():
+        from .freebusy_service import consultar_ocupacao, sobrepoe
+        ocupacao = consultar_ocupacao([homologador_id, *homologadores_do_dia], inicio.date())
+        if homologador_id in ocupacao:
+            return not sobrepoe(ocupacao[homologador_id],
+                                inicio.hour * 60 + inicio.minute,
+                                fim.hour * 60 + fim.minute)
 
     inicio_utc = inicio_local.astimezone(datetime.timezone.utc)
     fim_utc = fim_local.astimezone(datetime.timezone.utc)
 
-    busy = service.freebusy().query(body={
-        "timeMin": inicio_utc.isoformat(),
-        "timeMax": fim_utc.isoformat(),
-        "items": [{"id": "primary"}]
-    }).execute()["calendars"]["primary"]["busy"]
+    with pool.cliente(homologador_id) as service:
+        busy = service.freebusy().query(body={
+            "timeMin": inicio_utc.isoformat(),
+            "timeMax": fim_utc.isoformat(),
+            "items": [{"id": "primary"}]
+        }).execute()["calendars"]["primary"]["busy"]
 
     return len(busy) == 0
 
@@ -136,16 +156,6 @@ def remarcar_evento_homologador(homologador_id: int, event_id: str, novo_inicio_
         PermissionError: Se homologador não tem Google conectado
         HttpError: Se falha na API do Google
     """
-    token = (GoogleOAuthToken.objects
-             .filter(homologador_id=homologador_id)
-             .order_by("-updated_at")
-             .first())
-    if not token or not token.refresh_token:
-        raise PermissionError("Homologador sem Google conectado.")
-
-    creds = _build_creds(token)
-    service = build("calendar", "v3", credentials=creds)
-
     novo_inicio_utc = novo_inicio_local.astimezone(datetime.timezone.utc)
     novo_fim_utc = novo_fim_local.astimezone(datetime.timezone.utc)
 
@@ -154,15 +164,19 @@ def remarcar_evento_homologador(homologador_id: int, event_id: str, novo_inicio_
         "end": {"dateTime": novo_fim_utc.isoformat(), "timeZone": tz},
     }
 
-    event = service.events().patch(
-        calendarId="primary",
-        eventId=event_id,
-        body=body,
-        sendUpdates="all"
-    ).execute()
+    with pool.cliente(homologador_id) as service:
+        event = service.events().patch(
+            calendarId="primary",
+            eventId=event_id,
+            body=body,
+            sendUpdates="all"
+        ).execute()
 
     meet = event.get("hangoutLink") or event["conferenceData"]["entryPoints"][0]["uri"]
 
+    from .freebusy_service import invalidar_ocupacao
+    invalidar_ocupacao(homologador_id, timezone.localtime(novo_inicio_local).date())
+
     return {"event_id": event["id"], "meet_link": meet}
 
 def cancelar_evento_homologador(homologador_id: int, event_id: str):
@@ -180,20 +194,11 @@ def cancelar_evento_homologador(homologador_id: int, event_id: str):
         PermissionError: Se homologador não tem Google conectado
         HttpError: Se falha na API do Google
     """
-    token = (GoogleOAuthToken.objects
-             .filter(homologador_id=homologador_id)
-             .order_by("-updated_at")
-             .first())
-    if not token or not token.refresh_token:
-        raise PermissionError("Homologador sem Google conectado.")
-
-    creds = _build_creds(token)
-    service = build("calendar", "v3", credentials=creds)
-
-    service.events().delete(
-        calendarId="primary",
-        eventId=event_id,
-        sendUpdates="all"
-    ).execute()
+    with pool.cliente(homologador_id) as service:
+        service.events().delete(
+            calendarId="primary",
+            eventId=event_id,
+            sendUpdates="all"
+        ).execute()
 
     return True
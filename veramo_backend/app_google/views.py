@@ -71,6 +71,9 @@ def oauth2callback(request):
             "scopes": "https://www.googleapis.com/auth/calendar.events",
         },
     )
+    # Cliente em cache neste worker ainda usa as credenciais antigas
+    from app_google.services.client_pool import pool
+    pool.invalidar(homologador_id)
     return HttpResponse("Google conectado! Pode fechar esta aba.")
 
 def _legacy_oauth_callback(request, code):
@@ -6,7 +6,7 @@ import django
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'veramo_backend.settings.dev')
 django.setup()
 
-from core.models import DemissaoProcess, Schedule, User
+from core.models import DemissaoProcess, User
 from app_google.models import GoogleOAuthToken
 
 def check_processo_homologador(processo_id):
@@ -20,10 +20,7 @@ def check_processo_homologador(processo_id):
         print(f"Status: {processo.status}")
         
         # Buscar agendamento relacionado
-        schedule = Schedule.objects.filter(
-            employee__name=processo.nome_funcionario,
-            company=processo.empresa
-        ).first()
+        schedule = processo.agendamento_atual()
         
         if schedule and schedule.union_user:
             homologador = schedule.union_user
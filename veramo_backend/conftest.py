@@ -0,0 +1,14 @@
+"""
+Configuração dos testes com pytest (pytest-django).
+
+Os logs do sistema são gravados na hora, sem a thread de fundo do buffer,
+mesmo que o ambiente ligue SYSTEMLOG_BUFFER_ENABLED; LogBufferTests liga o
+buffer com override_settings.
+"""
+
+
+def pytest_configure(config):
+    from django.conf import settings
+
+    if settings.configured:
+        settings.SYSTEMLOG_BUFFER_ENABLED = False
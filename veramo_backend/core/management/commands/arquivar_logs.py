@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from core.services.log_archive import arquivar, diretorio
+
+
+class Command(BaseCommand):
+    help = 'Move os logs anteriores à janela de retenção (SYSTEMLOG_RETENTION_DAYS) para arquivos JSONL compactados'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch', type=int, default=1000, help='Logs removidos por transação (padrão: 1000)')
+        parser.add_argument('--sleep', type=float, default=0.0,
+                            help='Pausa (s) entre lotes de remoção, para liberar o banco (padrão: 0)')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Arquivando logs em {diretorio()}...')
+        resumo = arquivar(options['batch'], options['sleep'])
+        for dia, total in sorted(resumo.items()):
+            self.stdout.write(f'{dia:%d/%m/%Y}: {total} log(s) arquivado(s)')
+        self.stdout.write(self.style.SUCCESS(f'{sum(resumo.values())} log(s) arquivado(s) em {len(resumo)} dia(s)'))
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.services.log_stats import compactar
+
+
+class Command(BaseCommand):
+    help = 'Soma os logs novos ao rollup de estatísticas (contagem por dia, nível e ação)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Compacta até alcançar os logs recentes e encerra')
+        parser.add_argument('--batch', type=int, default=50000, help='Logs somados por transação (padrão: 50000)')
+        parser.add_argument('--sleep', type=float, default=60.0, help='Espera (s) entre compactações (padrão: 60)')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Compactando logs...')
+        while True:
+            somados = compactar(options['batch'])
+            if somados:
+                self.stdout.write(f'{somados} log(s) somado(s) ao rollup')
+                continue
+            if options['once']:
+                break
+            time.sleep(options['sleep'])
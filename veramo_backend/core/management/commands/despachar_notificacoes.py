@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.services.notification_outbox import despachar_pendentes
+
+
+class Command(BaseCommand):
+    help = 'Envia as notificações pendentes do outbox (e-mail e WhatsApp) em lotes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Processa um único lote e encerra')
+        parser.add_argument('--batch', type=int, default=50, help='Notificações reivindicadas por lote (padrão: 50)')
+        parser.add_argument('--sleep', type=float, default=2.0, help='Espera (s) quando o outbox está vazio (padrão: 2)')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Despachando notificações...')
+        while True:
+            processadas = despachar_pendentes(options['batch'])
+            if processadas:
+                self.stdout.write(f'{processadas} notificação(ões) processada(s)')
+            if options['once']:
+                break
+            if not processadas:
+                time.sleep(options['sleep'])
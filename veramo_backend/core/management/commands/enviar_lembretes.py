@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from core.services.reminder_service import PROXIMA_HORA, VESPERA, enviar_lembretes
+
+
+class Command(BaseCommand):
+    help = 'Enfileira os lembretes das homologações de amanhã e da próxima hora (executar periodicamente, ex.: a cada 10 min)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tipo', choices=[VESPERA, PROXIMA_HORA], action='append',
+                            help='Tipo de lembrete (padrão: todos); pode ser repetido')
+        parser.add_argument('--batch', type=int, default=200, help='Agendamentos por lote (padrão: 200)')
+
+    def handle(self, *args, **options):
+        for tipo in options['tipo'] or [VESPERA, PROXIMA_HORA]:
+            por_sindicato = enviar_lembretes(tipo, lote=options['batch'])
+            total = sum(por_sindicato.values())
+            self.stdout.write(f'Lembretes ({tipo}): {total} agendamento(s) em {len(por_sindicato)} sindicato(s)')
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from core.services.counters import reconciliar
+
+
+class Command(BaseCommand):
+    help = 'Recalcula os contadores do painel e o buffer de últimos acessos (executar periodicamente)'
+
+    def handle(self, *args, **options):
+        divergentes = reconciliar()
+        for nome, (antes, depois) in divergentes.items():
+            self.stdout.write(f'{nome}: {antes} -> {depois}')
+        self.stdout.write(self.style.SUCCESS(f'Contadores reconciliados ({len(divergentes)} corrigido(s))'))
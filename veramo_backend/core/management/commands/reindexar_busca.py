@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.services.search_service import backend, instalar
+
+
+class Command(BaseCommand):
+    help = 'Recria as tabelas e triggers do índice de busca (?q=) e reconstrói o índice'
+
+    def handle(self, *args, **options):
+        reconstruidos = instalar(reconstruir=True)
+        if reconstruidos:
+            self.stdout.write(self.style.SUCCESS(f"Índices reconstruídos: {', '.join(reconstruidos)}"))
+        else:
+            self.stdout.write(f'Backend {type(backend()).__name__}: nada a reconstruir')
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_slot_reservations'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='schedule',
+            name='meeting_status',
+            field=models.CharField(blank=True, choices=[('pendente', 'Pendente'), ('criada', 'Criada'), ('falhou', 'Falhou')], help_text='Situação da reunião no Google Calendar (criação/alteração assíncrona)', max_length=20, null=True),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_schedule_meeting_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='demissaoprocess',
+            name='employee',
+            field=models.ForeignKey(blank=True, help_text='Funcionário vinculado ao processo', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='demissao_processes', to='core.employee'),
+        ),
+        migrations.AddField(
+            model_name='schedule',
+            name='demissao_process',
+            field=models.ForeignKey(blank=True, help_text='Processo de demissão que originou o agendamento', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='schedules', to='core.demissaoprocess'),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Preenche os vínculos processo -> funcionário e agendamento -> processo das
+# linhas existentes, que antes eram resolvidos por nome do funcionário a cada
+# requisição. Tudo é feito em memória com poucas consultas e bulk_update.
+
+from collections import defaultdict
+
+from django.db import migrations
+
+LOTE = 500
+
+
+def vincular(apps, schema_editor):
+    DemissaoProcess = apps.get_model('core', 'DemissaoProcess')
+    Employee = apps.get_model('core', 'Employee')
+    Schedule = apps.get_model('core', 'Schedule')
+
+    # Processo -> funcionário: mesmo nome na mesma empresa (o mais antigo, como o .first() das views)
+    funcionarios = {}
+    for employee_id, nome, company_id in Employee.objects.order_by('-id').values_list('id', 'name', 'company_id'):
+        funcionarios[(nome, company_id)] = employee_id
+
+    processos = list(DemissaoProcess.objects.all().only('id', 'nome_funcionario', 'empresa_id', 'sindicato_id',
+                                                        'employee_id', 'data_inicio'))
+    sem_funcionario = []
+    for processo in processos:
+        if processo.employee_id is None:
+            processo.employee_id = funcionarios.get((processo.nome_funcionario, processo.empresa_id))
+            if processo.employee_id is not None:
+                sem_funcionario.append(processo)
+    DemissaoProcess.objects.bulk_update(sem_funcionario, ['employee'], batch_size=LOTE)
+
+    # Agendamento -> processo: entre os processos do mesmo funcionário/empresa/sindicato,
+    # o mais recente iniciado até a data do agendamento (ou o primeiro, se nenhum)
+    por_chave = defaultdict(list)
+    for processo in processos:
+        if processo.employee_id is not None:
+            por_chave[(processo.employee_id, processo.empresa_id, processo.sindicato_id)].append(processo)
+    for candidatos in por_chave.values():
+        candidatos.sort(key=lambda p: (p.data_inicio, p.id))
+
+    vinculados = []
+    for schedule in Schedule.objects.filter(demissao_process__isnull=True).only(
+            'id', 'employee_id', 'company_id', 'union_id', 'date'):
+        candidatos = por_chave.get((schedule.employee_id, schedule.company_id, schedule.union_id))
+        if not candidatos:
+            continue
+        escolhido = candidatos[0]
+        for processo in candidatos:
+            if processo.data_inicio and processo.data_inicio.date() <= schedule.date:
+                escolhido = processo
+        schedule.demissao_process_id = escolhido.id
+        vinculados.append(schedule)
+    Schedule.objects.bulk_update(vinculados, ['demissao_process'], batch_size=LOTE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_process_schedule_links'),
+    ]
+
+    operations = [
+        migrations.RunPython(vincular, migrations.RunPython.noop),
+    ]
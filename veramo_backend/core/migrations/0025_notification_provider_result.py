@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0024_outbound_notification'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboundnotification',
+            name='provider_message_id',
+            field=models.CharField(blank=True, default='', help_text='ID da mensagem no provedor (ex.: wamid do WhatsApp)', max_length=128),
+        ),
+        migrations.AddField(
+            model_name='outboundnotification',
+            name='provider_status',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='Status HTTP da última tentativa no provedor', null=True),
+        ),
+    ]
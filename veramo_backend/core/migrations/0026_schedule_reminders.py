@@ -0,0 +1,27 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0025_notification_provider_result'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='schedule',
+            name='reminder_day_sent_at',
+            field=models.DateTimeField(blank=True, help_text='Envio do lembrete da véspera', null=True),
+        ),
+        migrations.AddField(
+            model_name='schedule',
+            name='reminder_hour_sent_at',
+            field=models.DateTimeField(blank=True, help_text='Envio do lembrete da hora anterior', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='schedule',
+            index=models.Index(fields=['date', 'start_time'], name='core_schedu_date_fae110_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0026_schedule_reminders'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='demissaoprocess',
+            index=models.Index(fields=['data_inicio', 'id'], name='core_demiss_data_in_6b6287_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0027_demissaoprocess_data_inicio_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SystemLogRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('level', models.CharField(choices=[('DEBUG', 'Debug'), ('INFO', 'Info'), ('WARNING', 'Warning'), ('ERROR', 'Error'), ('SUCCESS', 'Success')], max_length=10)),
+                ('action', models.CharField(blank=True, choices=[('LOGIN', 'Login'), ('LOGOUT', 'Logout'), ('LOGIN_FAILED', 'Login Failed'), ('USER_CREATED', 'User Created'), ('USER_UPDATED', 'User Updated'), ('USER_DELETED', 'User Deleted'), ('COMPANY_CREATED', 'Company Created'), ('COMPANY_UPDATED', 'Company Updated'), ('COMPANY_DELETED', 'Company Deleted'), ('UNION_CREATED', 'Union Created'), ('UNION_UPDATED', 'Union Updated'), ('UNION_DELETED', 'Union Deleted'), ('SCHEDULE_CREATED', 'Schedule Created'), ('SCHEDULE_UPDATED', 'Schedule Updated'), ('SCHEDULE_DELETED', 'Schedule Deleted'), ('DOCUMENT_UPLOADED', 'Document Uploaded'), ('DOCUMENT_APPROVED', 'Document Approved'), ('DOCUMENT_REJECTED', 'Document Rejected'), ('HOMOLOGATION_COMPLETED', 'Homologation Completed'), ('SYSTEM_ERROR', 'System Error'), ('API_CALL', 'API Call'), ('SECURITY_EVENT', 'Security Event')], default='', max_length=50)),
+                ('count', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SystemLogRollupCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_log_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='systemlogrollup',
+            constraint=models.UniqueConstraint(fields=('day', 'level', 'action'), name='unique_systemlog_rollup'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0029_dashboard_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='demissaoprocess',
+            index=models.Index(fields=['empresa', 'status'], name='core_demiss_empresa_78b0ef_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='demissaoprocess',
+            index=models.Index(fields=['sindicato', 'status'], name='core_demiss_sindica_e8dee8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['demissao_process', 'status'], name='core_docume_demissa_9d4e60_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='schedule',
+            index=models.Index(fields=['union_user', 'date', 'start_time', 'end_time'], name='core_schedu_union_u_8d8caf_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='schedule',
+            index=models.Index(fields=['union', 'date'], name='core_schedu_union_i_3722ea_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='scheduleconfig',
+            index=models.Index(fields=['union_user', 'weekday'], name='core_schedu_union_u_29590f_idx'),
+        ),
+    ]
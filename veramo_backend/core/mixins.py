@@ -2,10 +2,17 @@
 Mixins para ViewSets do Veramo3
 Funcionalidades reutilizáveis para controle de acesso
 """
-from rest_framework import mixins
+from rest_framework import mixins, serializers, status
+from rest_framework.decorators import action
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from django.core.exceptions import FieldDoesNotExist
 from django.db.models import Q
 from django.utils import timezone
 
+from .services.export_service import FORMATOS, exportar
+from .services import search_service
+
 class OrgScopedQuerysetMixin:
     """
     Mixin para filtrar queryset por organização do usuário
@@ -91,3 +98,141 @@ class AuditFieldsMixin:
             updated_by=self.request.user,
             updated_at=timezone.now()
         )
+
+class _PlanoConsulta:
+    """Relações e colunas lidas por um serializer"""
+
+    def __init__(self):
+        self.select = set()
+        self.prefetch = set()
+        self.colunas = set()
+        # False quando algum campo lê atributos fora do modelo (propriedades, métodos)
+        self.restringir_colunas = True
+
+    def planejar(self, serializer, model, prefixo=''):
+        fontes_extras = getattr(getattr(serializer, 'Meta', None), 'field_sources', {})
+        self.colunas.add(prefixo + model._meta.pk.name)
+        for nome, campo in serializer.fields.items():
+            if campo.write_only:
+                continue
+            if nome in fontes_extras:
+                for fonte in fontes_extras[nome]:
+                    self._resolver(fonte.split('.'), None, model, prefixo)
+            elif campo.source == '*':
+                self.restringir_colunas = False
+            else:
+                self._resolver(campo.source.split('.'), campo, model, prefixo)
+
+    def _resolver(self, partes, campo, model, prefixo):
+        for i, parte in enumerate(partes):
+            try:
+                field = model._meta.get_field(parte)
+            except FieldDoesNotExist:
+                self.restringir_colunas = False
+                return
+            caminho = prefixo + parte
+            ultimo = i == len(partes) - 1
+            if not field.is_relation:
+                self.colunas.add(caminho)
+                return
+            if not field.concrete or field.many_to_many:
+                # Relação reversa ou N:N: uma consulta extra para todas as linhas
+                self.prefetch.add(caminho)
+                return
+            self.colunas.add(caminho)
+            aninhado = isinstance(campo, serializers.BaseSerializer)
+            if ultimo and not aninhado:
+                # Apenas o id da relação: a coluna da chave estrangeira basta
+                return
+            self.select.add(caminho)
+            model, prefixo = field.related_model, caminho + '__'
+        if isinstance(campo, serializers.ListSerializer):
+            campo = campo.child
+        if isinstance(campo, serializers.BaseSerializer):
+            self.planejar(campo, model, prefixo)
+
+    def aplicar(self, qs):
+        if self.select:
+            qs = qs.select_related(*self.select)
+        if self.prefetch:
+            qs = qs.prefetch_related(*self.prefetch)
+        if self.restringir_colunas:
+            qs = qs.only(*self.colunas)
+        return qs
+
+
+class SparseFieldsetQuerysetMixin:
+    """
+    Ajusta o queryset das leituras (list/retrieve) ao formato da resposta
+    pedido em ?fields=/?expand= (serializers com SparseFieldsMixin):
+    select_related/prefetch_related das relações lidas pelos campos
+    restantes e only() com as colunas correspondentes.
+    """
+
+    def get_queryset(self):
+        return self.otimizar_queryset(super().get_queryset())
+
+    def otimizar_queryset(self, qs, serializer=None):
+        if serializer is None:
+            if self.action not in ['list', 'retrieve']:
+                return qs
+            serializer = self.get_serializer()
+        plano = _PlanoConsulta()
+        plano.planejar(serializer, qs.model)
+        # Chaves da paginação por cursor (posição da última linha da página)
+        plano.colunas.update(campo.lstrip('-') for campo in getattr(self.pagination_class, 'ordering', ()))
+        return plano.aplicar(qs)
+
+
+class StreamingExportMixin:
+    """
+    Ação GET .../export/ com as linhas da listagem (mesmo escopo por papel e
+    mesmos filtros de get_queryset), em streaming: ?formato=csv|jsonl e
+    ?gzip=1. A view define export_fields = [(coluna, caminho do values_list)].
+    """
+    export_fields = ()
+    export_filename = 'exportacao'
+
+    @action(detail=False, methods=['get'], url_path='export')
+    def export(self, request):
+        formato = request.query_params.get('formato', 'csv')
+        if formato not in FORMATOS:
+            return Response({'error': f"formato deve ser um de: {', '.join(FORMATOS)}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        queryset = self.filter_queryset(self.get_queryset())
+        # Mesma ordem da listagem (chaves da paginação por cursor, atendidas por índice)
+        ordenacao = getattr(self.pagination_class, 'ordering', None) or ('pk',)
+        return exportar(
+            queryset.order_by(*ordenacao), self.export_fields, formato,
+            compactar=request.query_params.get('gzip') in ('1', 'true'),
+            nome=f'{self.export_filename}-{timezone.localdate():%Y%m%d}',
+        )
+
+
+class FullTextSearchMixin:
+    """
+    Busca textual ?q= na listagem e na exportação: filtra o queryset (já no
+    escopo do usuário) pelo índice de busca e ordena por relevância. Com ?q=
+    a listagem usa paginação numerada (?page=): a ordem por relevância não
+    tem chave para o cursor. A view define
+    search_sources = [(índice, campo com o id da linha indexada)].
+    """
+    search_sources = ()
+
+    def termo_busca(self):
+        return self.request.query_params.get('q', '').strip()
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        termo = self.termo_busca()
+        if termo and self.action in ['list', 'export']:
+            queryset = search_service.buscar(queryset, termo, self.search_sources)
+        return queryset
+
+    @property
+    def paginator(self):
+        if self.action == 'list' and self.termo_busca():
+            if not hasattr(self, '_paginator_busca'):
+                self._paginator_busca = PageNumberPagination()
+            return self._paginator_busca
+        return super().paginator
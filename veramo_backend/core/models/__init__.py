@@ -8,4 +8,7 @@ from .document import Document
 from .config import ScheduleConfig
 from .block import AgendaBlock
 from .demissao_process import DemissaoProcess
-from .log import SystemLog 
\ No newline at end of file
+from .log import SystemLog, SystemLogArchive, SystemLogRollup, SystemLogRollupCheckpoint
+from .reservation import AgendaLock, SlotHold
+from .notification import OutboundNotification
+from .counter import Counter, RecentAccess
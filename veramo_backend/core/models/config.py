@@ -8,3 +8,7 @@ class ScheduleConfig(models.Model):
     end_time = models.TimeField()
     duration_minutes = models.IntegerField()
     break_minutes = models.IntegerField()
+
+    class Meta:
+        # Jornada do homologador por dia da semana
+        indexes = [models.Index(fields=['union_user', 'weekday'])]
@@ -0,0 +1,27 @@
+from django.db import models
+from .user import User
+
+class Counter(models.Model):
+    """Contadores pré-calculados do painel administrativo.
+
+    Atualizados pelos sinais de criação/remoção (na mesma transação da
+    escrita) e reconciliados periodicamente pelo comando
+    `reconciliar_contadores`, que também corrige operações em lote que não
+    disparam sinais.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    value = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+
+class RecentAccess(models.Model):
+    """Últimos acessos ao sistema: buffer circular com um registro por usuário,
+    limitado a DASHBOARD_RECENT_ACCESSES posições (o mais antigo é substituído)"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='recent_access')
+    last_login = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.user} - {self.last_login}"
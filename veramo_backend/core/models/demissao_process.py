@@ -1,5 +1,6 @@
 from django.db import models
 from .company import Company
+from .employee import Employee
 from .union import Union
 from ..validators import validate_pdf_file
 
@@ -11,6 +12,7 @@ class DemissaoProcess(models.Model):
     exame = models.CharField(max_length=50)
     empresa = models.ForeignKey(Company, on_delete=models.CASCADE)
     sindicato = models.ForeignKey(Union, on_delete=models.CASCADE)
+    employee = models.ForeignKey(Employee, on_delete=models.SET_NULL, null=True, blank=True, related_name='demissao_processes', help_text="Funcionário vinculado ao processo")
     status = models.CharField(max_length=50, default='aguardando_aprovacao')
     data_inicio = models.DateTimeField(auto_now_add=True)
     data_termino = models.DateTimeField(null=True, blank=True)
@@ -55,5 +57,18 @@ class DemissaoProcess(models.Model):
     employee_upload_token = models.CharField(max_length=64, blank=True, null=True, help_text="Token público para upload do trabalhador")
     employee_upload_expires = models.DateTimeField(blank=True, null=True, help_text="Validade do token de upload do trabalhador")
 
+    class Meta:
+        indexes = [
+            # Chave da paginação por cursor da listagem
+            models.Index(fields=['data_inicio', 'id']),
+            # Listagens por empresa/sindicato do usuário
+            models.Index(fields=['empresa', 'status']),
+            models.Index(fields=['sindicato', 'status']),
+        ]
+
     def __str__(self):
-        return f"{self.nome_funcionario} - {self.empresa} ({self.status})" 
\ No newline at end of file
+        return f"{self.nome_funcionario} - {self.empresa} ({self.status})"
+
+    def agendamento_atual(self):
+        """Agendamento mais recente do processo que não foi cancelado"""
+        return self.schedules.exclude(status='cancelado').order_by('-date', '-start_time').first() 
\ No newline at end of file
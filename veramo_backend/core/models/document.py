@@ -50,3 +50,5 @@ class Document(models.Model):
     class Meta:
         # Garantir que não há documentos duplicados do mesmo tipo para o mesmo processo
         unique_together = ['demissao_process', 'type']
+        # Contagem de documentos por status do processo
+        indexes = [models.Index(fields=['demissao_process', 'status'])]
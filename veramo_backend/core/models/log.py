@@ -75,3 +75,50 @@ class SystemLog(models.Model):
         if self.user:
             return f"{self.user.first_name} {self.user.last_name}".strip() or self.user.username
         return 'Sistema'
+
+
+class SystemLogRollup(models.Model):
+    """Contagem de logs por dia, nível e ação (mantida pelo comando compactar_logs)"""
+
+    day = models.DateField()
+    level = models.CharField(max_length=10, choices=SystemLog.LEVEL_CHOICES)
+    # '' para logs sem ação (NULL não participaria da unicidade)
+    action = models.CharField(max_length=50, choices=SystemLog.ACTION_CHOICES, blank=True, default='')
+    count = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'level', 'action'], name='unique_systemlog_rollup'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} - {self.level} - {self.action or '-'}: {self.count}"
+
+
+class SystemLogRollupCheckpoint(models.Model):
+    """Maior id de SystemLog já somado ao rollup (linha única)"""
+
+    last_log_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @classmethod
+    def atual(cls):
+        return cls.objects.get_or_create(pk=1)[0]
+
+
+class SystemLogArchive(models.Model):
+    """Arquivo JSONL compactado com logs de um dia removidos da tabela (comando arquivar_logs)"""
+
+    day = models.DateField(db_index=True)
+    path = models.CharField(max_length=255, help_text="Caminho relativo a SYSTEMLOG_ARCHIVE_DIR")
+    rows = models.PositiveIntegerField(default=0)
+    size = models.PositiveBigIntegerField(default=0, help_text="Tamanho do arquivo em bytes")
+    first_log_id = models.BigIntegerField()
+    last_log_id = models.BigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['day', 'first_log_id']
+
+    def __str__(self):
+        return f"{self.day} - {self.path} ({self.rows} logs)"
@@ -0,0 +1,51 @@
+from django.db import models
+from .schedule import Schedule
+
+class OutboundNotification(models.Model):
+    """Outbox de notificações (e-mail e WhatsApp).
+
+    As notificações são gravadas na mesma transação que as originou e
+    enviadas pelo comando `despachar_notificacoes`, em lotes, com novas
+    tentativas e backoff. As que esgotam as tentativas ficam com status
+    'falhou' (dead-letter) para análise e reenvio manual.
+    """
+    EMAIL = 'email'
+    WHATSAPP = 'whatsapp'
+    CHANNEL_CHOICES = [
+        (EMAIL, 'E-mail'),
+        (WHATSAPP, 'WhatsApp'),
+    ]
+
+    PENDENTE = 'pendente'
+    ENVIANDO = 'enviando'
+    ENVIADA = 'enviada'
+    FALHOU = 'falhou'
+    STATUS_CHOICES = [
+        (PENDENTE, 'Pendente'),
+        (ENVIANDO, 'Enviando'),
+        (ENVIADA, 'Enviada'),
+        (FALHOU, 'Falhou'),
+    ]
+
+    channel = models.CharField(max_length=20, choices=CHANNEL_CHOICES)
+    recipients = models.JSONField(default=list, help_text="E-mails ou telefone (E.164) de destino")
+    subject = models.CharField(max_length=255, blank=True, default='')
+    body = models.TextField()
+    html_body = models.TextField(blank=True, default='')
+    schedule = models.ForeignKey(Schedule, on_delete=models.SET_NULL, null=True, blank=True, related_name='notifications')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDENTE)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    next_attempt_at = models.DateTimeField()
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    sent_at = models.DateTimeField(null=True, blank=True)
+    provider_status = models.PositiveSmallIntegerField(null=True, blank=True, help_text="Status HTTP da última tentativa no provedor")
+    provider_message_id = models.CharField(max_length=128, blank=True, default='', help_text="ID da mensagem no provedor (ex.: wamid do WhatsApp)")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'next_attempt_at'])]
+
+    def __str__(self):
+        return f"{self.channel} #{self.pk} ({self.status}) -> {', '.join(self.recipients)}"
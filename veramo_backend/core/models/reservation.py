@@ -0,0 +1,41 @@
+from django.db import models
+from .user import User
+from .union import Union
+from .demissao_process import DemissaoProcess
+
+class AgendaLock(models.Model):
+    """Linha de trava por homologador/dia.
+
+    Toda reserva ou agendamento incrementa `version` desta linha antes de
+    verificar conflitos: no PostgreSQL isso bloqueia a linha até o commit e
+    no SQLite obtém o lock de escrita do banco, serializando o
+    check-and-insert do mesmo homologador/dia nos dois casos.
+    """
+    union_user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    date = models.DateField()
+    version = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['union_user', 'date']
+
+class SlotHold(models.Model):
+    """Reserva temporária de um horário enquanto o usuário confirma o agendamento"""
+    union = models.ForeignKey(Union, on_delete=models.CASCADE)
+    union_user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='slot_holds')
+    date = models.DateField()
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    token = models.CharField(max_length=64, unique=True)
+    expires_at = models.DateTimeField()
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    demissao_process = models.ForeignKey(DemissaoProcess, on_delete=models.CASCADE, null=True, blank=True, related_name='slot_holds')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['union_user', 'date']),
+            models.Index(fields=['union', 'date']),
+        ]
+
+    def __str__(self):
+        return f"Reserva {self.union_user_id} - {self.date} {self.start_time}-{self.end_time} (até {self.expires_at})"
@@ -1,15 +1,45 @@
 from django.db import models
+from django.db.models import Case, F, Q, When
 from .employee import Employee
 from .company import Company
 from .union import Union
 from .user import User
 from datetime import datetime
 
+MARCADORES_LEMBRETE = ('reminder_day_sent_at', 'reminder_hour_sent_at')
+
+
+class ScheduleQuerySet(models.QuerySet):
+    """Remarcações em massa (update/bulk_update) também liberam os lembretes"""
+
+    def update(self, **kwargs):
+        horario = {campo: kwargs[campo] for campo in ('date', 'start_time') if campo in kwargs}
+        if horario:
+            # No UPDATE, a condição compara os valores anteriores da linha: só quem muda de horário perde o marcador
+            for marcador in MARCADORES_LEMBRETE:
+                kwargs.setdefault(marcador, Case(When(Q(**horario), then=F(marcador)), default=None,
+                                                 output_field=models.DateTimeField()))
+        return super().update(**kwargs)
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        if {'date', 'start_time'} & set(fields):
+            objs = list(objs)
+            if any([obj.liberar_lembretes_se_remarcado() for obj in objs]):
+                fields = [*fields, *(marcador for marcador in MARCADORES_LEMBRETE if marcador not in fields)]
+        atualizados = super().bulk_update(objs, fields, batch_size=batch_size)
+        if {'date', 'start_time'} & set(fields):
+            # bulk_update não dispara post_save: o horário gravado passa a ser o original
+            for obj in objs:
+                obj._original = (obj.__dict__.get('union_id'), obj.date, obj.start_time)
+        return atualizados
+
+
 class Schedule(models.Model):
     employee = models.ForeignKey(Employee, on_delete=models.CASCADE)
     company = models.ForeignKey(Company, on_delete=models.CASCADE)
     union = models.ForeignKey(Union, on_delete=models.CASCADE)
     union_user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, help_text="Usuário do sindicato responsável pelo agendamento")
+    demissao_process = models.ForeignKey('DemissaoProcess', on_delete=models.SET_NULL, null=True, blank=True, related_name='schedules', help_text="Processo de demissão que originou o agendamento")
     date = models.DateField()
     start_time = models.TimeField()
     end_time = models.TimeField()
@@ -37,15 +67,51 @@ class Schedule(models.Model):
     google_meet_link = models.URLField(blank=True, null=True, help_text="Link direto para o Google Meet")
     google_calendar_link = models.URLField(blank=True, null=True, help_text="Link para o evento no Google Calendar")
     meeting_created_at = models.DateTimeField(blank=True, null=True, help_text="Data/hora de criação da reunião no Google Meet")
+    meeting_status = models.CharField(max_length=20, blank=True, null=True, choices=[
+        ('pendente', 'Pendente'),
+        ('criada', 'Criada'),
+        ('falhou', 'Falhou'),
+    ], help_text="Situação da reunião no Google Calendar (criação/alteração assíncrona)")
+    
+    # Marcadores dos lembretes (comando enviar_lembretes): evitam reenvio em execuções repetidas
+    reminder_day_sent_at = models.DateTimeField(blank=True, null=True, help_text="Envio do lembrete da véspera")
+    reminder_hour_sent_at = models.DateTimeField(blank=True, null=True, help_text="Envio do lembrete da hora anterior")
+    
+    objects = ScheduleQuerySet.as_manager()
     
     class Meta:
         db_table = 'core_schedule'
         verbose_name = 'Agendamento'
         verbose_name_plural = 'Agendamentos'
+        indexes = [
+            models.Index(fields=['date', 'start_time']),
+            # Conflito de horário do homologador
+            models.Index(fields=['union_user', 'date', 'start_time', 'end_time']),
+            # Agenda do sindicato (geração de slots)
+            models.Index(fields=['union', 'date']),
+        ]
     
     def __str__(self):
         return f"Agendamento {self.employee} - {self.date} {self.start_time}"
     
+    def liberar_lembretes_se_remarcado(self):
+        """
+        Limpa os marcadores dos lembretes se a data ou o início mudaram desde a
+        leitura (original guardado pelo post_init em core/signals.py), para
+        que os lembretes sejam enviados de novo para o novo horário.
+        """
+        _, *horario = getattr(self, '_original', (None, None, None))
+        if None in horario or tuple(horario) == (self.date, self.start_time):
+            return False
+        for marcador in MARCADORES_LEMBRETE:
+            setattr(self, marcador, None)
+        return True
+    
+    def save(self, *args, **kwargs):
+        if self.liberar_lembretes_se_remarcado() and kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], *MARCADORES_LEMBRETE}
+        super().save(*args, **kwargs)
+    
     @property
     def has_google_meeting(self):
         """Verifica se já foi criada uma reunião no Google Meet"""
@@ -0,0 +1,160 @@
+"""
+Paginação por chave (keyset) para as listagens das tabelas grandes.
+
+Em vez de COUNT(*) + OFFSET (custo que cresce com a profundidade da página),
+cada página parte da posição da última linha da página anterior, levada num
+cursor opaco: WHERE (chaves) > (posição) ORDER BY chaves LIMIT n, atendido
+pelo índice das chaves de ordenação. A última chave deve ser única (id).
+
+A resposta tem `next`, `previous` e `results`; `count` só vem com ?count=1,
+aproximado (contagem guardada em cache por PAGINATION_COUNT_CACHE_SECONDS).
+Requisições com ?page= continuam atendidas pela paginação numerada.
+"""
+import base64
+import hashlib
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    ordering = ('-id',)
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    invalid_cursor_message = 'Cursor inválido'
+
+    def _page_size(self, request):
+        padrao = settings.REST_FRAMEWORK.get('PAGE_SIZE') or 20
+        try:
+            tamanho = int(request.query_params.get(self.page_size_query_param, padrao))
+        except (TypeError, ValueError):
+            return padrao
+        return max(1, min(tamanho, self.max_page_size))
+
+    @property
+    def chaves(self):
+        """[(campo, decrescente)] das chaves de ordenação"""
+        return [(campo.lstrip('-'), campo.startswith('-')) for campo in self.ordering]
+
+    def _codificar(self, instancia, anterior):
+        posicao = [self._campo(campo).value_to_string(instancia) for campo, _ in self.chaves]
+        conteudo = json.dumps({'p': posicao, 'r': int(anterior)}, separators=(',', ':'))
+        cursor = base64.urlsafe_b64encode(conteudo.encode()).decode().rstrip('=')
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def _decodificar(self, cursor):
+        try:
+            conteudo = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+            if len(conteudo['p']) != len(self.chaves):
+                raise ValueError(cursor)
+            posicao = [self._campo(campo).to_python(valor) for (campo, _), valor in zip(self.chaves, conteudo['p'])]
+            return posicao, bool(conteudo.get('r'))
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def _campo(self, nome):
+        return self.model._meta.get_field(nome)
+
+    def _depois_de(self, posicao, anterior):
+        """(k1 > v1) OR (k1 = v1 AND k2 > v2) OR ..., com o sentido de cada chave"""
+        condicao = Q()
+        iguais = Q()
+        for (campo, decrescente), valor in zip(self.chaves, posicao):
+            lookup = 'lt' if decrescente != anterior else 'gt'
+            condicao |= iguais & Q(**{f'{campo}__{lookup}': valor})
+            iguais &= Q(**{campo: valor})
+        return condicao
+
+    def _ordenacao(self, anterior):
+        if not anterior:
+            return list(self.ordering)
+        return [campo[1:] if campo.startswith('-') else f'-{campo}' for campo in self.ordering]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.legado = None
+        if 'page' in request.query_params:
+            self.legado = PageNumberPagination()
+            return self.legado.paginate_queryset(queryset, request, view)
+
+        self.model = queryset.model
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self._page_size(request)
+        self.count = self._total_aproximado(queryset) if request.query_params.get('count') in ('1', 'true') else None
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        posicao, anterior = self._decodificar(cursor) if cursor else (None, False)
+        pagina = queryset.order_by(*self._ordenacao(anterior))
+        if posicao is not None:
+            pagina = pagina.filter(self._depois_de(posicao, anterior))
+        pagina = list(pagina[:self.page_size + 1])
+
+        mais = len(pagina) > self.page_size
+        pagina = pagina[:self.page_size]
+        if anterior:
+            pagina.reverse()
+            self.has_next, self.has_previous = posicao is not None, mais
+        else:
+            self.has_next, self.has_previous = mais, posicao is not None
+        self.page = pagina
+        return pagina
+
+    def _total_aproximado(self, queryset):
+        """COUNT(*) da consulta filtrada, reaproveitado do cache por alguns segundos"""
+        consulta = queryset.order_by().values('pk')
+        sql, params = consulta.query.sql_with_params()
+        chave = 'paginacao:total:' + hashlib.sha1(f'{sql}|{params}'.encode()).hexdigest()
+        return cache.get_or_set(chave, consulta.count, getattr(settings, 'PAGINATION_COUNT_CACHE_SECONDS', 60))
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self._codificar(self.page[-1], anterior=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self._codificar(self.page[0], anterior=True)
+
+    def get_paginated_response(self, data):
+        if self.legado is not None:
+            return self.legado.get_paginated_response(data)
+        resposta = OrderedDict()
+        if self.count is not None:
+            resposta['count'] = self.count
+        resposta['next'] = self.get_next_link()
+        resposta['previous'] = self.get_previous_link()
+        resposta['results'] = data
+        return Response(resposta)
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {'name': self.cursor_query_param, 'required': False, 'in': 'query',
+             'description': 'Cursor da página (links next/previous)', 'schema': {'type': 'string'}},
+            {'name': self.page_size_query_param, 'required': False, 'in': 'query',
+             'description': f'Itens por página (máximo {self.max_page_size})', 'schema': {'type': 'integer'}},
+            {'name': 'count', 'required': False, 'in': 'query',
+             'description': 'Inclui o total aproximado', 'schema': {'type': 'boolean'}},
+        ]
+
+
+class SystemLogPagination(KeysetPagination):
+    ordering = ('-timestamp', '-id')
+
+
+class DemissaoProcessPagination(KeysetPagination):
+    ordering = ('-data_inicio', '-id')
+
+
+class SchedulePagination(KeysetPagination):
+    ordering = ('date', 'start_time', 'id')
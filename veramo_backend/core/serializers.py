@@ -2,6 +2,7 @@ from rest_framework import serializers
 from .models.document import Document, DOCUMENT_TYPE_CHOICES
 from .models.schedule import Schedule
 from .models.company import Company
+from .models.employee import Employee
 from .models.union import Union, CompanyUnion
 from .models.user import User
 from djoser.serializers import UserSerializer as BaseUserSerializer
@@ -12,10 +13,60 @@ from .models.block import AgendaBlock
 from .models.demissao_process import DemissaoProcess
 from .models.log import SystemLog
 
-class DocumentSerializer(serializers.ModelSerializer):
+def parametro_lista(request, nome):
+    """Conjunto de valores de um parâmetro separado por vírgulas (?fields=a,b); None se ausente"""
+    valor = request.query_params.get(nome) if request is not None else None
+    if not valor:
+        return None
+    return {item.strip() for item in valor.split(',') if item.strip()}
+
+class SparseFieldsMixin:
+    """
+    Formato da resposta sob demanda nas leituras (GET), no serializer raiz:
+
+    - ?fields=id,status devolve apenas os campos pedidos;
+    - ?expand=company troca o id da relação pelo objeto aninhado, para as
+      relações declaradas em Meta.expandable = {campo: (serializer, kwargs)}.
+
+    Meta.field_sources indica as colunas lidas por campos calculados
+    (SerializerMethodField, anotações), usadas pelo otimizador de queryset
+    (SparseFieldsetQuerysetMixin).
+    """
+
+    def _e_raiz(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None or request.method != 'GET' or not self._e_raiz():
+            return fields
+
+        expandable = getattr(self.Meta, 'expandable', {})
+        for nome in parametro_lista(request, 'expand') or ():
+            if nome in expandable:
+                classe, kwargs = expandable[nome]
+                fields[nome] = globals()[classe](read_only=True, **kwargs)
+
+        pedidos = parametro_lista(request, 'fields')
+        if pedidos:
+            for nome in set(fields) - pedidos:
+                del fields[nome]
+        return fields
+
+class EmployeeSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Employee
+        fields = ['id', 'name', 'email', 'phone', 'status']
+
+class DocumentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Document
         fields = ['id', 'employee', 'demissao_process', 'type', 'file', 'uploaded_at', 'status', 'motivo_recusa', 'rejeitado_em', 'aprovado_em']
+        expandable = {'employee': ('EmployeeSerializer', {})}
 
 # Para upload múltiplo
 class MultiDocumentUploadSerializer(serializers.Serializer):
@@ -29,7 +80,7 @@ class MultiDocumentUploadSerializer(serializers.Serializer):
         write_only=True
     )
 
-class ScheduleSerializer(serializers.ModelSerializer):
+class ScheduleSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     company_name = serializers.CharField(source='company.name', read_only=True)
     employee_name = serializers.CharField(source='employee.name', read_only=True)
     homologador_nome = serializers.SerializerMethodField()
@@ -44,8 +95,16 @@ class ScheduleSerializer(serializers.ModelSerializer):
     class Meta:
         model = Schedule
         fields = '__all__'
+        read_only_fields = ['demissao_process']
         # Adiciona os campos extras para o frontend
         extra_fields = ['company_name', 'employee_name', 'homologador_nome', 'homologador_email']
+        expandable = {
+            'employee': ('EmployeeSerializer', {}),
+            'company': ('CompanySerializer', {}),
+            'union': ('UnionSerializer', {}),
+            'union_user': ('UserSerializer', {}),
+        }
+        field_sources = {'homologador_nome': ['union_user.first_name', 'union_user.last_name', 'union_user.username']}
 
 class RessalvaSerializer(serializers.Serializer):
     ressalvas = serializers.CharField()
@@ -71,7 +130,7 @@ class CompanyUnionSerializer(serializers.ModelSerializer):
         model = CompanyUnion
         fields = ['id', 'company', 'union']
 
-class UserSerializer(BaseUserSerializer):
+class UserSerializer(SparseFieldsMixin, BaseUserSerializer):
     email = serializers.EmailField(required=True)
     password = serializers.CharField(write_only=True, required=False)
     union = serializers.PrimaryKeyRelatedField(queryset=Union.objects.all(), required=False, allow_null=True)
@@ -82,6 +141,10 @@ class UserSerializer(BaseUserSerializer):
     class Meta(BaseUserSerializer.Meta):
         model = User
         fields = ('id', 'email', 'username', 'role', 'union', 'company', 'company_name', 'union_name', 'password')
+        expandable = {
+            'company': ('CompanySerializer', {}),
+            'union': ('UnionSerializer', {}),
+        }
 
     def validate(self, data):
         role = data.get('role')
@@ -177,7 +240,7 @@ class AgendaBlockSerializer(serializers.ModelSerializer):
         model = AgendaBlock
         fields = ['id', 'union', 'user', 'usuario_nome', 'start', 'end', 'reason', 'is_holiday']
 
-class DemissaoProcessSerializer(serializers.ModelSerializer):
+class DemissaoProcessSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     documents = DocumentSerializer(many=True, read_only=True)
     empresa_nome = serializers.CharField(source='empresa.name', read_only=True)
     sindicato_nome = serializers.CharField(source='sindicato.name', read_only=True)
@@ -186,6 +249,13 @@ class DemissaoProcessSerializer(serializers.ModelSerializer):
     class Meta:
         model = DemissaoProcess
         fields = '__all__'
+        read_only_fields = ['employee']
+        expandable = {
+            'empresa': ('CompanySerializer', {}),
+            'sindicato': ('UnionSerializer', {}),
+            'employee': ('EmployeeSerializer', {}),
+        }
+        field_sources = {'upload_public_url': ['employee_upload_token']}
 
     def get_upload_public_url(self, obj):
         try:
@@ -196,6 +266,29 @@ class DemissaoProcessSerializer(serializers.ModelSerializer):
             return None
         return None
 
+class DemissaoProcessListSerializer(DemissaoProcessSerializer):
+    """Representação leve da listagem: contagem de documentos por status
+    (anotada no queryset) no lugar do array aninhado de documentos, que
+    pode ser pedido com ?expand=documents"""
+    documents = None
+    documentos_total = serializers.IntegerField(read_only=True)
+    documentos_pendentes = serializers.IntegerField(read_only=True)
+    documentos_aprovados = serializers.IntegerField(read_only=True)
+    documentos_recusados = serializers.IntegerField(read_only=True)
+
+    class Meta(DemissaoProcessSerializer.Meta):
+        expandable = {
+            **DemissaoProcessSerializer.Meta.expandable,
+            'documents': ('DocumentSerializer', {'many': True}),
+        }
+        field_sources = {
+            **DemissaoProcessSerializer.Meta.field_sources,
+            'documentos_total': [],
+            'documentos_pendentes': [],
+            'documentos_aprovados': [],
+            'documentos_recusados': [],
+        }
+
 class SystemLogSerializer(serializers.ModelSerializer):
     user_email = serializers.ReadOnlyField()
     user_name = serializers.ReadOnlyField()
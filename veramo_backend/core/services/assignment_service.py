@@ -0,0 +1,166 @@
+"""
+Atribuição automática de homologadores.
+
+Os homologadores elegíveis (com jornada configurada que cobre o horário,
+sem agendamento sobreposto, sem reserva ativa e sem bloqueio de agenda) são
+resolvidos em uma única consulta anotada com a carga de cada um no dia e na
+semana. Os que o cache de free/busy do Google aponta como ocupados são
+descartados, e a escolha entre os restantes é feita por uma política plugável.
+"""
+import logging
+import random
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Exists, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from ..models.block import AgendaBlock
+from ..models.reservation import SlotHold
+from ..models.schedule import Schedule
+from ..models.user import User
+
+logger = logging.getLogger(__name__)
+
+
+def _contagem(queryset):
+    """Subconsulta escalar com a contagem de agendamentos do homologador"""
+    contagem = (queryset.order_by()
+                .values('union_user')
+                .annotate(total=Count('id'))
+                .values('total'))
+    return Coalesce(Subquery(contagem, output_field=IntegerField()), 0)
+
+
+def homologadores_disponiveis(union_id, dia, inicio, fim):
+    """
+    Retorna os homologadores livres para o horário, em uma única consulta,
+    como dicts {'id', 'carga_dia', 'carga_semana'}.
+    """
+    segunda = dia - timedelta(days=dia.weekday())
+    domingo = segunda + timedelta(days=6)
+    inicio_dt = timezone.make_aware(datetime.combine(dia, inicio))
+    fim_dt = timezone.make_aware(datetime.combine(dia, fim))
+
+    conflitos = Schedule.objects.filter(
+        union_user=OuterRef('pk'),
+        date=dia,
+        start_time__lt=fim,
+        end_time__gt=inicio,
+    )
+    reservas = SlotHold.objects.filter(
+        union_user=OuterRef('pk'),
+        date=dia,
+        start_time__lt=fim,
+        end_time__gt=inicio,
+        expires_at__gt=timezone.now(),
+    )
+    bloqueios = AgendaBlock.objects.filter(
+        Q(user=OuterRef('pk')) | Q(user__isnull=True),
+        union_id=union_id,
+        start__lt=fim_dt,
+        end__gt=inicio_dt,
+    )
+    agendamentos_ativos = Schedule.objects.filter(union_user=OuterRef('pk')).exclude(status='cancelado')
+
+    candidatos = (User.objects
+                  .filter(union_id=union_id,
+                          scheduleconfig__weekday=dia.weekday(),
+                          scheduleconfig__start_time__lte=inicio,
+                          scheduleconfig__end_time__gte=fim)
+                  .filter(~Exists(conflitos), ~Exists(reservas), ~Exists(bloqueios))
+                  .annotate(carga_dia=_contagem(agendamentos_ativos.filter(date=dia)),
+                            carga_semana=_contagem(agendamentos_ativos.filter(date__gte=segunda,
+                                                                             date__lte=domingo)))
+                  .order_by('id')
+                  .values('id', 'carga_dia', 'carga_semana')
+                  .distinct())
+    return list(candidatos)
+
+
+class PoliticaAtribuicao:
+    """Política de escolha entre os homologadores disponíveis"""
+
+    def escolher(self, union_id, candidatos):
+        raise NotImplementedError
+
+
+class PoliticaAleatoria(PoliticaAtribuicao):
+    def escolher(self, union_id, candidatos):
+        return random.choice(candidatos)
+
+
+class PoliticaMenorCarga(PoliticaAtribuicao):
+    """Escolhe o homologador com menos agendamentos no período (empate: aleatório)"""
+
+    def __init__(self, campo):
+        self.campo = campo
+
+    def escolher(self, union_id, candidatos):
+        menor = min(c[self.campo] for c in candidatos)
+        return random.choice([c for c in candidatos if c[self.campo] == menor])
+
+
+class PoliticaRodizio(PoliticaAtribuicao):
+    """
+    Round-robin por sindicato: um contador no cache, incrementado de forma
+    atômica (cache.incr), escolhe a posição entre os candidatos (por id), então
+    atribuições simultâneas recebem vezes diferentes.
+    """
+
+    def escolher(self, union_id, candidatos):
+        chave = f'assignment:rr:{union_id}'
+        cache.add(chave, 0, None)
+        try:
+            vez = cache.incr(chave)
+        except ValueError:
+            # Chave removida do cache entre o add e o incr: recomeça o rodízio
+            cache.add(chave, 1, None)
+            vez = 1
+        return candidatos[(vez - 1) % len(candidatos)]
+
+
+POLITICAS = {
+    'menor_carga_dia': PoliticaMenorCarga('carga_dia'),
+    'menor_carga_semana': PoliticaMenorCarga('carga_semana'),
+    'rodizio': PoliticaRodizio(),
+    'aleatorio': PoliticaAleatoria(),
+}
+
+
+def obter_politica(nome=None):
+    nome = nome or getattr(settings, 'HOMOLOGADOR_ASSIGNMENT_POLICY', 'menor_carga_dia')
+    try:
+        return POLITICAS[nome]
+    except KeyError:
+        logger.warning(f"Política de atribuição desconhecida '{nome}', usando menor_carga_dia")
+        return POLITICAS['menor_carga_dia']
+
+
+def _livres_no_google(candidatos, dia, inicio, fim):
+    """Descarta candidatos ocupados segundo o cache de free/busy do Google (sem chamar o Google)"""
+    try:
+        from app_google.services.freebusy_service import ocupacao_em_cache, sobrepoe
+    except ImportError:
+        return candidatos
+    ocupacao = ocupacao_em_cache([c['id'] for c in candidatos], dia)
+    if not ocupacao:
+        return candidatos
+    inicio_min = inicio.hour * 60 + inicio.minute
+    fim_min = fim.hour * 60 + fim.minute
+    return [c for c in candidatos if not sobrepoe(ocupacao.get(c['id'], ()), inicio_min, fim_min)]
+
+
+def atribuir_homologador(union_id, dia, inicio, fim, politica=None, excluir=()):
+    """
+    Seleciona um homologador livre para o horário segundo a política
+    configurada. Retorna o id do homologador ou None se não houver vagas.
+    `excluir` descarta homologadores que já perderam a disputa pelo horário.
+    """
+    candidatos = [c for c in homologadores_disponiveis(union_id, dia, inicio, fim) if c['id'] not in excluir]
+    candidatos = _livres_no_google(candidatos, dia, inicio, fim)
+    if not candidatos:
+        return None
+    return obter_politica(politica).escolher(union_id, candidatos)['id']
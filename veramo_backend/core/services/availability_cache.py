@@ -0,0 +1,182 @@
+"""
+Cache das disponibilidades calculadas por sindicato/dia.
+
+Cada snapshot guarda os slots livres (por homologador, antes do
+agrupamento) de um (sindicato, dia) junto com as versões vigentes no
+momento do cálculo:
+
+- geração do sindicato: incrementada quando uma ScheduleConfig, um
+  AgendaBlock ou um homologador do sindicato é alterado;
+- versão do dia: incrementada quando um Schedule daquele dia é alterado.
+
+Um snapshot só é servido se as duas versões ainda forem as atuais, então
+uma escrita concorrente com o cálculo nunca deixa resultado desatualizado
+no cache. As versões são incrementadas só depois do commit de quem
+escreveu: um cálculo concorrente com a transação lê os dados anteriores ao
+commit, mas grava o snapshot com a versão que o commit torna obsoleta.
+
+Dias com reservas temporárias ativas expiram do cache junto com a primeira
+reserva, já que a expiração não dispara nenhum sinal. As invalidações são
+disparadas pelos sinais em core/signals.py.
+"""
+import math
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+PREFIXO = 'availability'
+CHAVE_HITS = f'{PREFIXO}:stats:hits'
+CHAVE_MISSES = f'{PREFIXO}:stats:misses'
+
+
+def cache_habilitado():
+    return getattr(settings, 'AVAILABILITY_CACHE_ENABLED', False)
+
+
+def _timeout():
+    return getattr(settings, 'AVAILABILITY_CACHE_TIMEOUT', 300)
+
+
+def _chave_geracao(union_id):
+    return f'{PREFIXO}:gen:{union_id}'
+
+
+def _chave_versao_dia(union_id, dia):
+    return f'{PREFIXO}:ver:{union_id}:{dia.isoformat()}'
+
+
+def _chave_snapshot(union_id, dia):
+    return f'{PREFIXO}:slots:{union_id}:{dia.isoformat()}'
+
+
+def _nova_versao():
+    # Valor único: uma chave de versão despejada do cache nunca volta a um valor já usado
+    return time.time_ns()
+
+
+def _incrementar(chave):
+    try:
+        cache.incr(chave)
+    except ValueError:
+        cache.set(chave, _nova_versao(), None)
+
+
+def _contar(chave, quantidade):
+    if not quantidade:
+        return
+    try:
+        cache.incr(chave, quantidade)
+    except ValueError:
+        cache.add(chave, 0, None)
+        try:
+            cache.incr(chave, quantidade)
+        except ValueError:
+            pass
+
+
+def _versoes(union_id, dias, valores):
+    """Obtém (ou inicializa) as versões vigentes do sindicato e de cada dia"""
+    chaves = {_chave_geracao(union_id): None}
+    chaves.update({_chave_versao_dia(union_id, dia): dia for dia in dias})
+
+    versoes = {}
+    for chave in chaves:
+        versao = valores.get(chave)
+        if versao is None:
+            # add não sobrescreve uma versão criada concorrentemente por outro worker
+            versao = _nova_versao()
+            if not cache.add(chave, versao, None):
+                versao = cache.get(chave, versao)
+        versoes[chave] = versao
+
+    geracao = versoes[_chave_geracao(union_id)]
+    versoes_dia = {dia: versoes[chave] for chave, dia in chaves.items() if dia is not None}
+    return geracao, versoes_dia
+
+
+def slots_livres_periodo(union_id, date_from, date_to):
+    """
+    Retorna {dia: slots livres por homologador} da janela, servindo do cache
+    os dias com snapshot válido e calculando os demais com um único índice.
+    """
+    from .availability_service import AvailabilityIndex
+
+    dias = [date_from + timedelta(days=i) for i in range((date_to - date_from).days + 1)]
+    if not cache_habilitado():
+        index = AvailabilityIndex(union_id, date_from, date_to)
+        return {dia: index.slots_livres(dia) for dia in dias}
+
+    chaves = [_chave_geracao(union_id)]
+    chaves += [_chave_versao_dia(union_id, dia) for dia in dias]
+    chaves += [_chave_snapshot(union_id, dia) for dia in dias]
+    valores = cache.get_many(chaves)
+    geracao, versoes_dia = _versoes(union_id, dias, valores)
+
+    resultado = {}
+    faltantes = []
+    for dia in dias:
+        snapshot = valores.get(_chave_snapshot(union_id, dia))
+        if snapshot and snapshot[0] == geracao and snapshot[1] == versoes_dia[dia]:
+            resultado[dia] = snapshot[2]
+        else:
+            faltantes.append(dia)
+
+    _contar(CHAVE_HITS, len(resultado))
+    _contar(CHAVE_MISSES, len(faltantes))
+
+    if faltantes:
+        index = AvailabilityIndex(union_id, faltantes[0], faltantes[-1])
+        novos = {}
+        agora = timezone.now()
+        for dia in faltantes:
+            resultado[dia] = index.slots_livres(dia)
+            snapshot = (geracao, versoes_dia[dia], resultado[dia])
+            expiracao = index.expiracao_reservas.get(dia)
+            if expiracao is None:
+                novos[_chave_snapshot(union_id, dia)] = snapshot
+            else:
+                restante = math.ceil((expiracao - agora).total_seconds())
+                if restante > 0:
+                    cache.set(_chave_snapshot(union_id, dia), snapshot, min(_timeout(), restante))
+        cache.set_many(novos, _timeout())
+
+    return resultado
+
+
+def slots_livres_dia(union_id, dia):
+    """Slots livres por homologador de um único dia (com cache)"""
+    return slots_livres_periodo(union_id, dia, dia)[dia]
+
+
+def invalidar_dia(union_id, dia):
+    """Invalida o snapshot de um (sindicato, dia) no commit da transação atual"""
+    if union_id is None or dia is None:
+        return
+    chave = _chave_versao_dia(union_id, dia)
+    transaction.on_commit(lambda: _incrementar(chave))
+
+
+def invalidar_sindicato(union_id):
+    """Invalida todos os snapshots de um sindicato no commit da transação atual"""
+    if union_id is None:
+        return
+    chave = _chave_geracao(union_id)
+    transaction.on_commit(lambda: _incrementar(chave))
+
+
+def estatisticas():
+    """Contadores de acertos/falhas do cache de disponibilidade"""
+    valores = cache.get_many([CHAVE_HITS, CHAVE_MISSES])
+    hits = valores.get(CHAVE_HITS, 0)
+    misses = valores.get(CHAVE_MISSES, 0)
+    total = hits + misses
+    return {
+        'enabled': cache_habilitado(),
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 4) if total else None,
+    }
@@ -0,0 +1,354 @@
+"""
+Motor de disponibilidade das agendas de homologação.
+
+Carrega configurações, agendamentos, reservas e bloqueios de um sindicato para uma
+janela de datas em um número fixo de consultas e calcula os horários
+livres de cada homologador em memória.
+"""
+import bisect
+import random
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+from ..models.block import AgendaBlock
+from ..models.config import ScheduleConfig
+from ..models.reservation import SlotHold
+from ..models.schedule import Schedule
+from . import availability_cache
+
+MINUTOS_DIA = 24 * 60
+
+
+def _minutos(valor):
+    """Converte um time em minutos desde a meia-noite"""
+    return valor.hour * 60 + valor.minute
+
+
+def _horario(minutos):
+    """Converte minutos desde a meia-noite em time"""
+    return time(minutos // 60, minutos % 60)
+
+
+def _hhmm(minutos):
+    """Formata minutos desde a meia-noite como HH:MM (24:00 representa o fim do dia)"""
+    return f"{minutos // 60:02d}:{minutos % 60:02d}"
+
+
+def _local(dt):
+    """Normaliza um datetime para horário local sem timezone"""
+    if timezone.is_aware(dt):
+        dt = timezone.localtime(dt)
+    return dt.replace(tzinfo=None)
+
+
+def _mesclar(intervalos):
+    """Ordena e mescla intervalos sobrepostos [(inicio, fim), ...]"""
+    mesclados = []
+    for inicio, fim in sorted(intervalos):
+        if mesclados and inicio <= mesclados[-1][1]:
+            if fim > mesclados[-1][1]:
+                mesclados[-1][1] = fim
+        else:
+            mesclados.append([inicio, fim])
+    return [tuple(intervalo) for intervalo in mesclados]
+
+
+def nome_homologador(user):
+    """Usa first_name + last_name ou username como fallback"""
+    if user.first_name or user.last_name:
+        return f"{user.first_name} {user.last_name}".strip()
+    return user.username
+
+
+class AvailabilityIndex:
+    """
+    Índice de ocupação em memória de um sindicato para uma janela de datas.
+
+    São executadas sempre quatro consultas (configurações, agendamentos,
+    reservas temporárias e bloqueios), independentemente do número de
+    homologadores ou de slots. `expiracao_reservas` guarda, por dia, a
+    expiração da primeira reserva ativa, até quando o resultado é válido.
+    Para cada homologador/dia é mantida uma lista ordenada de intervalos
+    ocupados (em minutos), consultada por busca binária.
+    """
+
+    def __init__(self, union_id, date_from, date_to=None):
+        self.union_id = union_id
+        self.date_from = date_from
+        self.date_to = date_to or date_from
+        self._configs_por_weekday = defaultdict(list)
+        self._ocupado = {}
+        self.expiracao_reservas = {}
+        self._carregar()
+
+    def _carregar(self):
+        dias = (self.date_to - self.date_from).days + 1
+        weekdays = {(self.date_from + timedelta(days=i)).weekday() for i in range(min(dias, 7))}
+
+        # 1. Configurações dos membros do sindicato para os dias da janela
+        configs = (ScheduleConfig.objects
+                   .filter(union_user__union_id=self.union_id, weekday__in=weekdays)
+                   .select_related('union_user')
+                   .order_by('id'))
+        for config in configs:
+            self._configs_por_weekday[config.weekday].append(config)
+
+        ocupado = defaultdict(list)
+
+        # 2. Agendamentos existentes na janela
+        agendamentos = (Schedule.objects
+                        .filter(union_id=self.union_id,
+                                date__gte=self.date_from,
+                                date__lte=self.date_to,
+                                union_user__isnull=False)
+                        .values_list('union_user_id', 'date', 'start_time', 'end_time'))
+        for user_id, dia, inicio, fim in agendamentos:
+            ocupado[(user_id, dia)].append((_minutos(inicio), _minutos(fim)))
+
+        # 3. Reservas temporárias ainda ativas
+        reservas = (SlotHold.objects
+                    .filter(union_id=self.union_id,
+                            date__gte=self.date_from,
+                            date__lte=self.date_to,
+                            expires_at__gt=timezone.now())
+                    .values_list('union_user_id', 'date', 'start_time', 'end_time', 'expires_at'))
+        for user_id, dia, inicio, fim, expira in reservas:
+            ocupado[(user_id, dia)].append((_minutos(inicio), _minutos(fim)))
+            if dia not in self.expiracao_reservas or expira < self.expiracao_reservas[dia]:
+                self.expiracao_reservas[dia] = expira
+
+        # 4. Bloqueios de agenda (individuais ou do sindicato inteiro) que tocam a janela
+        inicio_janela = timezone.make_aware(datetime.combine(self.date_from, time.min))
+        fim_janela = timezone.make_aware(datetime.combine(self.date_to + timedelta(days=1), time.min))
+        bloqueios = (AgendaBlock.objects
+                     .filter(union_id=self.union_id, start__lt=fim_janela, end__gt=inicio_janela)
+                     .values_list('user_id', 'start', 'end'))
+        for user_id, inicio, fim in bloqueios:
+            inicio, fim = _local(inicio), _local(fim)
+            dia = max(inicio.date(), self.date_from)
+            while dia <= min(fim.date(), self.date_to):
+                ini_min = _minutos(inicio.time()) if dia == inicio.date() else 0
+                fim_min = _minutos(fim.time()) if dia == fim.date() else MINUTOS_DIA
+                if fim_min > ini_min:
+                    ocupado[(user_id, dia)].append((ini_min, fim_min))
+                dia += timedelta(days=1)
+
+        for chave, intervalos in ocupado.items():
+            mesclados = _mesclar(intervalos)
+            self._ocupado[chave] = ([inicio for inicio, _ in mesclados], mesclados)
+
+    def _ocupado_em(self, chave, inicio, fim):
+        entrada = self._ocupado.get(chave)
+        if not entrada:
+            return False
+        inicios, intervalos = entrada
+        pos = bisect.bisect_left(inicios, fim)
+        return pos > 0 and intervalos[pos - 1][1] > inicio
+
+    def esta_livre(self, user_id, dia, inicio, fim):
+        """Indica se o homologador não tem agendamento, reserva nem bloqueio no intervalo (minutos)"""
+        return not (self._ocupado_em((user_id, dia), inicio, fim)
+                    or self._ocupado_em((None, dia), inicio, fim))
+
+    def intervalos_ocupados(self, user_id, dia):
+        """Intervalos ocupados (minutos) do homologador no dia, incluindo bloqueios do sindicato"""
+        proprios = self._ocupado.get((user_id, dia), ([], []))[1]
+        sindicato = self._ocupado.get((None, dia), ([], []))[1]
+        return _mesclar(list(proprios) + list(sindicato))
+
+    def configs(self, dia):
+        """Configurações de jornada aplicáveis ao dia"""
+        return self._configs_por_weekday.get(dia.weekday(), [])
+
+    def slots_livres(self, dia):
+        """
+        Lista os slots livres de cada homologador no dia, no mesmo formato
+        retornado historicamente por available_slots (antes do agrupamento).
+        """
+        slots = []
+        for config in self.configs(dia):
+            user = config.union_user
+            duracao = config.duration_minutes
+            if duracao <= 0:
+                continue
+            user_name = nome_homologador(user)
+            atual = _minutos(config.start_time)
+            fim_jornada = _minutos(config.end_time)
+
+            while atual + duracao <= fim_jornada:
+                fim_slot = atual + duracao
+                if self.esta_livre(user.id, dia, atual, fim_slot):
+                    inicio_dt = datetime.combine(dia, _horario(atual))
+                    fim_dt = datetime.combine(dia, _horario(fim_slot))
+                    start_time = inicio_dt.strftime('%H:%M')
+                    end_time = fim_dt.strftime('%H:%M')
+                    slots.append({
+                        'user_id': user.id,
+                        'user_name': user_name,
+                        'start': inicio_dt.isoformat(),
+                        'end': fim_dt.isoformat(),
+                        'start_time': start_time,
+                        'end_time': end_time,
+                        'duration_minutes': duracao,
+                        'time_key': f"{start_time}-{end_time}",
+                    })
+                # Avançar pelo intervalo definido na configuração
+                atual += duracao
+        return slots
+
+
+def sem_ocupacao_google(slots, dia):
+    """
+    Remove os slots que o cache de free/busy do Google Calendar aponta como
+    ocupados. Consulta apenas o cache (nunca chama o Google).
+    """
+    try:
+        from app_google.services.freebusy_service import ocupacao_em_cache, sobrepoe
+    except ImportError:
+        return slots
+    ocupacao = ocupacao_em_cache({slot['user_id'] for slot in slots}, dia)
+    if not ocupacao:
+        return slots
+    return [
+        slot for slot in slots
+        if not sobrepoe(ocupacao.get(slot['user_id'], ()),
+                        _minutos(time.fromisoformat(slot['start_time'])),
+                        _minutos(time.fromisoformat(slot['end_time'])))
+    ]
+
+
+def agrupar_por_horario(slots):
+    """
+    Agrupa slots por horário e seleciona um homologador aleatório para cada
+    horário, informando quantas vagas existem em cada um.
+    """
+    slots_por_horario = defaultdict(list)
+    for slot in slots:
+        slots_por_horario[slot['time_key']].append(slot)
+
+    unicos = []
+    for slots_do_horario in slots_por_horario.values():
+        selecionado = dict(random.choice(slots_do_horario))
+        selecionado['available_vacancies'] = len(slots_do_horario)
+        selecionado['total_homologadores'] = len(slots_do_horario)
+        unicos.append(selecionado)
+
+    unicos.sort(key=lambda slot: slot['start_time'])
+    return unicos
+
+
+def _dias(date_from, date_to):
+    dia = date_from
+    while dia <= date_to:
+        yield dia
+        dia += timedelta(days=1)
+
+
+def disponibilidade_periodo(union_id, date_from, date_to):
+    """
+    Calcula os horários disponíveis (agrupados por horário) de todos os dias
+    da janela. Os dias sem snapshot em cache são calculados com um único
+    índice, isto é, com o mesmo número fixo de consultas de um dia isolado.
+    """
+    slots = availability_cache.slots_livres_periodo(union_id, date_from, date_to)
+    return {dia: agrupar_por_horario(sem_ocupacao_google(slots[dia], dia)) for dia in _dias(date_from, date_to)}
+
+
+def proximos_slots_livres(union_id, apos, limite, horizonte_dias, bloco_dias=7):
+    """
+    Retorna os primeiros `limite` horários livres a partir de `apos`.
+
+    A busca avança em blocos de `bloco_dias` (no máximo quatro consultas por
+    bloco) e para assim que encontra horários suficientes ou atinge o horizonte.
+    """
+    encontrados = []
+    inicio = apos.date()
+    ultimo_dia = inicio + timedelta(days=horizonte_dias - 1)
+
+    while inicio <= ultimo_dia and len(encontrados) < limite:
+        fim = min(inicio + timedelta(days=bloco_dias - 1), ultimo_dia)
+        for dia, slots in disponibilidade_periodo(union_id, inicio, fim).items():
+            for slot in slots:
+                if datetime.fromisoformat(slot['start']) < apos:
+                    continue
+                slot['date'] = dia.isoformat()
+                encontrados.append(slot)
+                if len(encontrados) >= limite:
+                    return encontrados
+        inicio = fim + timedelta(days=1)
+
+    return encontrados
+
+
+def _runs(jornadas, ocupados, inicio, fim, resolucao):
+    """
+    Codifica o dia em células de `resolucao` minutos como runs [estado, n]:
+    'B' ocupado, 'F' livre dentro da jornada, 'O' fora da jornada.
+    """
+    runs = []
+    for celula in range(inicio, fim, resolucao):
+        fim_celula = celula + resolucao
+        if any(i < fim_celula and f > celula for i, f in ocupados):
+            estado = 'B'
+        elif any(i <= celula and fim_celula <= f for i, f in jornadas):
+            estado = 'F'
+        else:
+            estado = 'O'
+        if runs and runs[-1][0] == estado:
+            runs[-1][1] += 1
+        else:
+            runs.append([estado, 1])
+    return runs
+
+
+def matriz_ocupacao(union_id, date_from, date_to, resolucao=15):
+    """
+    Grade livre/ocupado de todos os homologadores do sindicato na janela,
+    calculada com as consultas fixas do AvailabilityIndex mais a dos usuários.
+
+    Para cada homologador/dia são retornadas as jornadas, os intervalos
+    ocupados (agendamentos, reservas e bloqueios mesclados) e a grade em
+    runs (ver _runs) entre o início e o fim globais de jornada do sindicato.
+    """
+    from ..models.user import User
+
+    index = AvailabilityIndex(union_id, date_from, date_to)
+    homologadores = list(User.objects.filter(union_id=union_id).order_by('first_name', 'username')
+                         .only('id', 'username', 'first_name', 'last_name'))
+    dias = list(_dias(date_from, date_to))
+
+    jornadas = defaultdict(list)
+    for dia in dias:
+        for config in index.configs(dia):
+            jornadas[(config.union_user_id, dia)].append(
+                (_minutos(config.start_time), _minutos(config.end_time)))
+    limites = [intervalo for intervalos in jornadas.values() for intervalo in intervalos]
+    inicio_dia = min((i for i, _ in limites), default=8 * 60)
+    fim_dia = max((f for _, f in limites), default=18 * 60)
+    # Alinha o fim à resolução para que todas as linhas tenham o mesmo número de células
+    fim_dia = inicio_dia + -(-(fim_dia - inicio_dia) // resolucao) * resolucao
+
+    def _fmt(intervalos):
+        return [[_hhmm(i), _hhmm(f)] for i, f in intervalos]
+
+    linhas = []
+    for user in homologadores:
+        linha = {'user_id': user.id, 'user_name': nome_homologador(user), 'days': {}}
+        for dia in dias:
+            jornada = _mesclar(jornadas.get((user.id, dia), []))
+            ocupados = index.intervalos_ocupados(user.id, dia)
+            linha['days'][dia.isoformat()] = {
+                'work': _fmt(jornada),
+                'busy': _fmt(ocupados),
+                'runs': _runs(jornada, ocupados, inicio_dia, fim_dia, resolucao),
+            }
+        linhas.append(linha)
+
+    return {
+        'day_start': _hhmm(inicio_dia),
+        'day_end': _hhmm(fim_dia),
+        'resolution': resolucao,
+        'users': linhas,
+    }
@@ -0,0 +1,220 @@
+"""
+Agendamento em lote de homologações (demissões em massa).
+
+O lote é resolvido em três etapas:
+
+1. planejamento: os horários livres da janela são calculados com um único
+   AvailabilityIndex por sindicato e distribuídos entre os processos por
+   empacotamento guloso (horário mais cedo primeiro; em empate, o
+   homologador com menos atribuições no lote);
+2. gravação: as agendas envolvidas são travadas, o status dos processos e o
+   plano são revalidados dentro da transação (um agendamento concorrente do
+   mesmo processo o deixa fora do lote) e os Schedules são criados com
+   bulk_create;
+3. pós-processamento: a criação de cada sala do Google Meet é enfileirada
+   (GoogleCalendarJob) na mesma transação; o worker cria as salas e envia as
+   notificações, fora do ciclo da requisição.
+"""
+import logging
+from collections import defaultdict
+from datetime import datetime, time
+from itertools import groupby
+
+from django.db import transaction
+from django.utils import timezone
+
+from ..models.demissao_process import DemissaoProcess
+from ..models.employee import Employee
+from ..models.schedule import Schedule
+from . import availability_cache
+from .availability_service import AvailabilityIndex, _dias, _minutos, sem_ocupacao_google
+from .counters import incrementar
+from .reservation_service import travar_agendas
+
+logger = logging.getLogger(__name__)
+
+LINK_PADRAO = 'https://meet.google.com'
+
+AGENDADO = 'scheduled'
+SEM_HORARIO = 'no_slot'
+CONFLITO = 'conflict'
+STATUS_INVALIDO = 'invalid_status'
+NAO_ENCONTRADO = 'not_found'
+
+
+def _planejar(index, processos, date_from, date_to):
+    """Distribui os processos nos horários livres; retorna {processo_id: (dia, slot)}"""
+    agora = timezone.localtime().replace(tzinfo=None)
+    livres = [
+        (dia, slot)
+        for dia in _dias(date_from, date_to)
+        for slot in sem_ocupacao_google(index.slots_livres(dia), dia)
+        if datetime.fromisoformat(slot['start']) > agora
+    ]
+    livres.sort(key=lambda item: (item[0], item[1]['start_time']))
+
+    pendentes = list(processos)
+    ocupados = defaultdict(list)
+    carga = defaultdict(int)
+    plano = {}
+    for _, grupo in groupby(livres, key=lambda item: (item[0], item[1]['start_time'])):
+        if not pendentes:
+            break
+        grupo = sorted(grupo, key=lambda item: (carga[item[1]['user_id']], item[1]['user_id']))
+        for dia, slot in grupo:
+            if not pendentes:
+                break
+            inicio = _minutos(time.fromisoformat(slot['start_time']))
+            fim = _minutos(time.fromisoformat(slot['end_time']))
+            chave = (slot['user_id'], dia)
+            # Jornadas sobrepostas do mesmo homologador geram slots que se cruzam
+            if any(i < fim and f > inicio for i, f in ocupados[chave]):
+                continue
+            ocupados[chave].append((inicio, fim))
+            carga[slot['user_id']] += 1
+            plano[pendentes.pop(0).id] = (dia, slot)
+    return plano
+
+
+def _funcionarios(processos):
+    """Funcionário de cada processo, criando e vinculando em lote os que faltam"""
+    novos = {}
+    for processo in processos:
+        if processo.employee_id is None:
+            novos[processo.id] = Employee(name=processo.nome_funcionario, company_id=processo.empresa_id,
+                                          union_id=processo.sindicato_id, status='ativo')
+    Employee.objects.bulk_create(novos.values())
+    for processo in processos:
+        if processo.id in novos:
+            processo.employee = novos[processo.id]
+    return {p.id: p.employee_id for p in processos}
+
+
+def _invalidar_dias(union_id, dias):
+    for dia in dias:
+        availability_cache.invalidar_dia(union_id, dia)
+
+
+def _gravar(union_id, processos, plano, solicitante_email=None):
+    """
+    Cria os agendamentos do plano; retorna ({processo_id: schedule},
+    [processos em conflito], [processos que deixaram de estar aptos])
+    """
+    por_id = {p.id: p for p in processos}
+    with transaction.atomic():
+        travar_agendas((slot['user_id'], dia) for dia, slot in plano.values())
+        # O status foi lido antes da trava: outra requisição pode ter agendado o processo
+        aptos = set(DemissaoProcess.objects.select_for_update()
+                    .filter(id__in=plano, status='documentos_aprovados')
+                    .values_list('id', flat=True))
+        invalidos = [processo_id for processo_id in plano if processo_id not in aptos]
+        dias = [dia for dia, _ in plano.values()]
+        index = AvailabilityIndex(union_id, min(dias), max(dias))
+
+        confirmados, conflitos = {}, []
+        for processo_id, (dia, slot) in plano.items():
+            if processo_id not in aptos:
+                continue
+            inicio = time.fromisoformat(slot['start_time'])
+            fim = time.fromisoformat(slot['end_time'])
+            if index.esta_livre(slot['user_id'], dia, _minutos(inicio), _minutos(fim)):
+                confirmados[processo_id] = (slot['user_id'], dia, inicio, fim)
+            else:
+                conflitos.append(processo_id)
+
+        funcionarios = _funcionarios([por_id[pid] for pid in confirmados])
+        schedules = {}
+        for processo_id, (user_id, dia, inicio, fim) in confirmados.items():
+            processo = por_id[processo_id]
+            schedules[processo_id] = Schedule(
+                employee_id=funcionarios[processo_id],
+                demissao_process_id=processo_id,
+                company_id=processo.empresa_id,
+                union_id=processo.sindicato_id,
+                union_user_id=user_id,
+                date=dia,
+                start_time=inicio,
+                end_time=fim,
+                status='agendado',
+                video_link=LINK_PADRAO,
+            )
+        Schedule.objects.bulk_create(schedules.values())
+        # bulk_create não dispara o sinal que mantém o contador do painel
+        incrementar('schedules', len(schedules))
+
+        atualizados = []
+        for processo_id in confirmados:
+            processo = por_id[processo_id]
+            processo.status = 'agendado'
+            processo.video_link = LINK_PADRAO
+            atualizados.append(processo)
+        DemissaoProcess.objects.bulk_update(atualizados, ['employee'])
+        # Condicional ao status, como em agendar (processos já travados acima)
+        DemissaoProcess.objects.filter(id__in=confirmados, status='documentos_aprovados').update(
+            status='agendado', video_link=LINK_PADRAO)
+
+        from app_google.services.calendar_jobs import enfileirar_criacao
+        for processo_id, schedule in schedules.items():
+            processo = por_id[processo_id]
+            enfileirar_criacao(
+                schedule,
+                titulo=f"Homologação – {processo.nome_funcionario} – {processo.empresa.name}",
+                attendees=[processo.email_funcionario, solicitante_email],
+                processo=processo,
+                notificar=True,
+            )
+
+        # bulk_create não dispara os sinais que invalidam o cache de disponibilidade
+        _invalidar_dias(union_id, {dia for _, dia, _, _ in confirmados.values()})
+
+    return schedules, conflitos, invalidos
+
+
+def agendar_lote(queryset, process_ids, date_from, date_to, solicitante=None):
+    """
+    Agenda os processos informados (na ordem de prioridade recebida) nos
+    primeiros horários livres da janela. `queryset` limita os processos ao
+    escopo do usuário. Retorna um relatório com o resultado de cada processo.
+    """
+    processos = {p.id: p for p in queryset.filter(id__in=process_ids).select_related('empresa')}
+    resultados = {}
+    elegiveis = defaultdict(list)
+    for process_id in process_ids:
+        processo = processos.get(process_id)
+        if processo is None:
+            resultados[process_id] = {'status': NAO_ENCONTRADO, 'error': 'Processo não encontrado'}
+        elif processo.status != 'documentos_aprovados':
+            resultados[process_id] = {'status': STATUS_INVALIDO,
+                                      'error': 'Processo deve estar com documentos aprovados para agendar'}
+        else:
+            elegiveis[processo.sindicato_id].append(processo)
+
+    solicitante_email = getattr(solicitante, 'email', None)
+    for union_id, processos_sindicato in elegiveis.items():
+        index = AvailabilityIndex(union_id, date_from, date_to)
+        plano = _planejar(index, processos_sindicato, date_from, date_to)
+        schedules, conflitos, invalidos = (_gravar(union_id, processos_sindicato, plano, solicitante_email)
+                                           if plano else ({}, [], []))
+
+        for processo in processos_sindicato:
+            schedule = schedules.get(processo.id)
+            if schedule is not None:
+                resultados[processo.id] = {
+                    'status': AGENDADO,
+                    'schedule_id': schedule.id,
+                    'user_id': schedule.union_user_id,
+                    'date': schedule.date.isoformat(),
+                    'start_time': schedule.start_time.strftime('%H:%M'),
+                    'end_time': schedule.end_time.strftime('%H:%M'),
+                }
+            elif processo.id in invalidos:
+                resultados[processo.id] = {'status': STATUS_INVALIDO,
+                                           'error': 'Processo foi alterado durante o agendamento; recarregue'}
+            elif processo.id in conflitos:
+                resultados[processo.id] = {'status': CONFLITO,
+                                           'error': 'Horário ocupado durante o agendamento; tente novamente'}
+            else:
+                resultados[processo.id] = {'status': SEM_HORARIO,
+                                           'error': 'Nenhum horário livre na janela informada'}
+
+    return [{'process_id': process_id, **resultados[process_id]} for process_id in process_ids]
@@ -0,0 +1,104 @@
+"""
+Contadores do painel administrativo (DashboardView).
+
+Os totais de empresas, sindicatos e agendamentos ficam na tabela Counter,
+incrementados/decrementados com UPDATE ... SET value = value + n pelos
+sinais de criação e remoção (na transação da própria escrita, então um
+rollback desfaz também a contagem). O comando `reconciliar_contadores`
+recalcula os valores periodicamente, cobrindo operações em lote que não
+disparam sinais (bulk_create, update).
+
+Os últimos acessos ficam num buffer circular (RecentAccess) atualizado a
+cada login, com um registro por usuário e no máximo
+DASHBOARD_RECENT_ACCESSES registros.
+"""
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from ..models.company import Company
+from ..models.counter import Counter, RecentAccess
+from ..models.schedule import Schedule
+from ..models.union import Union
+from ..models.user import User
+
+logger = logging.getLogger(__name__)
+
+# nome do contador -> modelo contado
+CONTADORES = {
+    'companies': Company,
+    'unions': Union,
+    'schedules': Schedule,
+}
+
+
+def _capacidade_acessos():
+    return getattr(settings, 'DASHBOARD_RECENT_ACCESSES', 10)
+
+
+def incrementar(nome, delta=1):
+    if not Counter.objects.filter(name=nome).update(value=F('value') + delta):
+        # Primeiro uso: parte da contagem real (que já inclui esta escrita)
+        Counter.objects.get_or_create(name=nome, defaults={'value': CONTADORES[nome].objects.count()})
+
+
+def valores():
+    """{nome: valor} de todos os contadores, em uma consulta"""
+    atuais = dict(Counter.objects.filter(name__in=CONTADORES).values_list('name', 'value'))
+    for nome in set(CONTADORES) - set(atuais):
+        incrementar(nome, 0)
+        atuais[nome] = Counter.objects.get(name=nome).value
+    return atuais
+
+
+def registrar_acesso(user):
+    """Coloca o usuário no buffer de últimos acessos"""
+    with transaction.atomic():
+        if RecentAccess.objects.filter(user=user).update(last_login=user.last_login):
+            return
+        acessos = list(RecentAccess.objects.select_for_update().order_by('last_login', 'id'))
+        if len(acessos) < _capacidade_acessos():
+            RecentAccess.objects.create(user=user, last_login=user.last_login)
+            return
+        # Buffer cheio: o acesso mais antigo dá lugar ao novo
+        mais_antigo = acessos[0]
+        mais_antigo.user = user
+        mais_antigo.last_login = user.last_login
+        mais_antigo.save(update_fields=['user', 'last_login'])
+
+
+def ultimos_acessos():
+    return [
+        {
+            'id': acesso.user_id,
+            'username': acesso.user.username,
+            'email': acesso.user.email,
+            'last_login': acesso.last_login,
+        }
+        for acesso in RecentAccess.objects.select_related('user').order_by('-last_login')
+    ]
+
+
+def reconciliar():
+    """Recalcula contadores e buffer de acessos; retorna {nome: (antes, depois)} dos que divergiam"""
+    divergentes = {}
+    with transaction.atomic():
+        atuais = dict(Counter.objects.select_for_update().values_list('name', 'value'))
+        for nome, modelo in CONTADORES.items():
+            total = modelo.objects.count()
+            if atuais.get(nome) != total:
+                divergentes[nome] = (atuais.get(nome), total)
+                Counter.objects.update_or_create(name=nome, defaults={'value': total})
+
+        RecentAccess.objects.all().delete()
+        RecentAccess.objects.bulk_create([
+            RecentAccess(user_id=user_id, last_login=last_login)
+            for user_id, last_login in (User.objects.filter(last_login__isnull=False)
+                                        .order_by('-last_login')
+                                        .values_list('id', 'last_login')[:_capacidade_acessos()])
+        ])
+    if divergentes:
+        logger.warning(f"Contadores do painel corrigidos: {divergentes}")
+    return divergentes
@@ -0,0 +1,117 @@
+"""
+Renderização dos e-mails de agendamento.
+
+O grafo do agendamento (funcionário, empresa, sindicato, homologador e
+processo) é carregado com um único select_related, por agendamento ou por
+lote, e as versões HTML e texto são renderizadas a partir do mesmo contexto
+com templates compilados uma única vez por processo.
+"""
+from functools import lru_cache
+
+from django.db.models import QuerySet
+from django.template.loader import get_template
+
+from ..models.schedule import Schedule
+
+TEMPLATE_HTML = 'emails/agendamento_funcionario.html'
+TEMPLATE_TEXTO = 'emails/agendamento_funcionario.txt'
+TEMPLATE_LEMBRETE = 'emails/lembrete_agendamento.txt'
+
+RELACIONADOS = ('employee', 'company', 'union', 'union_user', 'demissao_process')
+
+
+@lru_cache(maxsize=None)
+def _template(nome):
+    return get_template(nome)
+
+
+def agendamentos_com_relacionados():
+    return Schedule.objects.select_related(*RELACIONADOS)
+
+
+def _carregado(schedule):
+    """Garante o grafo do agendamento em memória (no máximo uma consulta)"""
+    if all(Schedule._meta.get_field(campo).is_cached(schedule) for campo in RELACIONADOS):
+        return schedule
+    return agendamentos_com_relacionados().get(pk=schedule.pk)
+
+
+def nome_usuario(user, padrao='Homologador'):
+    if not user:
+        return padrao
+    return f"{user.first_name} {user.last_name}".strip() or user.username
+
+
+def contexto_agendamento(schedule, processo=None, old_user=None, new_user=None):
+    """Contexto dos templates; `old_user`/`new_user` indicam troca de homologador"""
+    processo = processo or schedule.demissao_process
+    alterado = bool(old_user or new_user)
+    contexto = {
+        'funcionario_nome': schedule.employee.name if schedule.employee else 'Funcionário',
+        'data_agendamento': schedule.date.strftime('%d/%m/%Y'),
+        'hora_inicio': schedule.start_time.strftime('%H:%M'),
+        'hora_fim': schedule.end_time.strftime('%H:%M'),
+        'video_link': schedule.video_link or schedule.google_meet_link or 'Link será disponibilizado em breve',
+        'empresa_nome': schedule.company.name if schedule.company else 'Empresa',
+        'sindicato_nome': schedule.union.name if schedule.union else 'Sindicato',
+        'homologador_nome': nome_usuario(schedule.union_user),
+        'processo_id': processo.id if processo else schedule.id,
+        'motivo': processo.motivo if processo else 'Homologação de Demissão',
+    }
+    if alterado:
+        contexto.update({
+            'alterado': True,
+            'old_homologador': nome_usuario(old_user, None),
+            'new_homologador': nome_usuario(new_user, None),
+        })
+    return contexto
+
+
+def renderizar_agendamento(schedule, processo=None, old_user=None, new_user=None):
+    """
+    Renderiza o e-mail do agendamento ao funcionário.
+
+    Returns:
+        dict: {"schedule", "email", "subject", "text", "html"} (email None se o
+        funcionário não tem e-mail cadastrado)
+    """
+    schedule = _carregado(schedule)
+    contexto = contexto_agendamento(schedule, processo, old_user, new_user)
+    prefixo = 'Agendamento Alterado' if contexto.get('alterado') else 'Agendamento de Homologação'
+    return {
+        'schedule': schedule,
+        'email': schedule.employee.email if schedule.employee else None,
+        'subject': f"{prefixo} - {contexto['data_agendamento']} às {contexto['hora_inicio']}",
+        'text': _template(TEMPLATE_TEXTO).render(contexto).strip(),
+        'html': _template(TEMPLATE_HTML).render(contexto),
+    }
+
+
+def renderizar_lote(schedules):
+    """Renderiza o e-mail de vários agendamentos (queryset ou ids) com uma única consulta"""
+    if isinstance(schedules, QuerySet):
+        schedules = schedules.select_related(*RELACIONADOS)
+    else:
+        schedules = agendamentos_com_relacionados().filter(pk__in=list(schedules))
+    return [renderizar_agendamento(schedule) for schedule in schedules]
+
+
+def renderizar_lembrete(schedule, quando):
+    """
+    Renderiza o lembrete do agendamento ao funcionário (`quando`: ex. "amanhã").
+
+    Returns:
+        dict: {"schedule", "email", "phone", "subject", "text"}
+    """
+    schedule = _carregado(schedule)
+    processo = schedule.demissao_process
+    contexto = contexto_agendamento(schedule, processo)
+    contexto['quando'] = quando
+    employee = schedule.employee
+    return {
+        'schedule': schedule,
+        'email': getattr(processo, 'email_funcionario', None) or getattr(employee, 'email', None),
+        'phone': getattr(processo, 'telefone_funcionario', None) or getattr(employee, 'phone', None),
+        'subject': f"Lembrete: homologação {quando} às {contexto['hora_inicio']}",
+        'text': _template(TEMPLATE_LEMBRETE).render(contexto).strip(),
+    }
@@ -0,0 +1,116 @@
+"""
+Exportação em streaming (CSV ou JSONL) das listagens grandes.
+
+As linhas saem de values_list(...).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+o banco entrega lotes de linhas (tuplas, sem instanciar modelos), cada linha
+é formatada e enviada ao cliente em blocos de ~64 KB, então a memória usada
+não depende do número de linhas exportadas. Com gzip, os blocos são
+compactados à medida que são gerados.
+
+No CSV, textos que começam com =, +, - ou @ saem com um apóstrofo na frente,
+para a planilha não executá-los como fórmula.
+"""
+import csv
+import json
+import zlib
+from datetime import datetime
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+FORMATOS = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+TAMANHO_BLOCO = 64 * 1024
+# Início de célula que o Excel/LibreOffice interpretam como fórmula
+INICIO_FORMULA = ('=', '+', '-', '@')
+
+
+class _Eco:
+    """Arquivo que devolve o que recebe: csv.writer formata uma linha por vez"""
+
+    def write(self, valor):
+        return valor
+
+
+def _valor(valor):
+    if isinstance(valor, datetime):
+        return timezone.localtime(valor).isoformat() if timezone.is_aware(valor) else valor.isoformat()
+    return valor
+
+
+def _celula(valor):
+    """Texto que começaria uma fórmula recebe um apóstrofo (injeção de CSV)"""
+    valor = _valor(valor)
+    if isinstance(valor, str) and valor.startswith(INICIO_FORMULA):
+        return "'" + valor
+    return valor
+
+
+def _csv(cabecalho, linhas):
+    escritor = csv.writer(_Eco())
+    # BOM: o Excel abre o arquivo como UTF-8
+    yield '\ufeff' + escritor.writerow(cabecalho)
+    for linha in linhas:
+        yield escritor.writerow([_celula(valor) for valor in linha])
+
+
+def _jsonl(cabecalho, linhas):
+    for linha in linhas:
+        registro = {campo: _valor(valor) for campo, valor in zip(cabecalho, linha)}
+        yield json.dumps(registro, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+def _blocos(textos):
+    """Agrupa as linhas em blocos de bytes (menos escritas no socket)"""
+    bloco, tamanho = [], 0
+    for texto in textos:
+        dados = texto.encode('utf-8')
+        bloco.append(dados)
+        tamanho += len(dados)
+        if tamanho >= TAMANHO_BLOCO:
+            yield b''.join(bloco)
+            bloco, tamanho = [], 0
+    if bloco:
+        yield b''.join(bloco)
+
+
+def _gzip(blocos):
+    # wbits 31: fluxo deflate com cabeçalho e rodapé gzip
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for bloco in blocos:
+        dados = compressor.compress(bloco)
+        if dados:
+            yield dados
+    yield compressor.flush()
+
+
+def exportar(queryset, campos, formato='csv', compactar=False, nome='exportacao'):
+    """
+    Resposta em streaming com as linhas do queryset.
+
+    Args:
+        queryset: consulta já filtrada e ordenada
+        campos: [(nome da coluna, caminho do values_list)]
+        formato: 'csv' ou 'jsonl'
+        compactar: gzip (arquivo .gz)
+        nome: nome do arquivo, sem extensão
+    """
+    cabecalho = [coluna for coluna, _ in campos]
+    linhas = queryset.values_list(*[caminho for _, caminho in campos]).iterator(
+        chunk_size=getattr(settings, 'EXPORT_CHUNK_SIZE', 2000))
+    conteudo = _blocos((_csv if formato == 'csv' else _jsonl)(cabecalho, linhas))
+    arquivo = f'{nome}.{formato}'
+    tipo = FORMATOS[formato]
+    if compactar:
+        conteudo = _gzip(conteudo)
+        arquivo += '.gz'
+        tipo = 'application/gzip'
+
+    resposta = StreamingHttpResponse(conteudo, content_type=tipo)
+    resposta['Content-Disposition'] = f'attachment; filename="{arquivo}"'
+    resposta['Cache-Control'] = 'no-store'
+    return resposta
@@ -0,0 +1,194 @@
+"""
+Retenção dos logs do sistema.
+
+O comando `arquivar_logs` move os logs com mais de SYSTEMLOG_RETENTION_DAYS
+dias para arquivos JSONL compactados (gzip), um por dia, em
+SYSTEMLOG_ARCHIVE_DIR/AAAA/MM/, registrados em SystemLogArchive. Para cada
+dia:
+
+1. o arquivo é escrito em um temporário e renomeado ao final;
+2. o arquivo é registrado no índice (com o intervalo de ids);
+3. as linhas arquivadas são removidas em lotes curtos (uma transação por
+   lote), sem segurar a trava de escrita por muito tempo.
+
+Uma execução interrompida é retomada pelo índice: linhas já arquivadas são
+apenas removidas. Antes de remover, o rollup das estatísticas é atualizado,
+então os totais do painel continuam incluindo os logs arquivados.
+
+`buscar_logs` consulta a tabela e, quando o período alcança dias
+arquivados, também os arquivos desses dias. A ordem é (timestamp, id)
+decrescente nas duas fontes, então a busca pode continuar a partir da
+última linha entregue (`apos`), atravessando da tabela para os arquivos.
+"""
+import gzip
+import json
+import logging
+import os
+import time as relogio
+from datetime import datetime, time, timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from ..models.log import SystemLog, SystemLogArchive
+from ..models.user import User
+from .log_stats import compactar
+
+logger = logging.getLogger(__name__)
+
+# Campos gravados no arquivo (mesmos nomes do SystemLogSerializer)
+CAMPOS = ('id', 'timestamp', 'level', 'message', 'user', 'action', 'ip_address', 'user_agent',
+          'company', 'union', 'schedule', 'metadata')
+FILTROS = ('level', 'action', 'user', 'company', 'union')
+
+
+def diretorio():
+    return Path(getattr(settings, 'SYSTEMLOG_ARCHIVE_DIR', Path(settings.MEDIA_ROOT) / 'arquivo_logs'))
+
+
+def _inicio_do_dia(dia):
+    return timezone.make_aware(datetime.combine(dia, time.min))
+
+
+def _logs_do_dia(dia):
+    return SystemLog.objects.filter(timestamp__gte=_inicio_do_dia(dia),
+                                    timestamp__lt=_inicio_do_dia(dia + timedelta(days=1)))
+
+
+def _remover(logs, lote, pausa):
+    """Remove as linhas do queryset em lotes de `lote` ids, cada um em sua transação"""
+    removidos = 0
+    while True:
+        ids = list(logs.order_by('id').values_list('id', flat=True)[:lote])
+        if not ids:
+            return removidos
+        removidos += SystemLog.objects.filter(id__in=ids).delete()[0]
+        if pausa:
+            relogio.sleep(pausa)
+
+
+def _escrever(caminho, linhas):
+    destino = diretorio() / caminho
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    temporario = destino.with_name(destino.name + '.partial')
+    total = 0
+    with gzip.open(temporario, 'wt', encoding='utf-8') as arquivo:
+        for linha in linhas:
+            arquivo.write(json.dumps(linha, cls=DjangoJSONEncoder, ensure_ascii=False))
+            arquivo.write('\n')
+            total += 1
+    os.replace(temporario, destino)
+    return total, destino.stat().st_size
+
+
+def arquivar_dia(dia, lote=1000, pausa=0):
+    """Arquiva e remove da tabela os logs do dia; retorna quantos foram arquivados"""
+    logs = _logs_do_dia(dia)
+
+    # Retomada: linhas que já estão num arquivo do dia só precisam ser removidas
+    ultimo_arquivado = SystemLogArchive.objects.filter(day=dia).aggregate(ultimo=Max('last_log_id'))['ultimo']
+    if ultimo_arquivado:
+        _remover(logs.filter(id__lte=ultimo_arquivado), lote, pausa)
+
+    intervalo = logs.aggregate(primeiro=Min('id'), ultimo=Max('id'))
+    if intervalo['primeiro'] is None:
+        return 0
+    logs = logs.filter(id__lte=intervalo['ultimo'])
+    caminho = f"{dia:%Y/%m}/{dia:%Y-%m-%d}-{intervalo['primeiro']}.jsonl.gz"
+    linhas, tamanho = _escrever(caminho, logs.order_by('id').values(*CAMPOS).iterator(chunk_size=lote))
+    SystemLogArchive.objects.create(
+        day=dia, path=caminho, rows=linhas, size=tamanho,
+        first_log_id=intervalo['primeiro'], last_log_id=intervalo['ultimo'],
+    )
+    _remover(logs, lote, pausa)
+    logger.info(f"Logs de {dia:%d/%m/%Y} arquivados: {linhas} em {caminho}")
+    return linhas
+
+
+def inicio_janela_quente():
+    """Início do primeiro dia mantido na tabela"""
+    dias = getattr(settings, 'SYSTEMLOG_RETENTION_DAYS', 90)
+    return _inicio_do_dia(timezone.localdate() - timedelta(days=dias))
+
+
+def arquivar(lote=1000, pausa=0):
+    """Arquiva, dia a dia, os logs anteriores à janela de retenção; retorna {dia: logs arquivados}"""
+    # O rollup das estatísticas precisa incluir os logs antes de removê-los
+    while compactar():
+        pass
+
+    limite = inicio_janela_quente()
+    resumo = {}
+    while True:
+        mais_antigo = (SystemLog.objects.filter(timestamp__lt=limite)
+                       .order_by('timestamp').values_list('timestamp', flat=True).first())
+        if mais_antigo is None:
+            return resumo
+        dia = timezone.localtime(mais_antigo).date()
+        resumo[dia] = resumo.get(dia, 0) + arquivar_dia(dia, lote, pausa)
+
+
+def ler_arquivo(arquivo):
+    """Linhas (dicts) de um SystemLogArchive"""
+    with gzip.open(diretorio() / arquivo.path, 'rt', encoding='utf-8') as conteudo:
+        for linha in conteudo:
+            yield json.loads(linha)
+
+
+def _arquivados(inicio, fim, filtros, apos=None):
+    """Logs arquivados do período, do mais recente para o mais antigo"""
+    arquivos = SystemLogArchive.objects.filter(day__gte=timezone.localtime(inicio).date())
+    if fim:
+        arquivos = arquivos.filter(day__lte=timezone.localtime(fim).date())
+    if apos:
+        arquivos = arquivos.filter(day__lte=timezone.localtime(apos[0]).date())
+    for arquivo in arquivos.order_by('-day', '-first_log_id'):
+        linhas = []
+        for linha in ler_arquivo(arquivo):
+            momento = linha['timestamp'] = parse_datetime(linha['timestamp'])
+            if momento < inicio or (fim and momento > fim) or (apos and (momento, linha['id']) >= apos):
+                continue
+            if all(str(linha[campo]) == str(valor) for campo, valor in filtros.items()):
+                linhas.append(linha)
+        linhas.sort(key=lambda linha: (linha['timestamp'], linha['id']), reverse=True)
+        yield from linhas
+
+
+def buscar_logs(inicio, fim=None, limite=1000, apos=None, **filtros):
+    """
+    Logs de `inicio` até `fim` (datetimes), do mais recente para o mais
+    antigo, com os filtros de igualdade em FILTROS. Lê os arquivos apenas
+    quando `inicio` alcança dias já arquivados.
+
+    Args:
+        apos: (timestamp, id) da última linha já entregue; a busca continua
+            a partir da seguinte
+
+    Returns:
+        list[dict]: campos do SystemLogSerializer (inclusive user_email/user_name)
+    """
+    filtros = {campo: valor for campo, valor in filtros.items() if campo in FILTROS and valor}
+    logs = SystemLog.objects.filter(timestamp__gte=inicio, **filtros)
+    if fim:
+        logs = logs.filter(timestamp__lte=fim)
+    if apos:
+        logs = logs.filter(Q(timestamp__lt=apos[0]) | Q(timestamp=apos[0], id__lt=apos[1]))
+    resultado = list(logs.order_by('-timestamp', '-id').values(*CAMPOS)[:limite])
+
+    if len(resultado) < limite and inicio < inicio_janela_quente():
+        for linha in _arquivados(inicio, fim, filtros, apos):
+            resultado.append(linha)
+            if len(resultado) >= limite:
+                break
+
+    usuarios = User.objects.in_bulk({linha['user'] for linha in resultado if linha['user']})
+    for linha in resultado:
+        usuario = usuarios.get(linha['user'])
+        linha['user_email'] = usuario.email if usuario else 'Sistema'
+        linha['user_name'] = ((f"{usuario.first_name} {usuario.last_name}".strip() or usuario.username)
+                              if usuario else 'Sistema')
+    return resultado
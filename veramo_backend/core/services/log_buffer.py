@@ -0,0 +1,156 @@
+"""
+Gravação em lote dos logs do sistema (SystemLog).
+
+`create_log` não faz mais um INSERT por evento dentro da requisição: o log
+entra numa fila em memória do processo e uma thread de fundo grava os logs
+com bulk_create, a cada SYSTEMLOG_BUFFER_BATCH_SIZE logs ou
+SYSTEMLOG_BUFFER_FLUSH_SECONDS segundos, o que vier primeiro.
+
+- A fila tem no máximo SYSTEMLOG_BUFFER_MAX_SIZE logs. Cheia, a política
+  SYSTEMLOG_BUFFER_OVERFLOW decide: 'drop' descarta o log (e conta os
+  descartes); 'block' espera até SYSTEMLOG_BUFFER_BLOCK_SECONDS por espaço e,
+  se não houver, grava de forma síncrona.
+- Os logs pendentes são gravados no encerramento do worker (atexit).
+- Com SYSTEMLOG_BUFFER_ENABLED desligado (padrão; testes, scripts), a
+  gravação é síncrona, como antes.
+
+O log só entra na fila no commit da transação de quem registrou
+(transaction.on_commit): as linhas que ele referencia já estão gravadas
+quando a thread de fundo o insere, e um rollback descarta o log junto com
+elas, como acontece na gravação síncrona.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from ..models.log import SystemLog
+
+logger = logging.getLogger(__name__)
+
+
+def _gravar(logs):
+    """Grava um lote; se o lote falhar, grava um a um para isolar o log inválido"""
+    try:
+        SystemLog.objects.bulk_create(logs)
+    except Exception:
+        for log in logs:
+            try:
+                log.save()
+            except Exception as e:
+                logger.error(f"Log descartado ({log.level} {log.action}): {e}")
+
+
+class LogBuffer:
+    def __init__(self, capacidade, lote, intervalo, politica='drop', espera=2.0):
+        self.lote = lote
+        self.intervalo = intervalo
+        self.politica = politica
+        self.espera = espera
+        self.descartados = 0
+        self._fila = queue.Queue(maxsize=capacidade)
+        self._parar = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def _iniciar(self):
+        # Depois de um fork (workers do gunicorn) a thread do processo pai não existe
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._parar.clear()
+            self._thread = threading.Thread(target=self._executar, name='systemlog-buffer', daemon=True)
+            self._thread.start()
+
+    def registrar(self, log):
+        """Enfileira um SystemLog não salvo"""
+        self._iniciar()
+        try:
+            self._fila.put_nowait(log)
+            return
+        except queue.Full:
+            pass
+        if self.politica == 'block':
+            try:
+                self._fila.put(log, timeout=self.espera)
+            except queue.Full:
+                _gravar([log])
+            return
+        self.descartados += 1
+        if self.descartados == 1 or self.descartados % 1000 == 0:
+            logger.warning(f"Fila de logs cheia: {self.descartados} log(s) descartado(s)")
+
+    def _proximo_lote(self, timeout):
+        try:
+            logs = [self._fila.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while len(logs) < self.lote:
+            try:
+                logs.append(self._fila.get_nowait())
+            except queue.Empty:
+                break
+        return logs
+
+    def _executar(self):
+        while not self._parar.is_set():
+            logs = self._proximo_lote(self.intervalo)
+            if logs:
+                _gravar(logs)
+            close_old_connections()
+
+    def descarregar(self):
+        """Grava agora tudo o que está na fila (na thread de quem chama); retorna quantos"""
+        total = 0
+        while True:
+            logs = self._proximo_lote(timeout=0.01)
+            if not logs:
+                return total
+            _gravar(logs)
+            total += len(logs)
+
+    def encerrar(self, timeout=5.0):
+        """Para a thread de fundo e grava os logs pendentes"""
+        self._parar.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout)
+        self._thread = None
+        return self.descarregar()
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def obter_buffer():
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = LogBuffer(
+                    capacidade=getattr(settings, 'SYSTEMLOG_BUFFER_MAX_SIZE', 10000),
+                    lote=getattr(settings, 'SYSTEMLOG_BUFFER_BATCH_SIZE', 200),
+                    intervalo=getattr(settings, 'SYSTEMLOG_BUFFER_FLUSH_SECONDS', 1.0),
+                    politica=getattr(settings, 'SYSTEMLOG_BUFFER_OVERFLOW', 'drop'),
+                    espera=getattr(settings, 'SYSTEMLOG_BUFFER_BLOCK_SECONDS', 2.0),
+                )
+                atexit.register(_buffer.encerrar)
+    return _buffer
+
+
+def registrar(log):
+    """Grava o SystemLog (não salvo) pela fila ou, com o buffer desligado, na hora"""
+    if getattr(settings, 'SYSTEMLOG_BUFFER_ENABLED', False):
+        # Fora de transação, on_commit executa na hora
+        transaction.on_commit(lambda: obter_buffer().registrar(log))
+    else:
+        log.save()
+    return log
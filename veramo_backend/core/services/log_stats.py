@@ -0,0 +1,138 @@
+"""
+Estatísticas dos logs do sistema (SystemLogViewSet.stats).
+
+As contagens por dia, nível e ação ficam no rollup (SystemLogRollup),
+somado de forma incremental pelo comando `compactar_logs` a partir do
+último id compactado (SystemLogRollupCheckpoint). A consulta lê o rollup e
+soma apenas os logs gravados depois do checkpoint, então o custo não
+depende do tamanho da tabela de logs.
+
+Filtros que o rollup não cobre (usuário, empresa, sindicato, período) caem
+na agregação agrupada sobre os logs filtrados, em duas consultas.
+"""
+import logging
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from ..models.log import SystemLog, SystemLogRollup, SystemLogRollupCheckpoint
+
+logger = logging.getLogger(__name__)
+
+DIAS_HISTOGRAMA = 30
+
+
+def _por_dia_nivel_acao(logs):
+    return (logs.annotate(dia=TruncDate('timestamp'))
+            .values_list('dia', 'level', 'action')
+            .annotate(total=Count('id'))
+            .order_by())
+
+
+def compactar(lote=50000):
+    """
+    Soma ao rollup os próximos `lote` logs após o checkpoint. Os logs dos últimos SYSTEMLOG_ROLLUP_LAG_SECONDS ficam para a
+    próxima execução (transações de gravação ainda abertas). Retorna quantos
+    logs foram somados.
+    """
+    recentes = timezone.now() - timedelta(seconds=getattr(settings, 'SYSTEMLOG_ROLLUP_LAG_SECONDS', 60))
+    with transaction.atomic():
+        checkpoint = SystemLogRollupCheckpoint.objects.select_for_update().get_or_create(pk=1)[0]
+        inicio = checkpoint.last_log_id
+        pendentes = SystemLog.objects.filter(id__gt=inicio, timestamp__lt=recentes)
+        teto = (next(iter(pendentes.order_by('id').values_list('id', flat=True)[lote - 1:lote]), None)
+                or pendentes.aggregate(teto=Max('id'))['teto'])
+        if teto is None:
+            return 0
+
+        grupos = {(dia, level, action or ''): total
+                  for dia, level, action, total in _por_dia_nivel_acao(
+                      SystemLog.objects.filter(id__gt=inicio, id__lte=teto))}
+        existentes = {
+            (rollup.day, rollup.level, rollup.action): rollup
+            for rollup in SystemLogRollup.objects.filter(day__in={dia for dia, _, _ in grupos})
+        }
+        novos, alterados = [], []
+        for (dia, level, action), total in grupos.items():
+            rollup = existentes.get((dia, level, action))
+            if rollup:
+                rollup.count += total
+                alterados.append(rollup)
+            else:
+                novos.append(SystemLogRollup(day=dia, level=level, action=action, count=total))
+        SystemLogRollup.objects.bulk_update(alterados, ['count'], batch_size=500)
+        SystemLogRollup.objects.bulk_create(novos, batch_size=500)
+
+        checkpoint.last_log_id = teto
+        checkpoint.save(update_fields=['last_log_id', 'updated_at'])
+
+    somados = sum(grupos.values())
+    logger.info(f"Rollup de logs: {somados} log(s) somado(s) até o id {teto}")
+    return somados
+
+
+def _montar(por_nivel_acao, por_dia):
+    """Resposta do endpoint a partir de {(level, action): total} e {dia: total}"""
+    level_counts = {level: 0 for level, _ in SystemLog.LEVEL_CHOICES}
+    action_counts = Counter()
+    for (level, action), total in por_nivel_acao.items():
+        if level in level_counts:
+            level_counts[level] += total
+        if action:
+            action_counts[action] += total
+    acoes_validas = dict(SystemLog.ACTION_CHOICES)
+    top_actions = {acao: total for acao, total in action_counts.most_common() if acao in acoes_validas}
+    return {
+        'total_logs': sum(por_nivel_acao.values()),
+        'level_counts': level_counts,
+        'top_actions': dict(list(top_actions.items())[:10]),
+        'daily_logs': [{'date': dia, 'count': total} for dia, total in sorted(por_dia.items()) if total],
+    }
+
+
+def estatisticas_rollup(level=None, action=None):
+    """Estatísticas de todos os logs (opcionalmente de um nível/ação) pelo rollup"""
+    filtros = {}
+    if level:
+        filtros['level'] = level
+    if action:
+        filtros['action'] = action
+    inicio_histograma = timezone.localdate() - timedelta(days=DIAS_HISTOGRAMA)
+
+    por_nivel_acao = Counter()
+    por_dia = Counter()
+    rollups = SystemLogRollup.objects.filter(**filtros)
+    for level_, action_, total in rollups.values_list('level', 'action').annotate(total=Sum('count')).order_by():
+        por_nivel_acao[(level_, action_)] += total
+    for dia, total in (rollups.filter(day__gte=inicio_histograma)
+                       .values_list('day').annotate(total=Sum('count')).order_by()):
+        por_dia[dia] += total
+
+    # Logs gravados depois da última compactação
+    checkpoint = SystemLogRollupCheckpoint.objects.filter(pk=1).values_list('last_log_id', flat=True).first() or 0
+    for dia, level_, action_, total in _por_dia_nivel_acao(
+            SystemLog.objects.filter(id__gt=checkpoint, **filtros)):
+        por_nivel_acao[(level_, action_ or '')] += total
+        if dia >= inicio_histograma:
+            por_dia[dia] += total
+    return _montar(por_nivel_acao, por_dia)
+
+
+def estatisticas_consulta(logs):
+    """Estatísticas de um queryset de logs filtrado, com agregação agrupada"""
+    por_nivel_acao = Counter()
+    for level, action, total in logs.values_list('level', 'action').annotate(total=Count('id')).order_by():
+        por_nivel_acao[(level, action or '')] += total
+    por_dia = Counter(dict(
+        logs.filter(timestamp__gte=timezone.now() - timedelta(days=DIAS_HISTOGRAMA))
+        .annotate(dia=TruncDate('timestamp'))
+        .values_list('dia')
+        .annotate(total=Count('id'))
+        .order_by()
+    ))
+    return _montar(por_nivel_acao, por_dia)
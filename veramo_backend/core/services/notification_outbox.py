@@ -0,0 +1,189 @@
+"""
+Outbox de notificações por e-mail e WhatsApp.
+
+Quem notifica apenas grava um OutboundNotification (na transação corrente,
+junto com o agendamento que originou a mensagem). O comando
+`despachar_notificacoes` reivindica os pendentes em lotes e envia:
+
+- e-mails por uma única conexão SMTP por lote (`get_connection()`), em vez
+  de uma conexão por `send_mail`;
+- mensagens de WhatsApp em paralelo pelo WhatsAppSender (sessão persistente
+  e limite de vazão do número remetente), registrando o resultado de cada uma.
+
+Falhas transitórias voltam para a fila com backoff exponencial; falhas
+permanentes ou que esgotam NOTIFICATION_MAX_ATTEMPTS ficam com status
+'falhou' (dead-letter). Uma indisponibilidade do provedor apenas atrasa os
+envios, sem perder mensagens nem afetar as requisições.
+"""
+import logging
+import random
+import smtplib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from ..models.notification import OutboundNotification
+
+logger = logging.getLogger(__name__)
+
+
+class EnvioPermanente(Exception):
+    """Falha de envio que não adianta repetir (destinatário ou requisição inválida)"""
+
+
+def _backoff(tentativa):
+    base = getattr(settings, 'NOTIFICATION_BACKOFF_SECONDS', 60)
+    teto = getattr(settings, 'NOTIFICATION_BACKOFF_MAX_SECONDS', 3600)
+    espera = min(teto, base * (2 ** (tentativa - 1)))
+    return timedelta(seconds=espera + random.uniform(0, espera / 10))
+
+
+def enfileirar(channel, recipients, body, subject='', html_body='', schedule=None):
+    """Grava a notificação no outbox; o envio fica a cargo do despachante"""
+    recipients = [r for r in recipients if r]
+    if not recipients:
+        return None
+    # Savepoint: uma falha aqui não invalida a transação de quem notifica
+    with transaction.atomic():
+        return OutboundNotification.objects.create(
+            channel=channel,
+            recipients=recipients,
+            subject=subject[:255],
+            body=body,
+            html_body=html_body or '',
+            schedule=schedule,
+            next_attempt_at=timezone.now(),
+            max_attempts=getattr(settings, 'NOTIFICATION_MAX_ATTEMPTS', 5),
+        )
+
+
+def enfileirar_lote(notificacoes):
+    """Grava várias notificações (OutboundNotification não salvas) com um único INSERT em lote"""
+    agora = timezone.now()
+    max_attempts = getattr(settings, 'NOTIFICATION_MAX_ATTEMPTS', 5)
+    for notificacao in notificacoes:
+        notificacao.next_attempt_at = agora
+        notificacao.max_attempts = max_attempts
+    return OutboundNotification.objects.bulk_create(notificacoes, batch_size=500)
+
+
+def enfileirar_email(subject, body, recipients, html_body='', schedule=None):
+    return enfileirar(OutboundNotification.EMAIL, recipients, body, subject, html_body, schedule)
+
+
+def enfileirar_whatsapp(phone_e164, message, schedule=None):
+    return enfileirar(OutboundNotification.WHATSAPP, [phone_e164], message, schedule=schedule)
+
+
+def reivindicar(limite):
+    """
+    Reivindica até `limite` notificações vencidas com UPDATE condicional
+    (dois despachantes nunca enviam a mesma). Notificações presas em envio
+    por um despachante que morreu voltam para a fila.
+    """
+    agora = timezone.now()
+    expiracao = agora - timedelta(seconds=getattr(settings, 'NOTIFICATION_LOCK_TIMEOUT_SECONDS', 600))
+    OutboundNotification.objects.filter(status=OutboundNotification.ENVIANDO, locked_at__lt=expiracao).update(
+        status=OutboundNotification.PENDENTE, locked_at=None)
+
+    candidatos = list(OutboundNotification.objects
+                      .filter(status=OutboundNotification.PENDENTE, next_attempt_at__lte=agora)
+                      .order_by('next_attempt_at', 'id')
+                      .values_list('id', flat=True)[:limite])
+    reivindicadas = []
+    for notificacao_id in candidatos:
+        if OutboundNotification.objects.filter(id=notificacao_id, status=OutboundNotification.PENDENTE).update(
+                status=OutboundNotification.ENVIANDO, locked_at=agora):
+            reivindicadas.append(notificacao_id)
+    return list(OutboundNotification.objects.filter(id__in=reivindicadas).order_by('next_attempt_at', 'id'))
+
+
+def _enviar_emails(notificacoes):
+    """Envia os e-mails do lote por uma única conexão; retorna [(notificação, erro)]"""
+    if not notificacoes:
+        return []
+    remetente = getattr(settings, 'DEFAULT_FROM_EMAIL', 'no-reply@veramo.local')
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as e:
+        return [(notificacao, e) for notificacao in notificacoes]
+
+    resultados = []
+    try:
+        for notificacao in notificacoes:
+            mensagem = EmailMultiAlternatives(
+                subject=notificacao.subject,
+                body=notificacao.body,
+                from_email=remetente,
+                to=notificacao.recipients,
+                connection=connection,
+            )
+            if notificacao.html_body:
+                mensagem.attach_alternative(notificacao.html_body, 'text/html')
+            try:
+                connection.send_messages([mensagem])
+                resultados.append((notificacao, None))
+            except smtplib.SMTPRecipientsRefused as e:
+                resultados.append((notificacao, EnvioPermanente(str(e))))
+            except Exception as e:
+                resultados.append((notificacao, e))
+    finally:
+        connection.close()
+    return resultados
+
+
+def _enviar_whatsapps(notificacoes):
+    from .whatsapp_sender import obter_sender, whatsapp_configurado
+
+    if not notificacoes:
+        return []
+    if not whatsapp_configurado():
+        return [(notificacao, EnvioPermanente('WhatsApp não configurado')) for notificacao in notificacoes]
+
+    resultados = []
+    envios = obter_sender().enviar_lote([(n.recipients[0], n.body) for n in notificacoes])
+    for notificacao, envio in zip(notificacoes, envios):
+        notificacao.provider_status = envio['status_code']
+        notificacao.provider_message_id = envio['message_id'] or ''
+        if envio['ok']:
+            resultados.append((notificacao, None))
+        elif envio['permanent']:
+            resultados.append((notificacao, EnvioPermanente(envio['error'])))
+        else:
+            resultados.append((notificacao, Exception(envio['error'])))
+    return resultados
+
+
+def _registrar(notificacao, erro):
+    notificacao.attempts += 1
+    notificacao.locked_at = None
+    if erro is None:
+        notificacao.status = OutboundNotification.ENVIADA
+        notificacao.sent_at = timezone.now()
+        notificacao.last_error = ''
+    elif isinstance(erro, EnvioPermanente) or notificacao.attempts >= notificacao.max_attempts:
+        notificacao.status = OutboundNotification.FALHOU
+        notificacao.last_error = str(erro)
+        logger.error(f"Notificação {notificacao.pk} ({notificacao.channel}) descartada: {erro}")
+    else:
+        notificacao.status = OutboundNotification.PENDENTE
+        notificacao.last_error = str(erro)
+        notificacao.next_attempt_at = timezone.now() + _backoff(notificacao.attempts)
+        logger.warning(f"Notificação {notificacao.pk} ({notificacao.channel}) falhou "
+                       f"(tentativa {notificacao.attempts}): {erro}")
+    notificacao.save(update_fields=['status', 'attempts', 'locked_at', 'sent_at', 'last_error', 'next_attempt_at',
+                                    'provider_status', 'provider_message_id'])
+
+
+def despachar_pendentes(limite=50):
+    """Reivindica e envia um lote de notificações; retorna quantas foram processadas"""
+    notificacoes = reivindicar(limite)
+    resultados = _enviar_emails([n for n in notificacoes if n.channel == OutboundNotification.EMAIL])
+    resultados += _enviar_whatsapps([n for n in notificacoes if n.channel == OutboundNotification.WHATSAPP])
+    for notificacao, erro in resultados:
+        _registrar(notificacao, erro)
+    return len(notificacoes)
@@ -1,13 +1,6 @@
 from typing import Optional, List
-from django.conf import settings
-from django.core.mail import send_mail
 from django.utils import timezone
 
-try:
-    import requests  # type: ignore
-except Exception:  # requests pode não estar instalado em alguns ambientes
-    requests = None  # fallback
-
 
 def _format_datetime(date, start_time, end_time) -> str:
     try:
@@ -29,52 +22,25 @@ def _sanitize_phone(phone: Optional[str]) -> Optional[str]:
     return f"+{digits}" if digits else None
 
 
-def _send_email(subject: str, body: str, recipients: List[str]) -> None:
-    if not recipients:
-        return
-    send_mail(
-        subject=subject,
-        message=body,
-        from_email=getattr(settings, 'DEFAULT_FROM_EMAIL', 'no-reply@veramo.local'),
-        recipient_list=recipients,
-        fail_silently=True,
-    )
+def _send_email(subject: str, body: str, recipients: List[str], schedule=None) -> None:
+    """Grava o e-mail no outbox; o envio é feito pelo comando despachar_notificacoes"""
+    from .notification_outbox import enfileirar_email
+
+    enfileirar_email(subject=subject, body=body, recipients=recipients, schedule=schedule)
+
 
+def _send_whatsapp_text(phone_e164: str, message: str, schedule=None) -> None:
+    """Grava a mensagem no outbox, se o WhatsApp estiver configurado"""
+    from .notification_outbox import enfileirar_whatsapp
+    from .whatsapp_sender import whatsapp_configurado
 
-def _send_whatsapp_text(phone_e164: str, message: str) -> None:
-    if not getattr(settings, 'WHATSAPP_ENABLED', False):
+    if not whatsapp_configurado():
         return
-    provider = getattr(settings, 'WHATSAPP_PROVIDER', 'meta')
-    if provider == 'meta':
-        # WhatsApp Cloud API
-        if not requests:
-            return
-        token = getattr(settings, 'WHATSAPP_TOKEN', '')
-        phone_id = getattr(settings, 'WHATSAPP_PHONE_ID', '')
-        if not token or not phone_id:
-            return
-        url = f"https://graph.facebook.com/v17.0/{phone_id}/messages"
-        headers = {
-            'Authorization': f'Bearer {token}',
-            'Content-Type': 'application/json',
-        }
-        payload = {
-            'messaging_product': 'whatsapp',
-            'to': phone_e164,
-            'type': 'text',
-            'text': {'body': message[:4096]},  # limite de segurança
-        }
-        try:
-            requests.post(url, headers=headers, json=payload, timeout=10)
-        except Exception:
-            pass
-    else:
-        # Espaço para provedores customizados via webhook
-        pass
+    enfileirar_whatsapp(phone_e164, message[:4096], schedule=schedule)  # limite de segurança
 
 
 def notify_agendamento(schedule, processo) -> None:
-    """Envia e-mail e WhatsApp ao funcionário com dia/horário e link da videoconferência.
+    """Enfileira e-mail e WhatsApp ao funcionário com dia/horário e link da videoconferência.
     Não levanta exceções (fail-silent)."""
 
     try:
@@ -99,11 +65,11 @@ def notify_agendamento(schedule, processo) -> None:
 
         # E-mail
         if email:
-            _send_email(subject=subject, body=body, recipients=[email])
+            _send_email(subject=subject, body=body, recipients=[email], schedule=schedule)
 
         # WhatsApp
         if phone_e164:
-            _send_whatsapp_text(phone_e164, body)
+            _send_whatsapp_text(phone_e164, body, schedule=schedule)
 
     except Exception:
         # Never break main flow
@@ -138,13 +104,14 @@ def notify_homologador_pendente_meet(schedule) -> None:
             f"Observação: o link ficará visível para empresa e trabalhador assim que salvo."
         )
 
-        _send_email(subject=subject, body=body, recipients=[homologador.email])
+        _send_email(subject=subject, body=body, recipients=[homologador.email], schedule=schedule)
 
         phone_e164 = _sanitize_phone(getattr(homologador, 'phone', None))
         if phone_e164:
             _send_whatsapp_text(
                 phone_e164,
-                f"Ação necessária: informe o link do Meet para a homologação de {when_str}. Crie no Calendar e cole o link no Veramo."
+                f"Ação necessária: informe o link do Meet para a homologação de {when_str}. Crie no Calendar e cole o link no Veramo.",
+                schedule=schedule,
             )
     except Exception:
         # Never break main flow
@@ -0,0 +1,127 @@
+"""
+Lembretes das homologações agendadas (véspera e hora anterior).
+
+O comando `enviar_lembretes` é executado periodicamente (cron). Cada
+execução percorre os agendamentos da janela por uma consulta de intervalo
+no índice (date, start_time), em lotes por chave (id), sem carregar o dia
+inteiro em memória. Para cada lote:
+
+1. os agendamentos são reivindicados gravando o marcador de envio com um
+   único UPDATE condicional (só onde o marcador está vazio) e relidos pelo
+   carimbo `agora`, então execuções repetidas ou simultâneas não reenviam
+   o mesmo lembrete;
+2. o grafo dos reivindicados é carregado com uma consulta e os lembretes
+   são gravados no outbox com um INSERT em lote, na mesma transação.
+
+Remarcar a data ou o início do agendamento limpa os marcadores (em
+Schedule.save e também em update/bulk_update do ScheduleQuerySet), e os
+lembretes são enviados de novo para o novo horário.
+
+O envio em si fica com o despachante do outbox (despachar_notificacoes).
+"""
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from ..models.notification import OutboundNotification
+from ..models.schedule import Schedule
+from .email_rendering import agendamentos_com_relacionados, renderizar_lembrete
+from .notification_outbox import enfileirar_lote
+
+logger = logging.getLogger(__name__)
+
+VESPERA = 'vespera'
+PROXIMA_HORA = 'proxima_hora'
+
+# tipo -> (marcador de envio no Schedule, texto usado na mensagem)
+TIPOS = {
+    VESPERA: ('reminder_day_sent_at', 'amanhã'),
+    PROXIMA_HORA: ('reminder_hour_sent_at', 'em instantes'),
+}
+
+
+def _pendentes(tipo, agora):
+    """Agendamentos da janela do lembrete que ainda não foram lembrados"""
+    marcador = TIPOS[tipo][0]
+    agendamentos = Schedule.objects.filter(status='agendado', **{f'{marcador}__isnull': True})
+    hoje = agora.date()
+    if tipo == VESPERA:
+        return agendamentos.filter(date=hoje + timedelta(days=1))
+
+    limite = agora + timedelta(hours=1)
+    if limite.date() == hoje:
+        return agendamentos.filter(date=hoje, start_time__gte=agora.time(), start_time__lt=limite.time())
+    # Janela atravessa a meia-noite
+    return agendamentos.filter(
+        Q(date=hoje, start_time__gte=agora.time()) | Q(date=limite.date(), start_time__lt=limite.time())
+    )
+
+
+def _reivindicar(ids, marcador, agora):
+    """Grava o marcador nos ainda livres; retorna os ids carimbados com `agora`"""
+    Schedule.objects.filter(id__in=ids, **{f'{marcador}__isnull': True}).update(**{marcador: agora})
+    return list(Schedule.objects.filter(id__in=ids, **{marcador: agora}).values_list('id', flat=True))
+
+
+def _notificacoes(lembretes):
+    from .notification_service import _sanitize_phone
+    from .whatsapp_sender import whatsapp_configurado
+
+    whatsapp = whatsapp_configurado()
+    notificacoes = []
+    for lembrete in lembretes:
+        if lembrete['email']:
+            notificacoes.append(OutboundNotification(
+                channel=OutboundNotification.EMAIL,
+                recipients=[lembrete['email']],
+                subject=lembrete['subject'],
+                body=lembrete['text'],
+                schedule=lembrete['schedule'],
+            ))
+        telefone = _sanitize_phone(lembrete['phone'])
+        if whatsapp and telefone:
+            notificacoes.append(OutboundNotification(
+                channel=OutboundNotification.WHATSAPP,
+                recipients=[telefone],
+                body=lembrete['text'][:4096],
+                schedule=lembrete['schedule'],
+            ))
+    return notificacoes
+
+
+def enviar_lembretes(tipo, lote=200, agora=None):
+    """
+    Enfileira os lembretes do `tipo` (VESPERA ou PROXIMA_HORA) ainda não
+    enviados. Retorna {union_id: quantidade de agendamentos lembrados}.
+    """
+    agora = timezone.localtime(agora)
+    marcador, quando = TIPOS[tipo]
+    por_sindicato = defaultdict(int)
+    ultimo_id = 0
+    while True:
+        ids = list(_pendentes(tipo, agora)
+                   .filter(id__gt=ultimo_id)
+                   .order_by('id')
+                   .values_list('id', flat=True)[:lote])
+        if not ids:
+            break
+        ultimo_id = ids[-1]
+
+        with transaction.atomic():
+            reivindicados = _reivindicar(ids, marcador, agora)
+            if not reivindicados:
+                continue
+            lembretes = [
+                renderizar_lembrete(schedule, quando)
+                for schedule in agendamentos_com_relacionados().filter(id__in=reivindicados)
+            ]
+            enfileirar_lote(_notificacoes(lembretes))
+
+        for lembrete in lembretes:
+            por_sindicato[lembrete['schedule'].union_id] += 1
+        logger.info(f"Lembretes ({tipo}) enfileirados para {len(lembretes)} agendamento(s)")
+    return dict(por_sindicato)
@@ -0,0 +1,192 @@
+"""
+Reserva de horários de homologação sem agendamento duplo.
+
+Toda escrita na agenda de um homologador (reserva temporária, agendamento
+ou troca de responsável) passa por `agenda_travada`, que serializa o
+check-and-insert por (homologador, dia) com uma linha de AgendaLock. A
+trava é obtida com um UPDATE como primeira instrução da transação, o que
+funciona tanto no SQLite (lock de escrita do banco) quanto em bancos com
+lock de linha (PostgreSQL/MySQL), sem depender de select_for_update.
+
+As reservas temporárias (SlotHold) seguram o horário enquanto o usuário
+confirma o agendamento e expiram sozinhas após SLOT_HOLD_TTL_SECONDS.
+"""
+import logging
+import secrets
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from ..models.reservation import AgendaLock, SlotHold
+from ..models.schedule import Schedule
+
+logger = logging.getLogger(__name__)
+
+
+class HorarioIndisponivel(Exception):
+    """O horário já está ocupado por um agendamento ou por outra reserva"""
+
+
+class ReservaInvalida(Exception):
+    """Reserva inexistente, expirada ou que não corresponde ao horário informado"""
+
+
+class ProcessoIndisponivel(Exception):
+    """O processo deixou de estar apto ao agendamento (ex.: agendado por outra requisição)"""
+
+
+def _ttl():
+    return getattr(settings, 'SLOT_HOLD_TTL_SECONDS', 300)
+
+
+def _travar(union_user_id, dia):
+    """Obtém a trava do homologador/dia; deve ser chamada dentro de transaction.atomic()"""
+    atualizados = (AgendaLock.objects
+                   .filter(union_user_id=union_user_id, date=dia)
+                   .update(version=F('version') + 1))
+    if atualizados:
+        return
+    try:
+        # Savepoint: se outra transação criou a linha antes, apenas trava a existente
+        with transaction.atomic():
+            AgendaLock.objects.create(union_user_id=union_user_id, date=dia)
+    except IntegrityError:
+        AgendaLock.objects.filter(union_user_id=union_user_id, date=dia).update(version=F('version') + 1)
+
+
+def travar_agendas(chaves):
+    """
+    Trava várias agendas (homologador, dia) de uma vez, sempre na mesma ordem
+    para que duas operações em lote não se bloqueiem mutuamente. Deve ser
+    chamada dentro de transaction.atomic().
+    """
+    for union_user_id, dia in sorted(set(chaves)):
+        _travar(union_user_id, dia)
+
+
+def tem_conflito(union_user_id, dia, inicio, fim, ignorar_schedule_id=None, ignorar_token=None):
+    """Indica se há agendamento ou reserva ativa sobreposta ao intervalo"""
+    agendamentos = Schedule.objects.filter(
+        union_user_id=union_user_id,
+        date=dia,
+        start_time__lt=fim,
+        end_time__gt=inicio,
+    )
+    if ignorar_schedule_id:
+        agendamentos = agendamentos.exclude(id=ignorar_schedule_id)
+    if agendamentos.exists():
+        return True
+
+    reservas = SlotHold.objects.filter(
+        union_user_id=union_user_id,
+        date=dia,
+        start_time__lt=fim,
+        end_time__gt=inicio,
+        expires_at__gt=timezone.now(),
+    )
+    if ignorar_token:
+        reservas = reservas.exclude(token=ignorar_token)
+    return reservas.exists()
+
+
+@contextmanager
+def agenda_travada(union_user_id, dia, inicio, fim, ignorar_schedule_id=None, ignorar_token=None):
+    """
+    Abre uma transação com a agenda do homologador/dia travada e garante que
+    o intervalo está livre. O bloco executa a escrita (criação ou alteração
+    do agendamento) antes de a trava ser liberada no commit.
+
+    Levanta HorarioIndisponivel se houver conflito.
+    """
+    with transaction.atomic():
+        _travar(union_user_id, dia)
+        SlotHold.objects.filter(union_user_id=union_user_id, date=dia, expires_at__lte=timezone.now()).delete()
+        if tem_conflito(union_user_id, dia, inicio, fim, ignorar_schedule_id, ignorar_token):
+            raise HorarioIndisponivel('O homologador já possui agendamento ou reserva neste horário')
+        yield
+
+
+def reservar_horario(union_id, union_user_id, dia, inicio, fim, criado_por=None, processo=None, ttl=None):
+    """Cria uma reserva temporária para o horário, ou levanta HorarioIndisponivel"""
+    with agenda_travada(union_user_id, dia, inicio, fim):
+        return SlotHold.objects.create(
+            union_id=union_id,
+            union_user_id=union_user_id,
+            date=dia,
+            start_time=inicio,
+            end_time=fim,
+            token=secrets.token_urlsafe(32),
+            expires_at=timezone.now() + timedelta(seconds=ttl or _ttl()),
+            created_by=criado_por,
+            demissao_process=processo,
+        )
+
+
+def reservar_com_atribuicao(union_id, dia, inicio, fim, union_user_id=None, criado_por=None,
+                            processo=None, tentativas=3):
+    """
+    Reserva o horário para o homologador informado ou, se nenhum for
+    informado, para um escolhido pela política de atribuição. Quem perde a
+    disputa por um homologador tenta o próximo elegível, sem voltar ao cliente.
+    """
+    from .assignment_service import atribuir_homologador
+
+    if union_user_id:
+        return reservar_horario(union_id, union_user_id, dia, inicio, fim, criado_por, processo)
+
+    disputados = set()
+    for _ in range(tentativas):
+        escolhido = atribuir_homologador(union_id, dia, inicio, fim, excluir=disputados)
+        if not escolhido:
+            break
+        try:
+            return reservar_horario(union_id, escolhido, dia, inicio, fim, criado_por, processo)
+        except HorarioIndisponivel:
+            logger.info(f"Homologador {escolhido} reservado concorrentemente para {dia} {inicio}; tentando outro")
+            disputados.add(escolhido)
+    raise HorarioIndisponivel('Nenhum homologador disponível para este horário')
+
+
+def obter_reserva(token, processo=None):
+    """Retorna a reserva ativa do token, ou levanta ReservaInvalida"""
+    reservas = SlotHold.objects.filter(token=token, expires_at__gt=timezone.now())
+    if processo is not None:
+        reservas = reservas.filter(demissao_process=processo)
+    reserva = reservas.first()
+    if not reserva:
+        raise ReservaInvalida('Reserva inexistente ou expirada')
+    return reserva
+
+
+def liberar_reserva(token, processo=None):
+    """Remove a reserva; retorna se havia algo a liberar"""
+    reservas = SlotHold.objects.filter(token=token)
+    if processo is not None:
+        reservas = reservas.filter(demissao_process=processo)
+    removidas, _ = reservas.delete()
+    return bool(removidas)
+
+
+@contextmanager
+def confirmar_reserva(reserva):
+    """
+    Converte a reserva em agendamento: o bloco cria o Schedule com a agenda
+    travada e a reserva é consumida na mesma transação. Se a reserva tiver
+    expirado nesse meio tempo, o horário ainda é aceito desde que continue livre.
+    """
+    with agenda_travada(reserva.union_user_id, reserva.date, reserva.start_time, reserva.end_time,
+                        ignorar_token=reserva.token):
+        yield
+        SlotHold.objects.filter(pk=reserva.pk).delete()
+
+
+def alterar_homologador(schedule, novo_user):
+    """Troca o homologador responsável pelo agendamento com a agenda do novo homologador travada"""
+    with agenda_travada(novo_user.id, schedule.date, schedule.start_time, schedule.end_time,
+                        ignorar_schedule_id=schedule.id):
+        schedule.union_user = novo_user
+        schedule.save()
@@ -0,0 +1,198 @@
+"""
+Busca textual (?q=) em processos, funcionários e mensagens de log.
+
+O backend é escolhido por SEARCH_BACKEND:
+
+- 'fts5': tabelas virtuais FTS5 do SQLite com conteúdo externo (o texto não
+  é duplicado), mantidas por triggers na própria tabela, então cobrem também
+  bulk_create/update/delete (a fila de logs grava com bulk_create).
+  Resultados ordenados por relevância (bm25). Acentos e caixa são ignorados
+  ("joao" encontra "João") e cada palavra casa por prefixo.
+- 'simples': icontains em cada campo indexado, sem ordenação por relevância
+  (qualquer banco).
+- 'auto' (padrão): 'fts5' no SQLite com FTS5, senão 'simples'.
+- ou o caminho de uma classe com a mesma interface (filtro/relevancia/instalar).
+
+As tabelas e triggers são criadas no post_migrate (e pelo comando
+`reindexar_busca`): as migrações do SQLite recriam tabelas alteradas, o que
+apaga os triggers; a instalação é idempotente e reconstrói o índice quando
+faltava algum trigger.
+"""
+import logging
+import re
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce
+from django.utils.module_loading import import_string
+
+from ..models.demissao_process import DemissaoProcess
+from ..models.employee import Employee
+from ..models.log import SystemLog
+
+logger = logging.getLogger(__name__)
+
+# alias da conexão -> SQLite com FTS5 (verificado uma vez por processo)
+_fts5_disponivel = {}
+
+
+@dataclass(frozen=True)
+class Indice:
+    model: type
+    tabela: str
+    campos: tuple
+
+
+INDICES = {
+    'processos': Indice(DemissaoProcess, 'core_busca_processo', ('nome_funcionario', 'email_funcionario', 'motivo')),
+    'funcionarios': Indice(Employee, 'core_busca_funcionario', ('name',)),
+    'logs': Indice(SystemLog, 'core_busca_log', ('message',)),
+}
+
+
+def palavras(termo):
+    return re.findall(r'\w+', termo or '')
+
+
+def _caminho(campo, nome):
+    return nome if campo == 'pk' else f'{campo}__{nome}'
+
+
+class BuscaSimples:
+    """icontains em cada campo: todas as palavras precisam aparecer em algum campo"""
+
+    def filtro(self, indice, termo, campo='pk'):
+        condicao = Q()
+        for palavra in palavras(termo):
+            qualquer_campo = Q()
+            for nome in indice.campos:
+                qualquer_campo |= Q(**{f'{_caminho(campo, nome)}__icontains': palavra})
+            condicao &= qualquer_campo
+        return condicao
+
+    def relevancia(self, indice, termo, campo='pk', model=None):
+        return None
+
+    def instalar(self, conexao, reconstruir=False):
+        return []
+
+
+class BuscaFTS5(BuscaSimples):
+    """Tabelas FTS5 de conteúdo externo, sincronizadas por triggers"""
+
+    @staticmethod
+    def consulta(termo):
+        # Cada palavra entre aspas (sem operadores do usuário), com busca por prefixo
+        return ' '.join(f'"{palavra}"*' for palavra in palavras(termo))
+
+    def filtro(self, indice, termo, campo='pk'):
+        encontrados = RawSQL(f'SELECT rowid FROM {indice.tabela} WHERE {indice.tabela} MATCH %s',
+                             [self.consulta(termo)])
+        return Q(**{f'{campo}__in': encontrados})
+
+    def relevancia(self, indice, termo, campo='pk', model=None):
+        """bm25 da linha (menor = mais relevante), pela coluna `campo` de `model`"""
+        coluna = model._meta.pk.column if campo == 'pk' else model._meta.get_field(campo).column
+        return RawSQL(
+            f'SELECT bm25({indice.tabela}) FROM {indice.tabela} '
+            f'WHERE {indice.tabela} MATCH %s AND rowid = "{model._meta.db_table}"."{coluna}"',
+            [self.consulta(termo)], output_field=FloatField(),
+        )
+
+    @staticmethod
+    def disponivel(conexao):
+        if conexao.alias not in _fts5_disponivel:
+            disponivel = False
+            if conexao.vendor == 'sqlite':
+                with conexao.cursor() as cursor:
+                    cursor.execute('PRAGMA compile_options')
+                    disponivel = any(opcao == 'ENABLE_FTS5' for opcao, in cursor.fetchall())
+            _fts5_disponivel[conexao.alias] = disponivel
+        return _fts5_disponivel[conexao.alias]
+
+    def _ddl(self, indice):
+        tabela, origem = indice.tabela, indice.model._meta.db_table
+        colunas = [indice.model._meta.get_field(nome).column for nome in indice.campos]
+        lista = ', '.join(colunas)
+        novos = ', '.join(f'new.{coluna}' for coluna in colunas)
+        antigos = ', '.join(f'old.{coluna}' for coluna in colunas)
+        remover = f"INSERT INTO {tabela}({tabela}, rowid, {lista}) VALUES ('delete', old.id, {antigos});"
+        inserir = f'INSERT INTO {tabela}(rowid, {lista}) VALUES (new.id, {novos});'
+        return [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {tabela} USING fts5({lista}, content='{origem}', "
+            f"content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+            f'CREATE TRIGGER IF NOT EXISTS {tabela}_ai AFTER INSERT ON {origem} BEGIN {inserir} END',
+            f'CREATE TRIGGER IF NOT EXISTS {tabela}_ad AFTER DELETE ON {origem} BEGIN {remover} END',
+            f'CREATE TRIGGER IF NOT EXISTS {tabela}_au AFTER UPDATE OF {lista} ON {origem} '
+            f'BEGIN {remover} {inserir} END',
+        ]
+
+    def instalar(self, conexao, reconstruir=False):
+        """Cria tabelas e triggers que faltarem; retorna os índices reconstruídos"""
+        if not self.disponivel(conexao):
+            return []
+        reconstruidos = []
+        with conexao.cursor() as cursor:
+            tabelas = {indice.model._meta.db_table for indice in INDICES.values()}
+            existentes = set(conexao.introspection.table_names(cursor))
+            if not tabelas <= existentes:
+                return []
+            for nome, indice in INDICES.items():
+                cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name IN (%s, %s, %s)",
+                               [f'{indice.tabela}_ai', f'{indice.tabela}_ad', f'{indice.tabela}_au'])
+                completo = cursor.fetchone()[0] == 3
+                for comando in self._ddl(indice):
+                    cursor.execute(comando)
+                if reconstruir or not completo:
+                    cursor.execute(f"INSERT INTO {indice.tabela}({indice.tabela}) VALUES ('rebuild')")
+                    reconstruidos.append(nome)
+        if reconstruidos:
+            logger.info(f"Índices de busca reconstruídos: {', '.join(reconstruidos)}")
+        return reconstruidos
+
+
+def backend():
+    escolhido = getattr(settings, 'SEARCH_BACKEND', 'auto')
+    if escolhido == 'fts5' or (escolhido == 'auto' and BuscaFTS5.disponivel(connection)):
+        return BuscaFTS5()
+    if escolhido in ('simples', 'auto'):
+        return BuscaSimples()
+    return import_string(escolhido)()
+
+
+def instalar(conexao=None, reconstruir=False):
+    """Prepara o índice do backend atual; retorna os índices reconstruídos"""
+    return backend().instalar(conexao or connection, reconstruir)
+
+
+def buscar(queryset, termo, fontes):
+    """
+    Filtra o queryset pelas palavras de `termo` e ordena por relevância.
+
+    Args:
+        queryset: consulta já restrita ao escopo do usuário
+        fontes: [(nome do índice, campo do queryset com o id da linha indexada)],
+            ex.: [('processos', 'pk'), ('funcionarios', 'employee')]
+    """
+    if not palavras(termo):
+        return queryset.none()
+    atual = backend()
+    condicao = Q()
+    relevancias = []
+    for nome, campo in fontes:
+        indice = INDICES[nome]
+        condicao |= atual.filtro(indice, termo, campo)
+        relevancia = atual.relevancia(indice, termo, campo, queryset.model)
+        if relevancia is not None:
+            relevancias.append(relevancia)
+    queryset = queryset.filter(condicao)
+    if not relevancias:
+        return queryset.order_by('-pk')
+    if len(relevancias) > 1:
+        relevancia = Coalesce(*relevancias, Value(0.0), output_field=FloatField())
+    else:
+        relevancia = relevancias[0]
+    return queryset.annotate(relevancia=relevancia).order_by('relevancia', '-pk')
@@ -0,0 +1,179 @@
+"""
+Envio de mensagens pela WhatsApp Cloud API com conexão persistente e
+controle de vazão.
+
+- Uma `requests.Session` por processo, com pool de conexões do tamanho do
+  pool de threads (keep-alive, sem novo handshake TLS por mensagem).
+- Um token bucket limita as mensagens por segundo ao throughput do número
+  remetente (WHATSAPP_RATE_PER_SECOND); uma resposta 429 esvazia o bucket
+  para que as demais threads também recuem.
+- `enviar_lote` despacha em paralelo por um pool de threads limitado
+  (WHATSAPP_MAX_WORKERS) e devolve o resultado de cada mensagem, na ordem.
+
+A URL base é configurável (WHATSAPP_API_URL), o que permite testar contra
+um servidor HTTP local.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+from django.conf import settings
+
+try:
+    import requests  # type: ignore
+    from requests.adapters import HTTPAdapter  # type: ignore
+except Exception:  # requests pode não estar instalado em alguns ambientes
+    requests = None  # fallback
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Limitador de vazão: `taxa` fichas por segundo, rajada de até `capacidade`"""
+
+    def __init__(self, taxa, capacidade=None):
+        self.taxa = float(taxa)
+        self.capacidade = float(capacidade or max(1.0, taxa))
+        self._fichas = self.capacidade
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _repor(self, agora):
+        self._fichas = min(self.capacidade, self._fichas + (agora - self._ultimo) * self.taxa)
+        self._ultimo = agora
+
+    def aguardar(self):
+        """Bloqueia até haver uma ficha disponível e a consome"""
+        while True:
+            with self._lock:
+                self._repor(time.monotonic())
+                if self._fichas >= 1:
+                    self._fichas -= 1
+                    return
+                espera = (1 - self._fichas) / self.taxa
+            time.sleep(espera)
+
+    def esvaziar(self, segundos=0):
+        """Zera as fichas (e adia a reposição), após o provedor sinalizar limite"""
+        with self._lock:
+            self._repor(time.monotonic())
+            self._fichas = -segundos * self.taxa
+
+
+def segundos_retry_after(valor, padrao=1.0):
+    """Retry-After em segundos: aceita segundos ou data HTTP; inválido ou ausente, `padrao`"""
+    if not valor:
+        return padrao
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        pass
+    try:
+        momento = parsedate_to_datetime(valor)
+    except (TypeError, ValueError):
+        return padrao
+    if momento.tzinfo is None:
+        momento = momento.replace(tzinfo=timezone.utc)
+    return max(0.0, (momento - datetime.now(timezone.utc)).total_seconds())
+
+
+class WhatsAppSender:
+    def __init__(self, token, phone_id, base_url='https://graph.facebook.com/v17.0',
+                 taxa=20, max_workers=8, timeout=10):
+        self.url = f"{base_url.rstrip('/')}/{phone_id}/messages"
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.bucket = TokenBucket(taxa)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({
+            'Authorization': f'Bearer {token}',
+            'Content-Type': 'application/json',
+        })
+
+    def enviar(self, phone_e164, message):
+        """
+        Envia uma mensagem de texto respeitando o limite de vazão.
+
+        Returns:
+            dict: {"ok", "status_code", "message_id", "error", "permanent"}
+            (permanent indica que repetir não adianta: 4xx exceto 408/429)
+        """
+        self.bucket.aguardar()
+        payload = {
+            'messaging_product': 'whatsapp',
+            'to': phone_e164,
+            'type': 'text',
+            'text': {'body': message[:4096]},  # limite de segurança
+        }
+        try:
+            resposta = self.session.post(self.url, json=payload, timeout=self.timeout)
+        except Exception as e:
+            return {'ok': False, 'status_code': None, 'message_id': None, 'error': str(e), 'permanent': False}
+
+        status_code = resposta.status_code
+        if status_code == 429:
+            self.bucket.esvaziar(segundos_retry_after(resposta.headers.get('Retry-After')))
+        if 200 <= status_code < 300:
+            try:
+                message_id = (resposta.json().get('messages') or [{}])[0].get('id')
+            except ValueError:
+                message_id = None
+            return {'ok': True, 'status_code': status_code, 'message_id': message_id, 'error': '', 'permanent': False}
+        return {
+            'ok': False,
+            'status_code': status_code,
+            'message_id': None,
+            'error': f"WhatsApp respondeu {status_code}: {resposta.text[:500]}",
+            'permanent': 400 <= status_code < 500 and status_code not in (408, 429),
+        }
+
+    def _enviar_isolado(self, phone_e164, message):
+        # Um erro inesperado numa mensagem não pode interromper o lote inteiro
+        try:
+            return self.enviar(phone_e164, message)
+        except Exception as e:
+            logger.exception(f"Erro inesperado no envio de WhatsApp para {phone_e164}")
+            return {'ok': False, 'status_code': None, 'message_id': None, 'error': str(e), 'permanent': False}
+
+    def enviar_lote(self, mensagens):
+        """Envia [(telefone, mensagem)] em paralelo; retorna os resultados na mesma ordem"""
+        if not mensagens:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(mensagens)),
+                                thread_name_prefix='whatsapp') as executor:
+            return list(executor.map(lambda item: self._enviar_isolado(*item), mensagens))
+
+
+_sender = None
+_sender_lock = threading.Lock()
+
+
+def whatsapp_configurado():
+    if not getattr(settings, 'WHATSAPP_ENABLED', False):
+        return False
+    if getattr(settings, 'WHATSAPP_PROVIDER', 'meta') != 'meta':
+        # Espaço para provedores customizados via webhook
+        return False
+    return bool(requests and getattr(settings, 'WHATSAPP_TOKEN', '') and getattr(settings, 'WHATSAPP_PHONE_ID', ''))
+
+
+def obter_sender():
+    """Sender do processo (sessão e limitador compartilhados entre os lotes)"""
+    global _sender
+    with _sender_lock:
+        if _sender is None:
+            _sender = WhatsAppSender(
+                token=getattr(settings, 'WHATSAPP_TOKEN', ''),
+                phone_id=getattr(settings, 'WHATSAPP_PHONE_ID', ''),
+                base_url=getattr(settings, 'WHATSAPP_API_URL', 'https://graph.facebook.com/v17.0'),
+                taxa=getattr(settings, 'WHATSAPP_RATE_PER_SECOND', 20),
+                max_workers=getattr(settings, 'WHATSAPP_MAX_WORKERS', 8),
+                timeout=getattr(settings, 'WHATSAPP_TIMEOUT', 10),
+            )
+        return _sender
@@ -0,0 +1,111 @@
+"""
+Sinais do app core.
+
+Mantêm o cache de disponibilidade coerente: toda escrita em Schedule,
+ScheduleConfig, AgendaBlock ou nos usuários do sindicato invalida os
+snapshots afetados. Reservas temporárias invalidam apenas o dia reservado.
+
+Também mantêm os contadores do painel (criação/remoção de empresas,
+sindicatos e agendamentos) e o buffer de últimos acessos (login).
+
+Depois das migrações, garantem as tabelas e triggers do índice de busca.
+"""
+from django.db import connections
+from django.db.models.signals import post_delete, post_init, post_migrate, post_save
+from django.dispatch import receiver
+
+from .models.block import AgendaBlock
+from .models.company import Company
+from .models.config import ScheduleConfig
+from .models.reservation import SlotHold
+from .models.schedule import Schedule
+from .models.union import Union
+from .models.user import User
+from .services import availability_cache, counters, search_service
+
+
+def _original_agendamento(instance):
+    # Lido de __dict__ para não disparar consultas de campos adiados
+    return tuple(instance.__dict__.get(campo) for campo in ('union_id', 'date', 'start_time'))
+
+
+@receiver(post_init, sender=Schedule)
+def guardar_original(sender, instance, **kwargs):
+    """Sindicato, dia e início lidos: remarcação (cache e lembretes, ver Schedule.save)"""
+    instance._original = _original_agendamento(instance)
+
+
+@receiver([post_save, post_delete], sender=Schedule)
+def invalidar_disponibilidade_agendamento(sender, instance, **kwargs):
+    union_id, dia, _ = getattr(instance, '_original', (None, None, None))
+    if (union_id, dia) != (instance.union_id, instance.date):
+        # Remarcação para outro dia/sindicato: o dia antigo também muda
+        availability_cache.invalidar_dia(union_id, dia)
+    availability_cache.invalidar_dia(instance.union_id, instance.date)
+    instance._original = _original_agendamento(instance)
+
+
+@receiver([post_save, post_delete], sender=SlotHold)
+def invalidar_disponibilidade_reserva(sender, instance, **kwargs):
+    availability_cache.invalidar_dia(instance.union_id, instance.date)
+
+
+@receiver([post_save, post_delete], sender=ScheduleConfig)
+def invalidar_disponibilidade_config(sender, instance, **kwargs):
+    union_id = User.objects.filter(pk=instance.union_user_id).values_list('union_id', flat=True).first()
+    availability_cache.invalidar_sindicato(union_id)
+
+
+@receiver([post_save, post_delete], sender=AgendaBlock)
+def invalidar_disponibilidade_bloqueio(sender, instance, **kwargs):
+    availability_cache.invalidar_sindicato(instance.union_id)
+
+
+@receiver(post_init, sender=User)
+def guardar_sindicato_original(sender, instance, **kwargs):
+    instance._sindicato_original = instance.__dict__.get('union_id')
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidar_disponibilidade_usuario(sender, instance, update_fields=None, **kwargs):
+    # Login (update_last_login) não altera nada dos slots
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    # Nome e vínculo do homologador fazem parte dos slots em cache
+    original = getattr(instance, '_sindicato_original', None)
+    if original and original != instance.union_id:
+        availability_cache.invalidar_sindicato(original)
+    if instance.union_id:
+        availability_cache.invalidar_sindicato(instance.union_id)
+    instance._sindicato_original = instance.union_id
+
+
+_CONTADOR_POR_MODELO = {modelo: nome for nome, modelo in counters.CONTADORES.items()}
+
+
+@receiver(post_save, sender=Company)
+@receiver(post_save, sender=Union)
+@receiver(post_save, sender=Schedule)
+def contar_criacao(sender, instance, created, **kwargs):
+    if created:
+        counters.incrementar(_CONTADOR_POR_MODELO[sender])
+
+
+@receiver(post_delete, sender=Company)
+@receiver(post_delete, sender=Union)
+@receiver(post_delete, sender=Schedule)
+def contar_remocao(sender, instance, **kwargs):
+    counters.incrementar(_CONTADOR_POR_MODELO[sender], -1)
+
+
+@receiver(post_save, sender=User)
+def registrar_ultimo_acesso(sender, instance, update_fields=None, **kwargs):
+    # update_last_login (sinal user_logged_in / login JWT) grava apenas last_login
+    if update_fields and 'last_login' in update_fields and instance.last_login:
+        counters.registrar_acesso(instance)
+
+
+@receiver(post_migrate)
+def instalar_indice_busca(sender, using='default', **kwargs):
+    if sender.name == 'core':
+        search_service.instalar(connections[using])
@@ -1,3 +1,1472 @@
-from django.test import TestCase
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import csv
+import email.utils
+import gzip
+import io
+import json
+import re
+import smtplib
+import tempfile
+import threading
+import time as relogio
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.apps import apps
+from django.conf import settings
+from django.core import mail
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from app_google.models import GoogleCalendarJob, GoogleOAuthToken
+from app_google.services import calendar_jobs, freebusy_service
+from app_google.services.client_pool import ClientPool, _Cliente
+
+from .models import (
+    AgendaBlock, Company, DemissaoProcess, Document, Employee, OutboundNotification, Schedule, ScheduleConfig, SlotHold,
+    SystemLog, SystemLogArchive, SystemLogRollup, Union, User,
+)
+from .services.assignment_service import atribuir_homologador, homologadores_disponiveis, obter_politica
+from .services.availability_service import (
+    AvailabilityIndex, agrupar_por_horario, disponibilidade_periodo, matriz_ocupacao,
+)
+from .services import availability_cache, bulk_scheduling_service
+from .services.bulk_scheduling_service import agendar_lote
+from .services import counters
+from .services.log_archive import arquivar, arquivar_dia, buscar_logs
+from .services.log_buffer import LogBuffer
+from .utils.logging import create_log
+from .services.log_stats import compactar, estatisticas_consulta, estatisticas_rollup
+from .services.notification_outbox import despachar_pendentes
+from .services import whatsapp_sender
+from .services.email_rendering import renderizar_agendamento, renderizar_lote
+from .services.email_service import EmailService
+from .services.reminder_service import PROXIMA_HORA, VESPERA, _reivindicar, enviar_lembretes
+from .services.notification_service import notify_agendamento
+from .services.reservation_service import (
+    HorarioIndisponivel, confirmar_reserva, reservar_com_atribuicao, reservar_horario,
+)
+
+# Segunda-feira
+DIA = date(2030, 1, 7)
+
+
+class AgendaTestMixin:
+    """Sindicato, empresa e homologadores com jornada configurada para DIA"""
+
+    def setUp(self):
+        self.union = Union.objects.create(name='Sindicato', cnpj='1')
+        self.company = Company.objects.create(name='Empresa', cnpj='2')
+        self.employee = Employee.objects.create(
+            name='Fulano', company=self.company, union=self.union, status='ativo'
+        )
+
+    def _homologadores(self, quantidade, duracao=30):
+        inicio = User.objects.filter(union=self.union).count()
+        users = []
+        for i in range(inicio, inicio + quantidade):
+            user = User.objects.create(
+                username=f'h{i}', email=f'h{i}@veramo.local', role='union_common', union=self.union
+            )
+            ScheduleConfig.objects.create(
+                union_user=user, weekday=DIA.weekday(), start_time=time(8), end_time=time(18),
+                duration_minutes=duracao, break_minutes=0,
+            )
+            Schedule.objects.create(
+                employee=self.employee, company=self.company, union=self.union, union_user=user,
+                date=DIA, start_time=time(9), end_time=time(10), status='agendado',
+            )
+            users.append(user)
+        return users
+
+
+class AvailabilityIndexTests(AgendaTestMixin, TestCase):
+    """Benchmark de consultas e regras do motor de disponibilidade"""
+
+    def _contar_consultas(self):
+        with CaptureQueriesContext(connection) as ctx:
+            slots = AvailabilityIndex(self.union.id, DIA).slots_livres(DIA)
+        return len(ctx.captured_queries), slots
+
+    def test_numero_de_consultas_constante(self):
+        self._homologadores(2, duracao=60)
+        consultas_pequeno, slots = self._contar_consultas()
+        self.assertEqual(len(slots), 2 * 9)
+
+        self._homologadores(18, duracao=15)
+        consultas_grande, slots = self._contar_consultas()
+        self.assertEqual(len(slots), 2 * 9 + 18 * 36)
+
+        self.assertEqual(consultas_pequeno, consultas_grande)
+        self.assertEqual(consultas_grande, 4)
+
+    def test_bloqueios_removem_slots(self):
+        bloqueado, livre = self._homologadores(2, duracao=60)
+        AgendaBlock.objects.create(
+            union=self.union, user=bloqueado,
+            start=timezone.make_aware(datetime.combine(DIA, time(14))),
+            end=timezone.make_aware(datetime.combine(DIA, time(16))),
+        )
+        slots = AvailabilityIndex(self.union.id, DIA).slots_livres(DIA)
+        horarios = {(s['user_id'], s['start_time']) for s in slots}
+        self.assertNotIn((bloqueado.id, '14:00'), horarios)
+        self.assertNotIn((bloqueado.id, '15:00'), horarios)
+        self.assertIn((livre.id, '14:00'), horarios)
+        self.assertNotIn((livre.id, '09:00'), horarios)
+
+        agrupados = {s['time_key']: s for s in agrupar_por_horario(slots)}
+        self.assertEqual(agrupados['14:00-15:00']['available_vacancies'], 1)
+        self.assertEqual(agrupados['08:00-09:00']['available_vacancies'], 2)
+
+
+@override_settings(AVAILABILITY_CACHE_ENABLED=True)
+class AvailabilityCacheTests(AgendaTestMixin, TestCase):
+    """Snapshots de disponibilidade invalidados no commit de quem escreve"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.homologador, = self._homologadores(1, duracao=60)
+
+    def _horarios(self):
+        return {slot['start_time'] for slot in availability_cache.slots_livres_dia(self.union.id, DIA)}
+
+    def test_versao_muda_so_no_commit(self):
+        self.assertIn('14:00', self._horarios())
+        chave = f'availability:ver:{self.union.id}:{DIA.isoformat()}'
+        versao = cache.get(chave)
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            Schedule.objects.create(
+                employee=self.employee, company=self.company, union=self.union, union_user=self.homologador,
+                date=DIA, start_time=time(14), end_time=time(15), status='agendado',
+            )
+            # Antes do commit a versão não muda: um snapshot calculado agora por outro
+            # worker (com os dados anteriores ao commit) fica obsoleto no commit
+            self.assertEqual(cache.get(chave), versao)
+            self.assertIn('14:00', self._horarios())
+        self.assertEqual(len(callbacks), 1)
+        self.assertNotEqual(cache.get(chave), versao)
+        self.assertNotIn('14:00', self._horarios())
+
+    def test_login_nao_invalida_sindicato(self):
+        from django.contrib.auth.signals import user_logged_in
+
+        self._horarios()
+        chave = f'availability:gen:{self.union.id}'
+        geracao = cache.get(chave)
+        with self.captureOnCommitCallbacks(execute=True):
+            user_logged_in.send(sender=User, request=None, user=self.homologador)
+        self.assertEqual(cache.get(chave), geracao)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.homologador.first_name = 'Novo'
+            self.homologador.save()
+        self.assertNotEqual(cache.get(chave), geracao)
+
+class ReservationServiceTests(AgendaTestMixin, TestCase):
+    """Reservas temporárias e check-and-insert travado"""
+
+    def test_reserva_bloqueia_mesmo_horario(self):
+        homologador, = self._homologadores(1, duracao=60)
+        reservar_horario(self.union.id, homologador.id, DIA, time(14), time(15))
+        with self.assertRaises(HorarioIndisponivel):
+            reservar_horario(self.union.id, homologador.id, DIA, time(14, 30), time(15, 30))
+
+        slots = AvailabilityIndex(self.union.id, DIA).slots_livres(DIA)
+        self.assertNotIn('14:00', {s['start_time'] for s in slots})
+
+    def test_reserva_expirada_libera_horario(self):
+        homologador, = self._homologadores(1, duracao=60)
+        reserva = reservar_horario(self.union.id, homologador.id, DIA, time(14), time(15))
+        SlotHold.objects.filter(pk=reserva.pk).update(expires_at=timezone.now() - timedelta(seconds=1))
+        reservar_horario(self.union.id, homologador.id, DIA, time(14), time(15))
+        self.assertEqual(SlotHold.objects.count(), 1)
+
+    def test_confirmar_reserva_consome_reserva(self):
+        homologador, = self._homologadores(1, duracao=60)
+        reserva = reservar_horario(self.union.id, homologador.id, DIA, time(14), time(15))
+        with confirmar_reserva(reserva):
+            Schedule.objects.create(
+                employee=self.employee, company=self.company, union=self.union, union_user=homologador,
+                date=DIA, start_time=time(14), end_time=time(15), status='agendado',
+            )
+        self.assertFalse(SlotHold.objects.exists())
+        with self.assertRaises(HorarioIndisponivel):
+            reservar_horario(self.union.id, homologador.id, DIA, time(14), time(15))
+
+    def test_atribuicao_automatica_ignora_homologador_reservado(self):
+        reservado, livre = self._homologadores(2, duracao=60)
+        reservar_horario(self.union.id, reservado.id, DIA, time(14), time(15))
+        reserva = reservar_com_atribuicao(self.union.id, DIA, time(14), time(15))
+        self.assertEqual(reserva.union_user_id, livre.id)
+        with self.assertRaises(HorarioIndisponivel):
+            reservar_com_atribuicao(self.union.id, DIA, time(14), time(15))
+
+
+class AssignmentServiceTests(AgendaTestMixin, TestCase):
+    """Candidatos livres em uma consulta e políticas de atribuição"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.h0, self.h1, self.h2 = self._homologadores(3)
+
+    def _agendar(self, user, dia, hora, status='agendado'):
+        Schedule.objects.create(employee=self.employee, company=self.company, union=self.union, union_user=user,
+                                date=dia, start_time=time(hora), end_time=time(hora + 1), status=status)
+
+    def _livres(self, inicio, fim):
+        return [c['id'] for c in homologadores_disponiveis(self.union.id, DIA, inicio, fim)]
+
+    def test_filtro_de_conflitos(self):
+        self.assertEqual(self._livres(time(9, 30), time(10, 30)), [])
+        self.assertEqual(self._livres(time(17), time(19)), [])
+        with self.assertNumQueries(1):
+            self.assertEqual(self._livres(time(10), time(11)), [self.h0.id, self.h1.id, self.h2.id])
+
+        SlotHold.objects.create(union=self.union, union_user=self.h0, date=DIA, start_time=time(10),
+                                end_time=time(11), token='ativa', expires_at=timezone.now() + timedelta(minutes=5))
+        SlotHold.objects.create(union=self.union, union_user=self.h1, date=DIA, start_time=time(10),
+                                end_time=time(11), token='expirada', expires_at=timezone.now() - timedelta(minutes=5))
+        AgendaBlock.objects.create(union=self.union, user=self.h2,
+                                   start=timezone.make_aware(datetime.combine(DIA, time(10, 30))),
+                                   end=timezone.make_aware(datetime.combine(DIA, time(12))))
+        self.assertEqual(self._livres(time(10), time(11)), [self.h1.id])
+
+        AgendaBlock.objects.create(union=self.union, start=timezone.make_aware(datetime.combine(DIA, time(10))),
+                                   end=timezone.make_aware(datetime.combine(DIA, time(11))))
+        self.assertEqual(self._livres(time(10), time(11)), [])
+
+    def test_menor_carga_no_dia_e_na_semana(self):
+        self._agendar(self.h0, DIA, 11)
+        self._agendar(self.h0, DIA + timedelta(days=2), 9)
+        self._agendar(self.h1, DIA + timedelta(days=1), 9)
+        self._agendar(self.h1, DIA + timedelta(days=1), 10)
+        self._agendar(self.h2, DIA, 12)
+        self._agendar(self.h2, DIA, 16, status='cancelado')
+        # Semana seguinte não conta
+        self._agendar(self.h2, DIA + timedelta(days=7), 9)
+
+        cargas = {c['id']: (c['carga_dia'], c['carga_semana'])
+                  for c in homologadores_disponiveis(self.union.id, DIA, time(14), time(15))}
+        self.assertEqual(cargas, {self.h0.id: (2, 3), self.h1.id: (1, 3), self.h2.id: (2, 2)})
+        self.assertEqual(atribuir_homologador(self.union.id, DIA, time(14), time(15), 'menor_carga_dia'), self.h1.id)
+        self.assertEqual(atribuir_homologador(self.union.id, DIA, time(14), time(15), 'menor_carga_semana'),
+                         self.h2.id)
+
+    def test_rodizio_aleatorio_e_politica_desconhecida(self):
+        escolhidos = [atribuir_homologador(self.union.id, DIA, time(14), time(15), 'rodizio') for _ in range(4)]
+        self.assertEqual(escolhidos, [self.h0.id, self.h1.id, self.h2.id, self.h0.id])
+        # Vez 5 entre os dois candidatos restantes
+        self.assertEqual(atribuir_homologador(self.union.id, DIA, time(14), time(15), 'rodizio',
+                                              excluir={self.h1.id}), self.h0.id)
+
+        self.assertIn(atribuir_homologador(self.union.id, DIA, time(14), time(15), 'aleatorio'),
+                      {self.h0.id, self.h1.id, self.h2.id})
+        self.assertIsNone(atribuir_homologador(self.union.id, DIA, time(9), time(10), 'aleatorio'))
+        with self.assertLogs('core.services.assignment_service', 'WARNING'):
+            self.assertIs(obter_politica('inexistente'), obter_politica('menor_carga_dia'))
+
+
+class BulkSchedulingTests(AgendaTestMixin, TestCase):
+    """Agendamento em lote: planejamento, revalidação na gravação e relatório por processo"""
+
+    def _processos(self, quantidade, status='documentos_aprovados'):
+        return [
+            DemissaoProcess.objects.create(nome_funcionario=f'F{i}', motivo='x', exame='x', status=status,
+                                           empresa=self.company, sindicato=self.union)
+            for i in range(quantidade)
+        ]
+
+    def _lote(self, ids):
+        return {r['process_id']: r for r in agendar_lote(DemissaoProcess.objects.all(), ids, DIA, DIA)}
+
+    def test_planejamento_e_relatorio(self):
+        h0, h1 = self._homologadores(2, duracao=60)
+        aptos = self._processos(3)
+        rascunho, = self._processos(1, status='aguardando_aprovacao')
+
+        relatorio = self._lote([p.id for p in aptos] + [rascunho.id, 999])
+
+        # Horário mais cedo primeiro (9h ocupado); no empate, o homologador com menos atribuições
+        agendados = [relatorio[p.id] for p in aptos]
+        self.assertEqual([(r['status'], r['start_time']) for r in agendados],
+                         [('scheduled', '08:00'), ('scheduled', '08:00'), ('scheduled', '10:00')])
+        self.assertEqual({agendados[0]['user_id'], agendados[1]['user_id']}, {h0.id, h1.id})
+        self.assertEqual(relatorio[rascunho.id]['status'], 'invalid_status')
+        self.assertEqual(relatorio[999]['status'], 'not_found')
+        self.assertEqual(DemissaoProcess.objects.filter(status='agendado').count(), 3)
+        self.assertEqual(Schedule.objects.filter(demissao_process__isnull=False).count(), 3)
+        self.assertEqual(GoogleCalendarJob.objects.count(), 3)
+
+    def test_processos_alem_dos_horarios_livres(self):
+        self._homologadores(1, duracao=60)
+        processos = self._processos(10)
+        relatorio = self._lote([p.id for p in processos])
+        self.assertEqual([relatorio[p.id]['status'] for p in processos], ['scheduled'] * 9 + ['no_slot'])
+
+    def test_revalida_status_e_horario_na_gravacao(self):
+        homologador, = self._homologadores(1, duracao=60)
+        agendado_fora, ocupado, livre = self._processos(3)
+        planejar = bulk_scheduling_service._planejar
+
+        def planejar_e_concorrer(*args):
+            plano = planejar(*args)
+            # Entre o planejamento e a gravação, outra requisição agenda um processo
+            # e ocupa o horário planejado para outro
+            DemissaoProcess.objects.filter(pk=agendado_fora.pk).update(status='agendado')
+            dia, slot = plano[ocupado.id]
+            Schedule.objects.create(
+                employee=self.employee, company=self.company, union=self.union, union_user=homologador, date=dia,
+                start_time=time.fromisoformat(slot['start_time']), end_time=time.fromisoformat(slot['end_time']),
+            )
+            return plano
+
+        with mock.patch('core.services.bulk_scheduling_service._planejar', side_effect=planejar_e_concorrer):
+            relatorio = self._lote([agendado_fora.id, ocupado.id, livre.id])
+
+        self.assertEqual([relatorio[p.id]['status'] for p in (agendado_fora, ocupado, livre)],
+                         ['invalid_status', 'conflict', 'scheduled'])
+        self.assertFalse(Schedule.objects.filter(demissao_process__in=[agendado_fora, ocupado]).exists())
+        ocupado.refresh_from_db()
+        self.assertEqual(ocupado.status, 'documentos_aprovados')
+
+class GoogleCalendarJobTests(AgendaTestMixin, TestCase):
+    """Fila de criação de reuniões no Google Calendar"""
+
+    def setUp(self):
+        super().setUp()
+        self.homologador, = self._homologadores(1, duracao=60)
+        self.schedule = Schedule.objects.get(union_user=self.homologador)
+
+    def _processar(self, **kwargs):
+        with mock.patch('app_google.services.google_meet_service.criar_meet_para_homologador', **kwargs) as criar:
+            calendar_jobs.processar_pendentes()
+        return criar
+
+    def test_falha_transitoria_reagenda_com_o_mesmo_request_id(self):
+        job = calendar_jobs.enfileirar_criacao(self.schedule, 'Homologação')
+        self.assertEqual(self.schedule.meeting_status, 'pendente')
+
+        self._processar(side_effect=ConnectionError('timeout'))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (GoogleCalendarJob.PENDENTE, 1))
+        self.assertGreater(job.next_attempt_at, timezone.now())
+
+        GoogleCalendarJob.objects.update(next_attempt_at=timezone.now())
+        criar = self._processar(return_value={
+            'event_id': job.request_id, 'meet_link': 'https://meet.google.com/abc-defg-hij',
+            'html_link': None, 'conference_id': 'abc-defg-hij',
+        })
+        self.assertEqual(criar.call_args.kwargs['request_id'], job.request_id)
+        job.refresh_from_db()
+        self.schedule.refresh_from_db()
+        self.assertEqual(job.status, GoogleCalendarJob.CONCLUIDO)
+        self.assertEqual(self.schedule.meeting_status, 'criada')
+        self.assertEqual(self.schedule.video_link, 'https://meet.google.com/abc-defg-hij')
+
+    def test_homologador_sem_google_falha_sem_repetir(self):
+        job = calendar_jobs.enfileirar_criacao(self.schedule, 'Homologação')
+        with mock.patch('core.services.notification_service.notify_homologador_pendente_meet') as notificar:
+            self._processar(side_effect=PermissionError('Homologador sem Google conectado.'))
+        job.refresh_from_db()
+        self.schedule.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (GoogleCalendarJob.FALHOU, 1))
+        self.assertEqual(self.schedule.meeting_status, 'falhou')
+        notificar.assert_called_once()
+
+    def test_sem_homologador_usa_conta_do_sistema_pela_fila(self):
+        self.schedule.union_user = None
+        self.schedule.save()
+        job = calendar_jobs.enfileirar_criacao(self.schedule, 'Homologação')
+        self.assertIsNone(job.homologador_id)
+
+        with mock.patch('core.services.google_meet_service.GoogleMeetService') as servico:
+            servico.return_value.create_meeting.return_value = {
+                'event_id': 'evt', 'conference_id': 'abc', 'meet_link': 'https://meet.google.com/abc',
+                'html_link': None,
+            }
+            calendar_jobs.processar_pendentes()
+        job.refresh_from_db()
+        self.schedule.refresh_from_db()
+        self.assertEqual(job.status, GoogleCalendarJob.CONCLUIDO)
+        self.assertEqual((self.schedule.meeting_status, self.schedule.google_calendar_event_id), ('criada', 'evt'))
+
+    def test_verificacao_consulta_o_sindicato_num_batch(self):
+        from app_google.models import GoogleOAuthToken
+
+        outro, _ = self._homologadores(2)
+        for homologador in (self.homologador, outro):
+            GoogleOAuthToken.objects.create(homologador_id=homologador.id, email_google=homologador.email,
+                                            access_token='a', refresh_token='r')
+        calendar_jobs.enfileirar_criacao(self.schedule, 'Homologação', verificar_disponibilidade=True)
+        with mock.patch('app_google.services.google_meet_service.verificar_disponibilidade_homologador',
+                        return_value=True) as verificar:
+            self._processar(return_value={'event_id': 'evt', 'meet_link': None})
+        self.assertEqual(verificar.call_args.args[0], self.homologador.id)
+        self.assertEqual(list(verificar.call_args.args[3]), [outro.id])
+
+
+class ClientPoolTests(TestCase):
+    """Pool de clientes do Google Calendar (credenciais de teste, sem rede)"""
+
+    def setUp(self):
+        for homologador_id in (1, 2, 3):
+            self._conectar(homologador_id)
+        construir = mock.patch('app_google.services.client_pool.build', side_effect=lambda *a, **k: mock.Mock())
+        self.build = construir.start()
+        self.addCleanup(construir.stop)
+        fechar = mock.patch.object(_Cliente, 'fechar', autospec=True)
+        self.fechar = fechar.start()
+        self.addCleanup(fechar.stop)
+        self.pool = ClientPool(max_clientes=2)
+
+    def _conectar(self, homologador_id):
+        return GoogleOAuthToken.objects.create(
+            homologador_id=homologador_id, email_google=f'h{homologador_id}@gmail.com', access_token='acesso',
+            refresh_token='renovacao', token_expiry=timezone.now() + timedelta(hours=1),
+        )
+
+    def _usar(self, homologador_id):
+        with self.pool.cliente(homologador_id) as service:
+            return service
+
+    def test_lru_descarta_o_menos_usado(self):
+        primeiro = self._usar(1)
+        self._usar(2)
+        self.assertIs(self._usar(1), primeiro)
+        self._usar(3)
+        self.assertEqual(list(self.pool._clientes), [1, 3])
+        self.assertEqual(self.build.call_count, 3)
+        self.assertEqual([chamada.args[0].token.homologador_id for chamada in self.fechar.call_args_list], [2])
+
+        self._usar(2)
+        self.assertEqual(self.build.call_count, 4)
+        self.assertEqual(list(self.pool._clientes), [3, 2])
+
+    def test_token_atualizado_reconstroi_o_cliente(self):
+        antigo = self._usar(1)
+        self.assertIs(self._usar(1), antigo)
+
+        # Reconexão feita em outro worker: updated_at do token muda
+        token = GoogleOAuthToken.objects.get(homologador_id=1)
+        token.access_token = 'novo'
+        token.save()
+        novo = self._usar(1)
+        self.assertIsNot(novo, antigo)
+        self.assertEqual(self.pool._clientes[1].creds.token, 'novo')
+        self.assertEqual(self.fechar.call_count, 1)
+
+    def test_invalidar_e_sem_google(self):
+        antigo = self._usar(1)
+        self.pool.invalidar(1)
+        self.pool.invalidar(99)
+        self.assertNotIn(1, self.pool._clientes)
+        self.assertEqual(self.fechar.call_count, 1)
+        self.assertIsNot(self._usar(1), antigo)
+
+        with self.assertRaises(PermissionError):
+            self._usar(99)
+        with self.pool.clientes([1, 2, 99]) as services:
+            self.assertEqual(sorted(services), [1, 2])
+
+
+class _BatchFalso:
+    """Batch HTTP do Google: responde a cada consulta com um intervalo ocupado"""
+
+    def __init__(self, callback, executados, falhar):
+        self.callback = callback
+        self.ids = []
+        self.executados = executados
+        self.falhar = falhar
+
+    def add(self, requisicao, request_id):
+        self.ids.append(request_id)
+
+    def execute(self):
+        self.executados.append(len(self.ids))
+        if self.falhar(self.ids):
+            raise RuntimeError('batch recusado')
+        for request_id in self.ids:
+            self.callback(request_id, {'calendars': {'primary': {'busy': [
+                {'start': f'{DIA.isoformat()}T12:00:00Z', 'end': f'{DIA.isoformat()}T13:00:00Z'},
+            ]}}}, None)
+
+
+class FreeBusyBatchTests(TestCase):
+    """Free/busy do Google em batches de no máximo 50 chamadas"""
+
+    def setUp(self):
+        cache.clear()
+        self.executados = []
+        self.falhar = lambda ids: False
+
+    def _services(self, ids):
+        def service():
+            falso = mock.Mock()
+            falso.new_batch_http_request.side_effect = (
+                lambda callback: _BatchFalso(callback, self.executados, self.falhar))
+            return falso
+        return {hid: service() for hid in ids}
+
+    def _consultar(self, ids):
+        @contextmanager
+        def clientes(homologador_ids):
+            yield self._services(homologador_ids)
+
+        with mock.patch('app_google.services.freebusy_service.pool.clientes', side_effect=clientes):
+            return freebusy_service.consultar_ocupacao(ids, DIA)
+
+    def test_divide_em_batches_de_50(self):
+        ocupacao = self._consultar(list(range(1, 121)))
+        self.assertEqual(self.executados, [50, 50, 20])
+        self.assertEqual(len(ocupacao), 120)
+        self.assertEqual(ocupacao[120], [(9 * 60, 10 * 60)])
+        # Em cache: nova consulta não chama o Google
+        self.assertEqual(len(self._consultar(list(range(1, 121)))), 120)
+        self.assertEqual(self.executados, [50, 50, 20])
+
+    def test_falha_de_um_batch_afeta_so_os_dele(self):
+        self.falhar = lambda ids: '51' in ids
+        with self.assertLogs('app_google.services.freebusy_service', 'ERROR'):
+            ocupacao = self._consultar(list(range(1, 121)))
+        self.assertEqual(sorted(ocupacao), list(range(1, 51)) + list(range(101, 121)))
+
+
+class ProcessScheduleLinkTests(AgendaTestMixin, TestCase):
+    """Backfill dos vínculos processo -> funcionário -> agendamento"""
+
+    def test_backfill_vincula_processos_e_agendamentos(self):
+        from importlib import import_module
+        vincular = import_module('core.migrations.0023_backfill_process_schedule_links').vincular
+
+        homologador, = self._homologadores(1)
+        Employee.objects.create(name='Fulano', company=self.company, union=self.union, status='ativo')
+        antigo = DemissaoProcess.objects.create(nome_funcionario='Fulano', motivo='x', exame='x',
+                                                empresa=self.company, sindicato=self.union)
+        DemissaoProcess.objects.filter(pk=antigo.pk).update(data_inicio=timezone.now() - timedelta(days=30))
+        atual = DemissaoProcess.objects.create(nome_funcionario='Fulano', motivo='x', exame='x',
+                                               empresa=self.company, sindicato=self.union)
+        passado = Schedule.objects.create(
+            employee=self.employee, company=self.company, union=self.union, union_user=homologador,
+            date=timezone.localdate() - timedelta(days=10), start_time=time(9), end_time=time(10), status='concluido',
+        )
+
+        vincular(apps, None)
+
+        antigo.refresh_from_db()
+        atual.refresh_from_db()
+        self.assertEqual(antigo.employee_id, self.employee.id)
+        self.assertEqual(atual.employee_id, self.employee.id)
+        passado.refresh_from_db()
+        self.assertEqual(passado.demissao_process_id, antigo.id)
+        self.assertEqual(atual.agendamento_atual().date, DIA)
+
+
+API_SETTINGS = dict(
+    ALLOWED_HOSTS=['*'], SECURE_SSL_REDIRECT=False,
+    REST_FRAMEWORK={'DEFAULT_THROTTLE_RATES': {'user': '1000/min'}, 'PAGE_SIZE': 20,
+                    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination'},
+)
+
+
+@override_settings(**API_SETTINGS)
+class AvailabilityApiTests(AgendaTestMixin, TestCase):
+    """Disponibilidade por período e próximos horários livres"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.homologador, = self._homologadores(1, duracao=60)
+        self.client = APIClient()
+        self.client.force_authenticate(self.homologador)
+
+    def _periodo(self, inicio, fim):
+        return self.client.get('/api/schedule-configs/available-slots-range/',
+                               {'union': self.union.id, 'date_from': inicio.isoformat(), 'date_to': fim.isoformat()})
+
+    def _proximos(self, **params):
+        return self.client.get('/api/schedule-configs/next-available-slots/', {'union': self.union.id, **params})
+
+    def test_periodo_limitado_a_31_dias(self):
+        with CaptureQueriesContext(connection) as semana:
+            self.assertEqual(self._periodo(DIA, DIA + timedelta(days=6)).status_code, 200)
+        cache.clear()
+        with CaptureQueriesContext(connection) as mes:
+            response = self._periodo(DIA, DIA + timedelta(days=30))
+        self.assertEqual(response.status_code, 200)
+        # Uma única passada: o número de consultas não cresce com a janela
+        self.assertEqual(len(mes.captured_queries), len(semana.captured_queries))
+
+        dias = response.data['days']
+        self.assertEqual(len(dias), 31)
+        # Jornada só às segundas; em DIA, 9h já está ocupado
+        self.assertEqual(len(dias[DIA.isoformat()]), 9)
+        self.assertEqual(len(dias[(DIA + timedelta(days=7)).isoformat()]), 10)
+        self.assertEqual(dias[(DIA + timedelta(days=1)).isoformat()], [])
+
+        self.assertEqual(self._periodo(DIA, DIA + timedelta(days=31)).status_code, 400)
+        self.assertEqual(self._periodo(DIA, DIA - timedelta(days=1)).status_code, 400)
+        self.assertEqual(self.client.get('/api/schedule-configs/available-slots-range/',
+                                         {'union': self.union.id, 'date_from': '07/01/2030',
+                                          'date_to': '2030-01-08'}).status_code, 400)
+
+    def test_proximos_em_blocos_de_7_dias(self):
+        with mock.patch('core.services.availability_service.disponibilidade_periodo',
+                        wraps=disponibilidade_periodo) as periodo:
+            response = self._proximos(after=f'{DIA.isoformat()}T00:00', limit=20)
+        slots = response.data['slots']
+        self.assertEqual(len(slots), 20)
+        self.assertEqual([chamada.args[1:] for chamada in periodo.call_args_list], [
+            (DIA, DIA + timedelta(days=6)),
+            (DIA + timedelta(days=7), DIA + timedelta(days=13)),
+            (DIA + timedelta(days=14), DIA + timedelta(days=20)),
+        ])
+        self.assertEqual((slots[0]['date'], slots[0]['start_time']), (DIA.isoformat(), '08:00'))
+        self.assertEqual(slots[-1]['date'], (DIA + timedelta(days=14)).isoformat())
+
+        apos_almoco = self._proximos(after=f'{DIA.isoformat()}T14:00', limit=1).data['slots']
+        self.assertEqual(apos_almoco[0]['start_time'], '14:00')
+        self.assertEqual(self._proximos(after='amanhã').status_code, 400)
+
+    def test_proximos_limitados_ao_horizonte(self):
+        with override_settings(AVAILABILITY_SEARCH_HORIZON_DAYS=10), \
+                mock.patch('core.services.availability_service.disponibilidade_periodo',
+                           wraps=disponibilidade_periodo) as periodo:
+            response = self._proximos(after=f'{DIA.isoformat()}T00:00', limit=1000)
+        self.assertEqual(response.data['limit'], 50)
+        # Só as segundas DIA e DIA + 7 cabem em 10 dias; o último bloco é cortado no horizonte
+        self.assertEqual(len(response.data['slots']), 9 + 10)
+        self.assertEqual(periodo.call_args_list[-1].args[1:], (DIA + timedelta(days=7), DIA + timedelta(days=9)))
+
+        # Agenda toda bloqueada: a busca para no horizonte padrão de 60 dias
+        AgendaBlock.objects.create(union=self.union, start=timezone.make_aware(datetime.combine(DIA, time.min)),
+                                   end=timezone.make_aware(datetime.combine(DIA + timedelta(days=120), time.min)))
+        cache.clear()
+        with mock.patch('core.services.availability_service.disponibilidade_periodo',
+                        wraps=disponibilidade_periodo) as periodo:
+            self.assertEqual(self._proximos(after=f'{DIA.isoformat()}T00:00').data['slots'], [])
+        self.assertEqual(periodo.call_count, 9)
+        self.assertEqual(periodo.call_args_list[-1].args[1:], (DIA + timedelta(days=56), DIA + timedelta(days=59)))
+
+
+@override_settings(**API_SETTINGS)
+class FreeBusyTests(AgendaTestMixin, TestCase):
+    """Grade livre/ocupado codificada em runs"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.h0, self.h1 = self._homologadores(2, duracao=60)
+
+    def _momento(self, hora, minuto=0):
+        return timezone.make_aware(datetime.combine(DIA, time(hora, minuto)))
+
+    def test_runs_com_turnos_sobrepostos_e_bloqueios(self):
+        # Turnos sobrepostos do h0 são mesclados; agendamentos sobrepostos também
+        ScheduleConfig.objects.create(union_user=self.h0, weekday=DIA.weekday(), start_time=time(17),
+                                      end_time=time(20), duration_minutes=60, break_minutes=0)
+        Schedule.objects.create(employee=self.employee, company=self.company, union=self.union, union_user=self.h0,
+                                date=DIA, start_time=time(9, 45), end_time=time(10, 30), status='agendado')
+        # Bloqueio do sindicato fora da resolução ocupa as duas células que toca
+        AgendaBlock.objects.create(union=self.union, start=self._momento(12), end=self._momento(12, 20))
+        AgendaBlock.objects.create(union=self.union, user=self.h1, start=self._momento(14), end=self._momento(14, 30))
+
+        matriz = matriz_ocupacao(self.union.id, DIA, DIA + timedelta(days=1))
+        self.assertEqual((matriz['day_start'], matriz['day_end'], matriz['resolution']), ('08:00', '20:00', 15))
+        linhas = {linha['user_id']: linha['days'] for linha in matriz['users']}
+
+        h0 = linhas[self.h0.id][DIA.isoformat()]
+        self.assertEqual(h0['work'], [['08:00', '20:00']])
+        self.assertEqual(h0['busy'], [['09:00', '10:30'], ['12:00', '12:20']])
+        self.assertEqual(h0['runs'], [['F', 4], ['B', 6], ['F', 6], ['B', 2], ['F', 30]])
+
+        h1 = linhas[self.h1.id][DIA.isoformat()]
+        self.assertEqual(h1['work'], [['08:00', '18:00']])
+        self.assertEqual(h1['runs'], [['F', 4], ['B', 4], ['F', 8], ['B', 2], ['F', 6], ['B', 2], ['F', 14], ['O', 8]])
+
+        # Dia sem jornada nem ocupação: uma única run fora da jornada
+        vazio = linhas[self.h0.id][(DIA + timedelta(days=1)).isoformat()]
+        self.assertEqual((vazio['work'], vazio['busy'], vazio['runs']), ([], [], [['O', 48]]))
+
+    def test_resolucao_nao_divisora_e_sindicato_sem_jornada(self):
+        matriz = matriz_ocupacao(self.union.id, DIA, DIA, resolucao=45)
+        # 08:00-18:00 em células de 45 min: o fim é estendido até completar a última célula
+        self.assertEqual(matriz['day_end'], '18:30')
+        for linha in matriz['users']:
+            self.assertEqual(sum(n for _, n in linha['days'][DIA.isoformat()]['runs']), 14)
+            self.assertEqual(linha['days'][DIA.isoformat()]['runs'][-1], ['O', 1])
+
+        outro = Union.objects.create(name='Sem jornada', cnpj='3')
+        User.objects.create(username='livre', email='livre@veramo.local', role='union_common', union=outro)
+        matriz = matriz_ocupacao(outro.id, DIA, DIA)
+        self.assertEqual((matriz['day_start'], matriz['day_end']), ('08:00', '18:00'))
+        self.assertEqual(matriz['users'][0]['days'][DIA.isoformat()]['runs'], [['O', 40]])
+
+    def test_api_valida_parametros_e_restringe_ao_sindicato(self):
+        master = User.objects.create(username='master', email='master@veramo.local', role='union_master',
+                                     union=self.union)
+        client = APIClient()
+        client.force_authenticate(master)
+        url = '/api/schedules/free-busy/'
+
+        with CaptureQueriesContext(connection) as dia:
+            response = client.get(url, {'date_from': DIA.isoformat(), 'union': 999})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['union'], self.union.id)
+        self.assertEqual(len(response.data['users']), 3)
+        with CaptureQueriesContext(connection) as semana:
+            response = client.get(url, {'date_from': DIA.isoformat(),
+                                        'date_to': (DIA + timedelta(days=6)).isoformat()})
+        self.assertEqual(len(semana.captured_queries), len(dia.captured_queries))
+        self.assertEqual(len(response.data['users'][0]['days']), 7)
+
+        for params in [{}, {'date_from': '07/01/2030'}, {'date_from': DIA.isoformat(), 'resolution': 4},
+                       {'date_from': DIA.isoformat(), 'date_to': (DIA - timedelta(days=1)).isoformat()},
+                       {'date_from': DIA.isoformat(), 'date_to': (DIA + timedelta(days=31)).isoformat()}]:
+            self.assertEqual(client.get(url, params).status_code, 400, params)
+
+        admin = User.objects.create(username='adm', email='adm@veramo.local', role='superadmin')
+        client.force_authenticate(admin)
+        self.assertEqual(client.get(url, {'date_from': DIA.isoformat(), 'union': 'abc'}).status_code, 400)
+        response = client.get(url, {'date_from': DIA.isoformat(), 'union': str(self.union.id)})
+        self.assertEqual((response.status_code, response.data['union']), (200, self.union.id))
+
+
+@override_settings(**API_SETTINGS)
+class DemissaoProcessListTests(AgendaTestMixin, TestCase):
+    """Listagem de processos com número fixo de consultas"""
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username='adm', email='adm@veramo.local', role='admin'))
+
+    def _processos(self, quantidade):
+        for i in range(quantidade):
+            processo = DemissaoProcess.objects.create(nome_funcionario=f'F{i}', motivo='x', exame='x',
+                                                      empresa=self.company, sindicato=self.union)
+            for tipo, status_documento in [('RG', 'PENDENTE'), ('CPF', 'APROVADO'), ('CTPS', 'RECUSADO')]:
+                Document.objects.create(demissao_process=processo, type=tipo, file='x.pdf', status=status_documento)
+
+    def _consultas(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response.data
+
+    def test_listagem_leve_com_contagem_de_documentos(self):
+        self._processos(2)
+        poucas, _ = self._consultas('/api/demissao-processes/')
+        self._processos(8)
+        consultas, data = self._consultas('/api/demissao-processes/')
+
+        self.assertEqual(consultas, poucas)
+        item = data['results'][0]
+        self.assertNotIn('documents', item)
+        self.assertEqual((item['documentos_total'], item['documentos_pendentes'],
+                          item['documentos_aprovados'], item['documentos_recusados']), (3, 1, 1, 1))
+        self.assertEqual(item['empresa_nome'], 'Empresa')
+
+    def test_documentos_aninhados_no_detalhe_e_sob_demanda(self):
+        self._processos(2)
+        poucas, _ = self._consultas('/api/demissao-processes/?expand=documents')
+        self._processos(8)
+        consultas, data = self._consultas('/api/demissao-processes/?expand=documents')
+        self.assertEqual(consultas, poucas)
+        self.assertEqual(len(data['results'][0]['documents']), 3)
+
+        processo = DemissaoProcess.objects.first()
+        _, detalhe = self._consultas(f'/api/demissao-processes/{processo.id}/')
+        self.assertEqual(len(detalhe['documents']), 3)
+        self.assertEqual(detalhe['sindicato_nome'], 'Sindicato')
+
+
+@override_settings(**API_SETTINGS, EXPORT_CHUNK_SIZE=3)
+class StreamingExportTests(AgendaTestMixin, TestCase):
+    """Exportação em streaming com o escopo da listagem"""
+
+    def setUp(self):
+        super().setUp()
+        outra = Company.objects.create(name='Outra', cnpj='9')
+        for i, empresa in enumerate([self.company] * 7 + [outra] * 2):
+            DemissaoProcess.objects.create(nome_funcionario=f'João {i}', motivo='x, "y"', exame='x',
+                                           empresa=empresa, sindicato=self.union)
+        self.client = APIClient()
+
+    def _exportar(self, user, url):
+        self.client.force_authenticate(user)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, b''.join(response.streaming_content)
+
+    def test_csv_com_escopo_do_papel(self):
+        empresa = User.objects.create(username='emp', email='emp@veramo.local', role='company_master',
+                                      company=self.company)
+        with CaptureQueriesContext(connection) as ctx:
+            response, conteudo = self._exportar(empresa, '/api/demissao-processes/export/')
+        self.assertIn('processos-', response['Content-Disposition'])
+        linhas = list(csv.reader(io.StringIO(conteudo.decode('utf-8-sig'))))
+        self.assertEqual(linhas[0][:3], ['id', 'funcionario', 'email'])
+        self.assertEqual(len(linhas), 1 + 7)
+        self.assertEqual({linha[7] for linha in linhas[1:]}, {'Empresa'})
+        self.assertEqual(linhas[1][4], 'x, "y"')
+        # Ordem da listagem: mais recentes primeiro
+        self.assertEqual(linhas[1][1], 'João 6')
+        self.assertFalse(any('documents' in consulta['sql'] for consulta in ctx.captured_queries))
+
+    def test_jsonl_gzip_e_formato_invalido(self):
+        admin = User.objects.create(username='adm', email='adm@veramo.local', role='superadmin')
+        self._homologadores(2)
+        response, conteudo = self._exportar(admin, '/api/schedules/export/?formato=jsonl&gzip=1')
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        registros = [json.loads(linha) for linha in gzip.decompress(conteudo).decode().splitlines()]
+        self.assertEqual([r['homologador'] for r in registros], ['h0@veramo.local', 'h1@veramo.local'])
+        self.assertEqual(registros[0]['data'], DIA.isoformat())
+
+        SystemLog.objects.create(level='INFO', action='LOGIN', message='entrou', user=admin)
+        _, conteudo = self._exportar(admin, '/api/logs/export/?formato=jsonl&level=INFO')
+        self.assertEqual(json.loads(conteudo)['usuario'], 'adm@veramo.local')
+        self.assertEqual(self.client.get('/api/logs/export/?formato=xls').status_code, 400)
+
+    def test_csv_neutraliza_formulas(self):
+        admin = User.objects.create(username='adm', email='adm@veramo.local', role='superadmin')
+        DemissaoProcess.objects.create(nome_funcionario='=HYPERLINK("http://x")', motivo='-2+3', exame='x',
+                                       empresa=self.company, sindicato=self.union)
+        _, conteudo = self._exportar(admin, '/api/demissao-processes/export/')
+        linha = list(csv.reader(io.StringIO(conteudo.decode('utf-8-sig'))))[1]
+        self.assertEqual(linha[1], '\'=HYPERLINK("http://x")')
+        self.assertEqual(linha[4], "'-2+3")
+
+        _, conteudo = self._exportar(admin, '/api/demissao-processes/export/?formato=jsonl')
+        self.assertEqual(json.loads(conteudo.splitlines()[0])['funcionario'], '=HYPERLINK("http://x")')
+
+@override_settings(**API_SETTINGS)
+class FullTextSearchTests(AgendaTestMixin, TestCase):
+    """Busca ?q= pelo índice FTS5 (ou icontains), no escopo do usuário"""
+
+    def setUp(self):
+        super().setUp()
+        outra = Company.objects.create(name='Outra', cnpj='9')
+        self.maria = Employee.objects.create(name='Maria Souza', company=self.company, union=self.union, status='ativo')
+        self.processos = {}
+        for nome, motivo, empresa, employee in [
+            ('João Silva', 'sem justa causa', self.company, None),
+            ('Ana Lima', 'pedido do João Silva', self.company, None),
+            ('João Silveira', 'acordo', outra, None),
+            ('Pedro', 'acordo', self.company, self.maria),
+        ]:
+            self.processos[nome] = DemissaoProcess.objects.create(
+                nome_funcionario=nome, motivo=motivo, exame='x', empresa=empresa, sindicato=self.union,
+                employee=employee)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(
+            username='emp', email='emp@veramo.local', role='company_master', company=self.company))
+
+    def _nomes(self, q):
+        response = self.client.get('/api/demissao-processes/', {'q': q})
+        self.assertEqual(response.status_code, 200)
+        return [item['nome_funcionario'] for item in response.data['results']]
+
+    @skipUnless(connection.vendor == 'sqlite', 'FTS5 do SQLite')
+    def test_relevancia_acentos_e_escopo(self):
+        # Sem acento e por prefixo; o nome pesa mais que a menção no motivo; outra empresa fica de fora
+        self.assertEqual(self._nomes('joao silv'), ['João Silva', 'Ana Lima'])
+        self.assertEqual(self._nomes('maria'), ['Pedro'])
+        self.assertEqual(self._nomes('"OR*'), [])
+
+        # Triggers: alteração e remoção refletem no índice
+        processo = self.processos['João Silva']
+        processo.nome_funcionario = 'Carlos'
+        processo.save()
+        self.assertEqual(self._nomes('carlos'), ['Carlos'])
+        processo.delete()
+        self.assertEqual(self._nomes('carlos'), [])
+
+        SystemLog.objects.bulk_create([SystemLog(level='ERROR', message='Falha ao enviar e-mail'),
+                                       SystemLog(level='INFO', message='Login efetuado')])
+        self.client.force_authenticate(User.objects.create(username='adm', email='adm@veramo.local',
+                                                           role='superadmin'))
+        data = self.client.get('/api/logs/', {'q': 'falha envi'}).data
+        self.assertEqual([log['message'] for log in data['results']], ['Falha ao enviar e-mail'])
+
+    @override_settings(SEARCH_BACKEND='simples')
+    def test_backend_simples(self):
+        self.assertEqual(sorted(self._nomes('João Silva')), ['Ana Lima', 'João Silva'])
+        self.assertEqual(self._nomes('Maria'), ['Pedro'])
+
+@override_settings(**API_SETTINGS)
+class SparseFieldsTests(AgendaTestMixin, TestCase):
+    """?fields= / ?expand= e ajuste automático do queryset"""
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username='adm', email='adm@veramo.local', role='admin'))
+
+    def _get(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return ctx.captured_queries, response.data['results']
+
+    def test_fields_restringe_resposta_e_colunas(self):
+        self._homologadores(3)
+        consultas, data = self._get('/api/schedules/?fields=id,date,employee_name')
+
+        self.assertEqual(set(data[0]), {'id', 'date', 'employee_name'})
+        self.assertEqual(len(consultas), 1)
+        sql = consultas[-1]['sql']
+        self.assertIn('"core_employee"."name"', sql)
+        self.assertNotIn('google_calendar_event_id', sql)
+        self.assertNotIn('"core_company"', sql)
+
+    def test_expand_aninha_relacoes_sem_consultas_por_linha(self):
+        self._homologadores(1)
+        poucas, _ = self._get('/api/schedules/?expand=company,union_user')
+        self._homologadores(4)
+        consultas, data = self._get('/api/schedules/?expand=company,union_user')
+
+        self.assertEqual(len(consultas), len(poucas))
+        self.assertEqual(data[0]['company'], {'id': self.company.id, 'name': 'Empresa', 'cnpj': '2'})
+        self.assertEqual(data[0]['union_user']['username'], 'h0')
+        self.assertEqual(data[0]['homologador_nome'], 'h0')
+
+
+@override_settings(**API_SETTINGS)
+class KeysetPaginationTests(AgendaTestMixin, TestCase):
+    """Paginação por cursor com chaves compostas"""
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username='adm', email='adm@veramo.local', role='admin'))
+        # Vários agendamentos no mesmo dia e horário: empates resolvidos pelo id
+        for i in range(25):
+            Schedule.objects.create(employee=self.employee, company=self.company, union=self.union,
+                                    date=DIA + timedelta(days=i % 3), start_time=time(8 + i % 2), end_time=time(10))
+        self.esperado = list(Schedule.objects.order_by('date', 'start_time', 'id').values_list('id', flat=True))
+
+    def _get(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response.data
+
+    def test_percorre_todas_as_paginas_sem_repetir(self):
+        vistos, url, consultas = [], '/api/schedules/?page_size=10&fields=id', []
+        while url:
+            quantidade, data = self._get(url)
+            consultas.append(quantidade)
+            self.assertNotIn('count', data)
+            vistos += [item['id'] for item in data['results']]
+            url = data['next']
+
+        self.assertEqual(vistos, self.esperado)
+        self.assertEqual(len(set(consultas)), 1)
+
+        _, ultima = self._get('/api/schedules/?page_size=10&fields=id')
+        _, segunda = self._get(ultima['next'])
+        _, primeira = self._get(segunda['previous'])
+        self.assertEqual([item['id'] for item in primeira['results']], self.esperado[:10])
+        self.assertIsNone(primeira['previous'])
+
+    def test_total_aproximado_e_paginacao_numerada(self):
+        _, data = self._get('/api/schedules/?count=1')
+        self.assertEqual(data['count'], 25)
+        _, legado = self._get('/api/schedules/?page=2')
+        self.assertEqual((legado['count'], len(legado['results'])), (25, 5))
+        self.assertEqual(self.client.get('/api/schedules/?cursor=invalido').status_code, 404)
+
+
+class LogStatsTests(TestCase):
+    """Rollup das estatísticas de logs"""
+
+    def _logs(self, quantidade, level='INFO', action='LOGIN', dias_atras=0):
+        SystemLog.objects.bulk_create([
+            SystemLog(level=level, action=action, message='x', timestamp=timezone.now() - timedelta(days=dias_atras))
+            for _ in range(quantidade)
+        ])
+
+    def test_create_log_grava_na_hora_nos_testes(self):
+        self.assertFalse(settings.SYSTEMLOG_BUFFER_ENABLED)
+        self.assertIsNotNone(create_log('INFO', 'login', action='LOGIN').pk)
+
+    def test_rollup_incremental_igual_a_agregacao(self):
+        self._logs(5, dias_atras=2)
+        self._logs(3, level='ERROR', action=None, dias_atras=1)
+        with override_settings(SYSTEMLOG_ROLLUP_LAG_SECONDS=0):
+            self.assertEqual(compactar(lote=4), 4)
+            self.assertEqual(compactar(lote=4), 4)
+            self.assertEqual(compactar(lote=4), 0)
+        # Ainda não compactados: somados na leitura
+        self._logs(2, level='WARNING', action='LOGOUT')
+
+        with CaptureQueriesContext(connection) as ctx:
+            stats = estatisticas_rollup()
+        self.assertEqual(len(ctx.captured_queries), 4)
+        self.assertEqual(stats, estatisticas_consulta(SystemLog.objects.all()))
+        self.assertEqual(stats['total_logs'], 10)
+        self.assertEqual(stats['level_counts']['ERROR'], 3)
+        self.assertEqual(stats['top_actions'], {'LOGIN': 5, 'LOGOUT': 2})
+        self.assertEqual(SystemLogRollup.objects.get(level='ERROR').count, 3)
+        self.assertEqual(estatisticas_rollup(level='INFO')['total_logs'], 5)
+
+
+
+@override_settings(**API_SETTINGS, SYSTEMLOG_RETENTION_DAYS=30, SYSTEMLOG_ROLLUP_LAG_SECONDS=0)
+class LogArchiveTests(TestCase):
+    """Retenção dos logs em arquivos compactados"""
+
+    def setUp(self):
+        self.diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(self.diretorio.cleanup)
+        configuracao = override_settings(SYSTEMLOG_ARCHIVE_DIR=self.diretorio.name)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+
+    def _logs(self, quantidade, dias_atras, **campos):
+        momento = timezone.now() - timedelta(days=dias_atras)
+        campos = {'level': 'INFO', 'action': 'LOGIN', **campos}
+        SystemLog.objects.bulk_create([
+            SystemLog(message=f'evento {i}', timestamp=momento, **campos) for i in range(quantidade)
+        ])
+
+    def test_arquiva_remove_e_busca(self):
+        self._logs(3, dias_atras=40)
+        self._logs(2, dias_atras=35, level='ERROR', action=None)
+        self._logs(4, dias_atras=1)
+        stats = estatisticas_rollup()
+
+        resumo = arquivar(lote=2)
+        self.assertEqual(sorted(resumo.values()), [2, 3])
+        self.assertEqual(SystemLog.objects.count(), 4)
+        self.assertEqual(SystemLogArchive.objects.aggregate(total=Sum('rows'))['total'], 5)
+        self.assertEqual(arquivar(), {})
+        # O rollup já incluía os logs arquivados
+        self.assertEqual(estatisticas_rollup(), stats)
+
+        inicio = timezone.now() - timedelta(days=60)
+        logs = buscar_logs(inicio)
+        self.assertEqual(len(logs), 9)
+        self.assertEqual([log['timestamp'] for log in logs],
+                         sorted((log['timestamp'] for log in logs), reverse=True))
+        self.assertEqual(len(buscar_logs(inicio, level='ERROR')), 2)
+        self.assertEqual(len(buscar_logs(inicio, fim=timezone.now() - timedelta(days=38))), 3)
+
+        admin = User.objects.create(username='adm', email='adm@veramo.local', role='superadmin')
+        client = APIClient()
+        client.force_authenticate(admin)
+        data = client.get('/api/logs/', {'date_from': inicio.date().isoformat(), 'level': 'INFO'}).data
+        self.assertTrue(data['archived'])
+        self.assertEqual(len(data['results']), 7)
+        self.assertEqual(data['results'][-1]['user_email'], 'Sistema')
+        self.assertNotIn('archived', client.get('/api/logs/').data)
+
+    def test_retoma_dia_ja_arquivado(self):
+        self._logs(3, dias_atras=40)
+        dia = timezone.localtime(SystemLog.objects.get(message='evento 0').timestamp).date()
+        # Execução interrompida depois de registrar o arquivo, antes de remover as linhas
+        with mock.patch('core.services.log_archive._remover'):
+            self.assertEqual(arquivar_dia(dia), 3)
+        self.assertEqual(SystemLog.objects.count(), 3)
+
+        self.assertEqual(arquivar_dia(dia), 0)
+        self.assertEqual(SystemLog.objects.count(), 0)
+        self.assertEqual(SystemLogArchive.objects.count(), 1)
+        self.assertEqual(len(buscar_logs(timezone.now() - timedelta(days=60))), 3)
+
+    def test_cursor_atravessa_tabela_e_arquivos(self):
+        self._logs(3, dias_atras=40)
+        self._logs(2, dias_atras=35)
+        arquivar()
+        self._logs(4, dias_atras=1)
+        esperado = [log['id'] for log in buscar_logs(timezone.now() - timedelta(days=60))]
+        self.assertEqual(len(esperado), 9)
+
+        admin = User.objects.create(username='adm', email='adm@veramo.local', role='superadmin')
+        client = APIClient()
+        client.force_authenticate(admin)
+        pagina = client.get('/api/logs/', {'date_from': (timezone.now() - timedelta(days=60)).date().isoformat(),
+                                           'page_size': 2}).data
+        ids = []
+        while True:
+            ids += [log['id'] for log in pagina['results']]
+            if not pagina['next']:
+                break
+            pagina = client.get(pagina['next']).data
+        self.assertEqual(ids, esperado)
+        self.assertEqual(client.get('/api/logs/', {'date_from': '2020-01-01', 'cursor': 'x'}).status_code, 400)
+
+@override_settings(**API_SETTINGS, DASHBOARD_RECENT_ACCESSES=2)
+class DashboardCountersTests(AgendaTestMixin, TestCase):
+    """Contadores do painel mantidos por sinais e buffer de últimos acessos"""
+
+    def test_contadores_e_ultimos_acessos(self):
+        from django.contrib.auth.signals import user_logged_in
+
+        self._homologadores(2)
+        Union.objects.create(name='Outro', cnpj='3')
+        Schedule.objects.filter(union_user__username='h0').get().delete()
+        # bulk_create não dispara sinais: corrigido pela reconciliação
+        Company.objects.bulk_create([Company(name='Lote', cnpj='4')])
+
+        admin = User.objects.create(username='adm', email='adm@veramo.local', role='superadmin')
+        for username in ['h0', 'h1', 'adm', 'h1']:
+            user = User.objects.get(username=username)
+            user_logged_in.send(sender=User, request=None, user=user)
+
+        client = APIClient()
+        client.force_authenticate(admin)
+        with CaptureQueriesContext(connection) as ctx:
+            data = client.get('/api/dashboard/').data
+        self.assertLessEqual(len(ctx.captured_queries), 2)
+        self.assertEqual((data['total_companies'], data['total_unions'], data['total_schedules']), (1, 2, 1))
+        self.assertEqual([acesso['username'] for acesso in data['last_accesses']], ['h1', 'adm'])
+
+        self.assertEqual(counters.reconciliar(), {'companies': (1, 2)})
+        self.assertEqual(counters.valores()['companies'], 2)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN é específico do SQLite')
+class QueryPlanTests(TestCase):
+    """As consultas críticas usam índice (nenhuma varredura completa da tabela)"""
+
+    def _plano(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return [linha[-1] for linha in cursor.fetchall()]
+
+    def assertBuscaPorIndice(self, queryset, tabela, condicao):
+        plano = self._plano(queryset)
+        self.assertFalse([linha for linha in plano if re.match(rf'SCAN {tabela}\b', linha)],
+                         f'Varredura completa de {tabela}: {plano}')
+        self.assertTrue([linha for linha in plano if linha.startswith(f'SEARCH {tabela} USING') and condicao in linha],
+                        f'{tabela} sem busca por ({condicao}): {plano}')
+
+    def test_consultas_criticas_usam_indice(self):
+        agora = timezone.now()
+        consultas = [
+            # Conflito de horário do homologador (reservation_service.tem_conflito)
+            (Schedule.objects.filter(union_user_id=1, date=DIA, start_time__lt=time(10), end_time__gt=time(9)),
+             'core_schedule', 'union_user_id=? AND date=?'),
+            # Agenda do sindicato na janela (AvailabilityIndex)
+            (Schedule.objects.filter(union_id=1, date__gte=DIA, date__lte=DIA, union_user__isnull=False),
+             'core_schedule', 'union_id=? AND date>?'),
+            # Lembretes da véspera
+            (Schedule.objects.filter(status='agendado', reminder_day_sent_at__isnull=True, date=DIA),
+             'core_schedule', 'date=?'),
+            # Listagens por empresa/sindicato
+            (DemissaoProcess.objects.filter(empresa_id=1, status='agendado'),
+             'core_demissaoprocess', 'empresa_id=? AND status=?'),
+            (DemissaoProcess.objects.filter(sindicato_id=1, status='agendado'),
+             'core_demissaoprocess', 'sindicato_id=? AND status=?'),
+            # Documentos por status do processo (avancar_etapa)
+            (Document.objects.filter(demissao_process_id=1, status='PENDENTE'),
+             'core_document', 'demissao_process_id=? AND status=?'),
+            # Jornada dos homologadores
+            (ScheduleConfig.objects.filter(union_user_id=1, weekday=0),
+             'core_scheduleconfig', 'union_user_id=? AND weekday=?'),
+            (ScheduleConfig.objects.filter(union_user__union_id=1, weekday__in=[0, 1]),
+             'core_scheduleconfig', 'union_user_id=? AND weekday=?'),
+            # Página de logs por período
+            (SystemLog.objects.filter(timestamp__gte=agora).order_by('-timestamp', '-id')[:21],
+             'core_systemlog', 'timestamp>?'),
+            # Reivindicação do outbox
+            (OutboundNotification.objects.filter(status='pendente', next_attempt_at__lte=agora),
+             'core_outboundnotification', 'status=? AND next_attempt_at<?'),
+        ]
+        for queryset, tabela, condicao in consultas:
+            with self.subTest(tabela=tabela, condicao=condicao):
+                self.assertBuscaPorIndice(queryset, tabela, condicao)
+
+
+# Único grupo de testes com o buffer ligado (desligado nos demais, ver conftest.py)
+@override_settings(SYSTEMLOG_BUFFER_ENABLED=True)
+class LogBufferTests(TransactionTestCase):
+    """Gravação dos logs em lote pela fila em memória"""
+
+    def _log(self, i=0):
+        return SystemLog(level='INFO', action='API_CALL', message=f'evento {i}')
+
+    def test_thread_grava_em_lotes(self):
+        buffer = LogBuffer(capacidade=100, lote=10, intervalo=0.05)
+        with CaptureQueriesContext(connection) as ctx:
+            for i in range(25):
+                buffer.registrar(self._log(i))
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+        # Espera pela fila, sem consultar a tabela enquanto a thread grava (trava do SQLite em memória)
+        limite = relogio.monotonic() + 5
+        while not buffer._fila.empty() and relogio.monotonic() < limite:
+            relogio.sleep(0.02)
+        # A thread já retirou tudo da fila: o encerramento não tem o que gravar
+        self.assertEqual(buffer.encerrar(), 0)
+        self.assertEqual(SystemLog.objects.count(), 25)
+
+    def test_fila_cheia_descarta_ou_grava_na_hora(self):
+        # Thread de fundo parada: a fila só é esvaziada no encerramento
+        with mock.patch.object(LogBuffer, '_iniciar'):
+            descarta = LogBuffer(capacidade=2, lote=10, intervalo=1)
+            for i in range(5):
+                descarta.registrar(self._log(i))
+            self.assertEqual(descarta.descartados, 3)
+            self.assertEqual(descarta.encerrar(), 2)
+
+            bloqueia = LogBuffer(capacidade=2, lote=10, intervalo=1, politica='block', espera=0.01)
+            for i in range(5):
+                bloqueia.registrar(self._log(i))
+            self.assertEqual(SystemLog.objects.count(), 2 + 3)
+            self.assertEqual(bloqueia.encerrar(), 2)
+        self.assertEqual(SystemLog.objects.count(), 7)
+
+    @override_settings(SYSTEMLOG_BUFFER_ENABLED=False)
+    def test_gravacao_sincrona_sem_buffer(self):
+        log = create_log('INFO', 'login', action='LOGIN')
+        self.assertIsNotNone(log.pk)
+
+    def test_enfileira_no_commit(self):
+        with mock.patch('core.services.log_buffer.obter_buffer') as obter:
+            with transaction.atomic():
+                create_log('INFO', 'login', action='LOGIN')
+                obter.assert_not_called()
+            obter.return_value.registrar.assert_called_once()
+
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                create_log('INFO', 'desfeito', action='LOGIN')
+                raise RuntimeError
+            obter.return_value.registrar.assert_called_once()
+
+
+class NotificationOutboxTests(AgendaTestMixin, TestCase):
+    """Outbox de notificações e despachante em lote"""
+
+    def setUp(self):
+        super().setUp()
+        homologador, = self._homologadores(1)
+        self.schedule = Schedule.objects.get(union_user=homologador)
+        self.processo = DemissaoProcess.objects.create(
+            nome_funcionario='Fulano', email_funcionario='fulano@veramo.local', motivo='x', exame='x',
+            empresa=self.company, sindicato=self.union,
+        )
+
+    def test_notificacao_enfileirada_e_enviada_em_lote(self):
+        for _ in range(3):
+            notify_agendamento(schedule=self.schedule, processo=self.processo)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(OutboundNotification.objects.filter(schedule=self.schedule).count(), 3)
+
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.open') as abrir:
+            self.assertEqual(despachar_pendentes(), 3)
+        self.assertEqual(abrir.call_count, 1)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertFalse(OutboundNotification.objects.exclude(status=OutboundNotification.ENVIADA).exists())
+
+    def test_falha_do_provedor_reagenda_e_esgota_em_dead_letter(self):
+        notify_agendamento(schedule=self.schedule, processo=self.processo)
+        notificacao = OutboundNotification.objects.get()
+        fora_do_ar = smtplib.SMTPServerDisconnected('provedor indisponível')
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=fora_do_ar):
+            despachar_pendentes()
+            notificacao.refresh_from_db()
+            self.assertEqual((notificacao.status, notificacao.attempts), (OutboundNotification.PENDENTE, 1))
+            self.assertEqual(despachar_pendentes(), 0)
+
+            OutboundNotification.objects.update(next_attempt_at=timezone.now(), attempts=notificacao.max_attempts - 1)
+            despachar_pendentes()
+        notificacao.refresh_from_db()
+        self.assertEqual(notificacao.status, OutboundNotification.FALHOU)
+        self.assertIn('provedor indisponível', notificacao.last_error)
+
+
+class _StubWhatsApp(BaseHTTPRequestHandler):
+    """Cloud API local: recusa o número +550000000000, limita o +550000000429 e aceita os demais"""
+
+    def do_POST(self):
+        corpo = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        if corpo['to'] == '+550000000000':
+            self.send_response(400)
+            resposta = {'error': {'message': 'Invalid parameter'}}
+        elif corpo['to'] == '+550000000429':
+            # Retry-After também pode vir como data HTTP
+            self.send_response(429)
+            self.send_header('Retry-After', 'Wed, 21 Oct 2015 07:28:00 GMT')
+            resposta = {'error': {'message': 'Rate limit hit'}}
+        else:
+            self.send_response(200)
+            resposta = {'messages': [{'id': f"wamid.{corpo['to']}"}]}
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(json.dumps(resposta).encode())
+
+    def log_message(self, *args):
+        pass
+
+
+class WhatsAppSenderTests(TestCase):
+    """Envio em lote pela Cloud API (servidor HTTP local)"""
+
+    def setUp(self):
+        self.servidor = ThreadingHTTPServer(('127.0.0.1', 0), _StubWhatsApp)
+        threading.Thread(target=self.servidor.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True).start()
+        self.url = f'http://127.0.0.1:{self.servidor.server_port}'
+        self.addCleanup(self.servidor.server_close)
+        self.addCleanup(self.servidor.shutdown)
+
+    def test_lote_paralelo_registra_resultado_por_mensagem(self):
+        sender = whatsapp_sender.WhatsAppSender('token', '123', base_url=self.url, taxa=1000, max_workers=8)
+        telefones = [f'+55119{i:08d}' for i in range(40)] + ['+550000000000']
+        resultados = sender.enviar_lote([(telefone, 'Lembrete') for telefone in telefones])
+
+        self.assertEqual([r['message_id'] for r in resultados[:-1]], [f'wamid.{t}' for t in telefones[:-1]])
+        self.assertTrue(all(r['ok'] for r in resultados[:-1]))
+        self.assertEqual((resultados[-1]['status_code'], resultados[-1]['permanent']), (400, True))
+
+    def test_erro_numa_mensagem_nao_interrompe_o_lote(self):
+        sender = whatsapp_sender.WhatsAppSender('token', '123', base_url=self.url, taxa=1000, max_workers=4)
+        enviar = sender.enviar
+
+        def enviar_com_falha(telefone, mensagem):
+            if telefone == '+551100000001':
+                raise RuntimeError('falha inesperada')
+            return enviar(telefone, mensagem)
+
+        with mock.patch.object(sender, 'enviar', side_effect=enviar_com_falha), \
+                self.assertLogs('core.services.whatsapp_sender', 'ERROR'):
+            resultados = sender.enviar_lote([(telefone, 'Lembrete') for telefone in
+                                             ['+551100000000', '+550000000429', '+551100000001', '+551100000002']])
+        self.assertEqual([r['ok'] for r in resultados], [True, False, False, True])
+        self.assertEqual((resultados[1]['status_code'], resultados[1]['permanent']), (429, False))
+        self.assertEqual(resultados[2]['error'], 'falha inesperada')
+
+    def test_retry_after_em_segundos_ou_data(self):
+        self.assertEqual(whatsapp_sender.segundos_retry_after('30'), 30)
+        self.assertEqual(whatsapp_sender.segundos_retry_after('Wed, 21 Oct 2015 07:28:00 GMT'), 0)
+        futuro = email.utils.format_datetime(timezone.now() + timedelta(seconds=120), usegmt=True)
+        self.assertAlmostEqual(whatsapp_sender.segundos_retry_after(futuro), 120, delta=2)
+        self.assertEqual(whatsapp_sender.segundos_retry_after('amanhã'), 1.0)
+        self.assertEqual(whatsapp_sender.segundos_retry_after(None), 1.0)
+
+    def test_token_bucket_limita_vazao(self):
+        bucket = whatsapp_sender.TokenBucket(taxa=50, capacidade=1)
+        inicio = relogio.monotonic()
+        for _ in range(11):
+            bucket.aguardar()
+        self.assertGreaterEqual(relogio.monotonic() - inicio, 0.19)
+
+    def test_despachante_grava_id_da_mensagem(self):
+        configuracao = dict(WHATSAPP_ENABLED=True, WHATSAPP_TOKEN='token', WHATSAPP_PHONE_ID='123',
+                            WHATSAPP_API_URL=self.url)
+        with override_settings(**configuracao), mock.patch.object(whatsapp_sender, '_sender', None):
+            from .services.notification_outbox import enfileirar_whatsapp
+            notificacao = enfileirar_whatsapp('+5511999999999', 'Lembrete')
+            despachar_pendentes()
+        notificacao.refresh_from_db()
+        self.assertEqual(notificacao.status, OutboundNotification.ENVIADA)
+        self.assertEqual((notificacao.provider_status, notificacao.provider_message_id),
+                         (200, 'wamid.+5511999999999'))
+
+
+class EmailRenderingTests(AgendaTestMixin, TestCase):
+    """Renderização dos e-mails de agendamento com o grafo carregado uma vez"""
+
+    def setUp(self):
+        super().setUp()
+        Employee.objects.filter(pk=self.employee.pk).update(email='fulano@veramo.local')
+        self._homologadores(5)
+
+    def test_lote_carrega_agendamentos_em_uma_consulta(self):
+        ids = list(Schedule.objects.values_list('id', flat=True))
+        with self.assertNumQueries(1):
+            emails = renderizar_lote(ids)
+        self.assertEqual(len(emails), 5)
+        self.assertIn('Homologador: h0', emails[0]['text'])
+        self.assertIn('fulano@veramo.local', emails[0]['email'])
+
+        with self.assertNumQueries(2):
+            self.assertEqual(EmailService().send_agendamento_emails(ids), 5)
+
+    def test_alteracao_de_homologador(self):
+        antigo, novo = User.objects.order_by('id')[:2]
+        email = renderizar_agendamento(Schedule.objects.first(), old_user=antigo, new_user=novo)
+        self.assertTrue(email['subject'].startswith('Agendamento Alterado'))
+        self.assertIn('foi alterado', email['text'])
+        self.assertIn('<strong>h0</strong> para <strong>h1</strong>', email['html'])
+
+
+class ReminderTests(AgendaTestMixin, TestCase):
+    """Lembretes de véspera e da hora anterior"""
+
+    def setUp(self):
+        super().setUp()
+        Employee.objects.filter(pk=self.employee.pk).update(email='fulano@veramo.local')
+        self._homologadores(3)
+        # Véspera de DIA, 08:30: os agendamentos das 09:00 estão na próxima hora do dia seguinte
+        self.agora = timezone.make_aware(datetime.combine(DIA - timedelta(days=1), time(8, 30)))
+
+    def test_lembretes_da_vespera_sao_idempotentes(self):
+        self.assertEqual(enviar_lembretes(VESPERA, lote=2, agora=self.agora), {self.union.id: 3})
+        self.assertEqual(OutboundNotification.objects.count(), 3)
+        self.assertTrue(OutboundNotification.objects.first().subject.startswith('Lembrete: homologação amanhã'))
+
+        self.assertEqual(enviar_lembretes(VESPERA, agora=self.agora), {})
+        self.assertEqual(OutboundNotification.objects.count(), 3)
+
+    def test_proxima_hora_atravessa_meia_noite(self):
+        Schedule.objects.update(start_time=time(0, 15), end_time=time(0, 45))
+        self.assertEqual(enviar_lembretes(PROXIMA_HORA, agora=self.agora), {})
+
+        perto_da_meia_noite = timezone.make_aware(datetime.combine(DIA - timedelta(days=1), time(23, 30)))
+        self.assertEqual(enviar_lembretes(PROXIMA_HORA, agora=perto_da_meia_noite), {self.union.id: 3})
+        self.assertFalse(Schedule.objects.filter(reminder_hour_sent_at__isnull=True).exists())
+
+    def test_remarcacao_libera_os_lembretes(self):
+        enviar_lembretes(VESPERA, agora=self.agora)
+        remarcado, mantido = Schedule.objects.order_by('id')[:2]
+        remarcado.date = DIA + timedelta(days=1)
+        remarcado.save()
+        mantido.end_time = time(10, 30)
+        mantido.save(update_fields=['end_time'])
+        remarcado.refresh_from_db()
+        mantido.refresh_from_db()
+        self.assertIsNone(remarcado.reminder_day_sent_at)
+        self.assertIsNotNone(mantido.reminder_day_sent_at)
+
+        vespera_da_nova_data = self.agora + timedelta(days=1)
+        self.assertEqual(enviar_lembretes(VESPERA, agora=vespera_da_nova_data), {self.union.id: 1})
+
+    def test_remarcacao_em_massa_libera_os_lembretes(self):
+        enviar_lembretes(VESPERA, agora=self.agora)
+        primeiro, segundo, terceiro = Schedule.objects.order_by('id')
+        # update(): só as linhas que de fato mudam de horário perdem o marcador
+        Schedule.objects.filter(id=primeiro.id).update(start_time=time(11), end_time=time(12))
+        Schedule.objects.filter(id=segundo.id).update(start_time=time(9), end_time=time(10, 30))
+
+        terceiro.date = DIA + timedelta(days=1)
+        Schedule.objects.bulk_update([terceiro], ['date'])
+        marcados = dict(Schedule.objects.values_list('id', 'reminder_day_sent_at'))
+        self.assertIsNone(marcados[primeiro.id])
+        self.assertIsNotNone(marcados[segundo.id])
+        self.assertIsNone(marcados[terceiro.id])
+
+        # O horário gravado pelo bulk_update passa a ser o original do objeto
+        terceiro.end_time = time(10, 30)
+        Schedule.objects.filter(id=terceiro.id).update(reminder_day_sent_at=self.agora)
+        terceiro.refresh_from_db(fields=['reminder_day_sent_at'])
+        terceiro.save()
+        self.assertIsNotNone(Schedule.objects.get(id=terceiro.id).reminder_day_sent_at)
+
+    def test_reivindicacao_ignora_os_ja_marcados(self):
+        ids = list(Schedule.objects.order_by('id').values_list('id', flat=True))
+        Schedule.objects.filter(id=ids[0]).update(reminder_day_sent_at=self.agora - timedelta(minutes=5))
+        with self.assertNumQueries(2):
+            self.assertCountEqual(_reivindicar(ids, 'reminder_day_sent_at', self.agora), ids[1:])
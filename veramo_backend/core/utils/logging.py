@@ -6,6 +6,7 @@ from django.utils import timezone
 from django.contrib.auth import get_user_model
 from django.http import HttpRequest
 from core.models.log import SystemLog
+from core.services.log_buffer import registrar
 
 User = get_user_model()
 
@@ -37,6 +38,9 @@ def create_log(level, message, user=None, action=None, request=None,
         union: Sindicato relacionado (opcional)
         schedule: Agendamento relacionado (opcional)
         metadata: Dados adicionais em JSON (opcional)
+
+    O log é gravado em lote em segundo plano (services/log_buffer.py); com
+    SYSTEMLOG_BUFFER_ENABLED desligado, é gravado na hora.
     """
     ip_address = None
     user_agent = None
@@ -45,7 +49,7 @@ def create_log(level, message, user=None, action=None, request=None,
         ip_address = get_client_ip(request)
         user_agent = get_user_agent(request)
     
-    log = SystemLog.objects.create(
+    log = SystemLog(
         level=level,
         message=message,
         user=user,
@@ -58,7 +62,7 @@ def create_log(level, message, user=None, action=None, request=None,
         metadata=metadata
     )
     
-    return log
+    return registrar(log)
 
 def log_user_action(user, action, message, request=None, **kwargs):
     """Log específico para ações de usuário"""
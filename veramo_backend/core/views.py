@@ -11,6 +11,7 @@ from django.shortcuts import get_object_or_404
 from .models.schedule import Schedule
 from .serializers import ScheduleSerializer, RessalvaSerializer, AceiteSerializer
 from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from .models.company import Company
 from .models.union import Union, CompanyUnion
 from .models.user import User
@@ -20,7 +21,10 @@ from .permissions import (
     IsUnionMasterOrSuperAdmin, IsSuperAdminOrCompanyMasterOrUnionMaster,
     IsSameOrg, IsOwnerOrSameOrg
 )
-from .mixins import OrgScopedQuerysetMixin
+from .mixins import (
+    FullTextSearchMixin, OrgScopedQuerysetMixin, SparseFieldsetQuerysetMixin, StreamingExportMixin,
+)
+from .pagination import DemissaoProcessPagination, SchedulePagination, SystemLogPagination
 from django.contrib.auth import get_user_model
 from rest_framework.views import APIView
 from .models.config import ScheduleConfig
@@ -31,7 +35,18 @@ from .models.log import SystemLog
 from .serializers import SystemLogSerializer
 from datetime import datetime, timedelta, time
 from .models.demissao_process import DemissaoProcess
-from .serializers import DemissaoProcessSerializer
+from .serializers import DemissaoProcessSerializer, DemissaoProcessListSerializer
+from .services import availability_cache, counters
+from .services.availability_service import (
+    agrupar_por_horario, disponibilidade_periodo, matriz_ocupacao, proximos_slots_livres, sem_ocupacao_google,
+)
+from .services.bulk_scheduling_service import agendar_lote
+from .services.log_archive import buscar_logs, inicio_janela_quente
+from .services.log_stats import estatisticas_consulta, estatisticas_rollup
+from .services.reservation_service import (
+    HorarioIndisponivel, ProcessoIndisponivel, ReservaInvalida, agenda_travada, alterar_homologador, confirmar_reserva,
+    liberar_reserva, obter_reserva, reservar_com_atribuicao,
+)
 from .models.document import DOCUMENT_TYPE_CHOICES
 from .models.employee import Employee
 from django.conf import settings
@@ -40,11 +55,16 @@ try:
 except Exception:
     notify_agendamento = None
 from rest_framework.throttling import ScopedRateThrottle
+from rest_framework.utils.urls import replace_query_param
 from django.utils.crypto import get_random_string
 
 from django.contrib.auth import authenticate
+from django.contrib.auth.signals import user_logged_in
 from django.contrib.auth.hashers import make_password
 from django.db import transaction
+from django.db.models import Count, Q
+import base64
+import json
 import logging
 
 # Importar os serviços
@@ -70,7 +90,7 @@ class LoginThrottle(ScopedRateThrottle):
 
 # Create your views here.
 
-class DocumentViewSet(OrgScopedQuerysetMixin, viewsets.ModelViewSet):
+class DocumentViewSet(SparseFieldsetQuerysetMixin, OrgScopedQuerysetMixin, viewsets.ModelViewSet):
     queryset = Document.objects.all()
     serializer_class = DocumentSerializer
     parser_classes = [MultiPartParser, FormParser]
@@ -99,9 +119,18 @@ class DocumentViewSet(OrgScopedQuerysetMixin, viewsets.ModelViewSet):
         docs = Document.objects.filter(employee_id=employee_id)
         return Response(DocumentSerializer(docs, many=True).data)
 
-class ScheduleViewSet(OrgScopedQuerysetMixin, viewsets.ModelViewSet):
+class ScheduleViewSet(FullTextSearchMixin, StreamingExportMixin, SparseFieldsetQuerysetMixin, OrgScopedQuerysetMixin,
+                      viewsets.ModelViewSet):
     queryset = Schedule.objects.all()
     serializer_class = ScheduleSerializer
+    pagination_class = SchedulePagination
+    search_sources = [('funcionarios', 'employee'), ('processos', 'demissao_process')]
+    export_filename = 'agendamentos'
+    export_fields = [
+        ('id', 'id'), ('data', 'date'), ('inicio', 'start_time'), ('fim', 'end_time'), ('status', 'status'),
+        ('funcionario', 'employee__name'), ('empresa', 'company__name'), ('sindicato', 'union__name'),
+        ('homologador', 'union_user__email'), ('processo', 'demissao_process_id'), ('video_link', 'video_link'),
+    ]
     permission_classes = [IsAuthenticated, IsSameOrg]
     throttle_classes = [ScopedRateThrottle]
     throttle_scope = 'user'
@@ -148,61 +177,25 @@ class ScheduleViewSet(OrgScopedQuerysetMixin, viewsets.ModelViewSet):
             raise
 
     def _create_google_meet_room(self, schedule_id):
-        """Cria sala do Google Meet para o agendamento"""
+        """Enfileira a criação da sala do Google Meet para o agendamento"""
         try:
-            schedule = Schedule.objects.get(id=schedule_id)
+            schedule = Schedule.objects.select_related('employee', 'company').get(id=schedule_id)
             
             # Verificar se já tem sala criada
             if schedule.has_google_meeting:
                 return
             
-            # Criar serviço do Google Meet
-            meet_service = GoogleMeetService()
-            
-            # Preparar dados para a reunião
-            start_datetime = datetime.combine(schedule.date, schedule.start_time)
-            end_datetime = datetime.combine(schedule.date, schedule.end_time)
-            
-            # Criar título e descrição da reunião
-            summary = f"Homologação - {schedule.employee.name} - {schedule.company.name}"
-            description = f"""
-            Homologação de demissão
-            Funcionário: {schedule.employee.name}
-            Empresa: {schedule.company.name}
-            Sindicato: {schedule.union.name}
-            Data: {schedule.date.strftime('%d/%m/%Y')}
-            Horário: {schedule.start_time.strftime('%H:%M')} - {schedule.end_time.strftime('%H:%M')}
-            """
-            
-            # Criar reunião no Google Meet
-            meeting_info = meet_service.create_meeting(
-                summary=summary,
-                description=description,
-                start_time=start_datetime,
-                end_time=end_datetime,
-                attendees=[],  # Será preenchido posteriormente
-                location="Google Meet"
+            # Criada em segundo plano: na agenda do homologador ou, sem homologador, na conta do sistema
+            from app_google.services.calendar_jobs import enfileirar_criacao
+            enfileirar_criacao(
+                schedule,
+                titulo=f"Homologação - {schedule.employee.name} - {schedule.company.name}",
             )
-            
-            if meeting_info:
-                # Atualizar agendamento com informações do Google Meet
-                schedule.google_calendar_event_id = meeting_info['event_id']
-                schedule.google_meet_conference_id = meeting_info.get('conference_id')
-                schedule.google_meet_link = meeting_info['meet_link']
-                schedule.google_calendar_link = meeting_info['html_link']
-                schedule.meeting_created_at = timezone.now()
-                schedule.video_link = meeting_info['meet_link']  # Manter compatibilidade
-                schedule.save()
-                
-                logging.info(f"Sala do Google Meet criada para agendamento {schedule_id}")
-            else:
-                logging.error(f"Falha ao criar sala do Google Meet para agendamento {schedule_id}")
-                
         except Exception as e:
-            logging.error(f"Erro ao criar sala do Google Meet: {str(e)}")
+            logging.error(f"Erro ao enfileirar sala do Google Meet: {str(e)}")
 
     def _update_google_meet_room(self, schedule_id):
-        """Atualiza sala do Google Meet para o agendamento"""
+        """Enfileira a atualização da sala do Google Meet para o agendamento"""
         try:
             schedule = Schedule.objects.get(id=schedule_id)
             
@@ -210,33 +203,11 @@ class ScheduleViewSet(OrgScopedQuerysetMixin, viewsets.ModelViewSet):
             if not schedule.has_google_meeting:
                 return
             
-            # Criar serviço do Google Meet
-            meet_service = GoogleMeetService()
-            
-            # Preparar dados para atualização
-            start_datetime = datetime.combine(schedule.date, schedule.start_time)
-            end_datetime = datetime.combine(schedule.date, schedule.end_time)
-            
-            # Atualizar reunião no Google Meet
-            meeting_info = meet_service.update_meeting(
-                event_id=schedule.google_calendar_event_id,
-                start_time=start_datetime,
-                end_time=end_datetime
-            )
-            
-            if meeting_info:
-                # Atualizar links se necessário
-                if meeting_info.get('meet_link'):
-                    schedule.google_meet_link = meeting_info['meet_link']
-                    schedule.video_link = meeting_info['meet_link']
-                    schedule.save()
-                
-                logging.info(f"Sala do Google Meet atualizada para agendamento {schedule_id}")
-            else:
-                logging.error(f"Falha ao atualizar sala do Google Meet para agendamento {schedule_id}")
-                
+            # Evento atualizado em segundo plano (agenda do homologador ou conta do sistema)
+            from app_google.services.calendar_jobs import enfileirar_remarcacao
+            enfileirar_remarcacao(schedule)
         except Exception as e:
-            logging.error(f"Erro ao atualizar sala do Google Meet: {str(e)}")
+            logging.error(f"Erro ao enfileirar atualização da sala do Google Meet: {str(e)}")
 
     @action(detail=True, methods=['post'])
     def ressalva(self, request, pk=None):
@@ -262,8 +233,8 @@ class ScheduleViewSet(OrgScopedQuerysetMixin, viewsets.ModelViewSet):
     @action(detail=False, methods=['get'], url_path='union/(?P<union_id>[^/.]+)')
     def by_union(self, request, union_id=None):
         # Listar agendamentos das empresas vinculadas ao sindicato
-        queryset = Schedule.objects.filter(union_id=union_id)
-        return Response(ScheduleSerializer(queryset, many=True).data)
+        queryset = self.otimizar_queryset(Schedule.objects.filter(union_id=union_id), self.get_serializer())
+        return Response(self.get_serializer(queryset, many=True).data)
 
     @action(detail=True, methods=['post'], permission_classes=[IsUnionMasterOrSuperAdmin])
     def aprovar_documentos(self, request, pk=None):
@@ -308,6 +279,12 @@ class ScheduleViewSet(OrgScopedQuerysetMixin, viewsets.ModelViewSet):
             # Recarregar dados do agendamento
             schedule.refresh_from_db()
             
+            if schedule.meeting_status == 'pendente':
+                return Response({
+                    'detail': 'Criação da sala do Google Meet em andamento',
+                    'meeting_status': schedule.meeting_status,
+                }, status=status.HTTP_202_ACCEPTED)
+            
             return Response({
                 'detail': 'Sala do Google Meet criada com sucesso',
                 'meet_link': schedule.google_meet_link,
@@ -321,6 +298,49 @@ class ScheduleViewSet(OrgScopedQuerysetMixin, viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @action(detail=False, methods=['get'], url_path='free-busy', permission_classes=[IsUnionMasterOrSuperAdmin])
+    def free_busy(self, request):
+        """
+        Grade livre/ocupado de todos os homologadores do sindicato no período,
+        para a tela de redistribuição da agenda (uma única requisição).
+        """
+        user = request.user
+        union_id = request.query_params.get('union')
+        if user.role not in ['admin', 'superadmin']:
+            union_id = user.union_id
+        date_from_str = request.query_params.get('date_from')
+        date_to_str = request.query_params.get('date_to') or date_from_str
+
+        if not union_id or not date_from_str:
+            return Response({'error': 'Parâmetros obrigatórios: union, date_from'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            union_id = int(union_id)
+            date_from = datetime.strptime(date_from_str, '%Y-%m-%d').date()
+            date_to = datetime.strptime(date_to_str, '%Y-%m-%d').date()
+            resolucao = int(request.query_params.get('resolution', 15))
+        except ValueError:
+            return Response(
+                {'error': 'Formato inválido. union numérico, datas em YYYY-MM-DD e resolution em minutos'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        max_dias = getattr(settings, 'AVAILABILITY_MAX_RANGE_DAYS', 31)
+        if date_to < date_from or (date_to - date_from).days + 1 > max_dias:
+            return Response(
+                {'error': f'Intervalo inválido: date_to deve ser >= date_from e o período de no máximo {max_dias} dias'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not 5 <= resolucao <= 60:
+            return Response({'error': 'resolution deve estar entre 5 e 60 minutos'}, status=status.HTTP_400_BAD_REQUEST)
+
+        matriz = matriz_ocupacao(union_id, date_from, date_to, resolucao)
+        return Response({
+            'union': union_id,
+            'date_from': date_from.isoformat(),
+            'date_to': date_to.isoformat(),
+            **matriz,
+        })
+
     @action(detail=True, methods=['get'], permission_classes=[IsUnionMasterOrSuperAdmin])
     def available_responsibles(self, request, pk=None):
         """Retorna apenas os usuários disponíveis para assumir o agendamento"""
@@ -391,25 +411,16 @@ class ScheduleViewSet(OrgScopedQuerysetMixin, viewsets.ModelViewSet):
                     status=status.HTTP_404_NOT_FOUND
                 )
             
-            # Verificar se o novo usuário tem disponibilidade no horário
-            conflicting_schedule = Schedule.objects.filter(
-                union_user=new_user,
-                date=schedule.date,
-                start_time__lt=schedule.end_time,
-                end_time__gt=schedule.start_time
-            ).exclude(id=schedule.id).first()
-            
-            if conflicting_schedule:
+            # Verificar disponibilidade e alterar o responsável com a agenda do novo usuário travada
+            old_user = schedule.union_user
+            try:
+                alterar_homologador(schedule, new_user)
+            except HorarioIndisponivel:
                 return Response(
                     {'error': 'O usuário já tem um agendamento neste horário'}, 
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            # Alterar o responsável
-            old_user = schedule.union_user
-            schedule.union_user = new_user
-            schedule.save()
-            
             # Log da alteração
             logging.info(f"Responsável do agendamento {schedule.id} alterado de {old_user.username} para {new_user.username}")
             
@@ -417,12 +428,8 @@ class ScheduleViewSet(OrgScopedQuerysetMixin, viewsets.ModelViewSet):
             if EMAIL_SERVICE_AVAILABLE:
                 try:
                     email_service = EmailService()
-                    # Buscar o processo relacionado
-                    processo = DemissaoProcess.objects.filter(
-                        employee__name=schedule.employee.name,
-                        company=schedule.company,
-                        union=schedule.union,
-                    ).order_by('-created_at').first()
+                    # Processo relacionado
+                    processo = schedule.demissao_process
                     
                     email_service.send_agendamento_alterado_email(
                         schedule=schedule,
@@ -669,7 +676,7 @@ class CompanyUnionViewSet(viewsets.ModelViewSet):
         else:
             return CompanyUnion.objects.none()
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(SparseFieldsetQuerysetMixin, viewsets.ModelViewSet):
     queryset = get_user_model().objects.all()
     serializer_class = UserSerializer
     permission_classes = [IsSuperAdminOrCompanyMasterOrUnionMaster]
@@ -758,24 +765,14 @@ class DashboardView(APIView):
     throttle_scope = 'user'
 
     def get(self, request):
-        total_companies = Company.objects.count()
-        total_unions = Union.objects.count()
-        total_schedules = Schedule.objects.count()
-        # Últimos acessos: username, email, last_login
-        users = get_user_model().objects.order_by('-last_login')[:10]
-        last_accesses = [
-            {
-                'id': u.id,
-                'username': u.username,
-                'email': u.email,
-                'last_login': u.last_login
-            } for u in users
-        ]
+        # Valores pré-calculados (services/counters.py): custo independe do volume de dados
+        totais = counters.valores()
         return Response({
-            'total_companies': total_companies,
-            'total_unions': total_unions,
-            'total_schedules': total_schedules,
-            'last_accesses': last_accesses
+            'total_companies': totais['companies'],
+            'total_unions': totais['unions'],
+            'total_schedules': totais['schedules'],
+            # Últimos acessos: username, email, last_login
+            'last_accesses': counters.ultimos_acessos()
         })
 
 class ScheduleConfigViewSet(viewsets.ModelViewSet):
@@ -804,80 +801,83 @@ class ScheduleConfigViewSet(viewsets.ModelViewSet):
         if not union_id or not date_str:
             return Response({'detail': 'union e date são obrigatórios.'}, status=400)
         
-        date_obj = datetime.strptime(date_str, '%Y-%m-%d').date()
-        weekday = date_obj.weekday()  # 0=segunda
+        try:
+            date_obj = datetime.strptime(date_str, '%Y-%m-%d').date()
+        except ValueError:
+            return Response({'detail': 'date deve estar no formato YYYY-MM-DD.'}, status=400)
         
-        # 1. Pega configs dos membros do sindicato para o dia da semana
-        configs = ScheduleConfig.objects.filter(union_user__union_id=union_id, weekday=weekday)
+        # Snapshot do dia em cache ou cálculo em memória com consultas fixas
+        slots = sem_ocupacao_google(availability_cache.slots_livres_dia(union_id, date_obj), date_obj)
+        unique_slots = agrupar_por_horario(slots)
         
-        # 2. Pega agendamentos existentes para esta data
-        existing_schedules = Schedule.objects.filter(
-            union_id=union_id, 
-            date=date_obj
-        )
+        return Response(unique_slots)
+
+    @action(detail=False, methods=['get'], url_path='available-slots-range')
+    def available_slots_range(self, request):
+        """
+        Gera os slots disponíveis de todos os dias de uma janela em uma única passada.
+        Parâmetros: union, date_from, date_to (YYYY-MM-DD)
+        """
+        union_id = request.query_params.get('union')
+        date_from_str = request.query_params.get('date_from')
+        date_to_str = request.query_params.get('date_to')
+        if not union_id or not date_from_str or not date_to_str:
+            return Response({'detail': 'union, date_from e date_to são obrigatórios.'}, status=400)
         
-        # 3. Coletar todos os slots disponíveis por homologador
-        all_slots = []
-        for config in configs:
-            user = config.union_user
-            start_dt = datetime.combine(date_obj, config.start_time)
-            end_dt = datetime.combine(date_obj, config.end_time)
-            current = start_dt
-            
-            # Usar a duração definida na configuração do usuário
-            duration = config.duration_minutes
-            
-            while current + timedelta(minutes=duration) <= end_dt:
-                slot_end = current + timedelta(minutes=duration)
-                
-                # Verifica se já existe agendamento para este usuário neste horário
-                conflicting_schedule = existing_schedules.filter(
-                    union_user=user,
-                    start_time__lt=slot_end.time(),
-                    end_time__gt=current.time()
-                ).first()
-                
-                if not conflicting_schedule:
-                    # Usar first_name + last_name ou username como fallback
-                    user_name = f"{user.first_name} {user.last_name}".strip() if user.first_name or user.last_name else user.username
-                    all_slots.append({
-                        'user_id': user.id,
-                        'user_name': user_name,
-                        'start': current.isoformat(),
-                        'end': slot_end.isoformat(),
-                        'start_time': current.time().strftime('%H:%M'),
-                        'end_time': slot_end.time().strftime('%H:%M'),
-                        'duration_minutes': duration,
-                        'time_key': f"{current.time().strftime('%H:%M')}-{slot_end.time().strftime('%H:%M')}"
-                    })
-                
-                # Avançar pelo intervalo definido na configuração
-                current += timedelta(minutes=duration)
+        try:
+            date_from = datetime.strptime(date_from_str, '%Y-%m-%d').date()
+            date_to = datetime.strptime(date_to_str, '%Y-%m-%d').date()
+        except ValueError:
+            return Response({'detail': 'date_from e date_to devem estar no formato YYYY-MM-DD.'}, status=400)
         
-        # 4. Agrupar slots por horário e selecionar um homologador aleatório para cada horário
-        from collections import defaultdict
-        import random
+        max_dias = getattr(settings, 'AVAILABILITY_MAX_RANGE_DAYS', 31)
+        if date_to < date_from:
+            return Response({'detail': 'date_to deve ser maior ou igual a date_from.'}, status=400)
+        if (date_to - date_from).days + 1 > max_dias:
+            return Response({'detail': f'O intervalo máximo é de {max_dias} dias.'}, status=400)
         
-        slots_by_time = defaultdict(list)
-        for slot in all_slots:
-            slots_by_time[slot['time_key']].append(slot)
+        disponibilidade = disponibilidade_periodo(union_id, date_from, date_to)
         
-        # 5. Para cada horário único, selecionar um homologador aleatório
-        unique_slots = []
-        for time_key, slots_for_time in slots_by_time.items():
-            # Selecionar um homologador aleatório para este horário
-            selected_slot = random.choice(slots_for_time)
-            
-            # Adicionar informação sobre quantas vagas estão disponíveis para este horário
-            selected_slot['available_vacancies'] = len(slots_for_time)
-            selected_slot['total_homologadores'] = len(slots_for_time)
-            
-            unique_slots.append(selected_slot)
+        return Response({
+            'date_from': date_from.isoformat(),
+            'date_to': date_to.isoformat(),
+            'days': {dia.isoformat(): slots for dia, slots in disponibilidade.items()},
+        })
+
+    @action(detail=False, methods=['get'], url_path='next-available-slots')
+    def next_available_slots(self, request):
+        """
+        Retorna os primeiros N horários livres a partir de um instante.
+        Parâmetros: union, after (ISO, padrão: agora), limit (padrão: 5)
+        """
+        union_id = request.query_params.get('union')
+        if not union_id:
+            return Response({'detail': 'union é obrigatório.'}, status=400)
         
-        # 6. Ordenar por horário de início
-        unique_slots.sort(key=lambda x: x['start_time'])
+        after_str = request.query_params.get('after')
+        try:
+            if after_str:
+                after = datetime.fromisoformat(after_str)
+                if timezone.is_aware(after):
+                    after = timezone.localtime(after).replace(tzinfo=None)
+            else:
+                after = timezone.localtime().replace(tzinfo=None)
+            limit = int(request.query_params.get('limit', 5))
+        except ValueError:
+            return Response({'detail': 'after deve ser ISO 8601 e limit um número inteiro.'}, status=400)
         
-        return Response(unique_slots)
+        max_limit = getattr(settings, 'AVAILABILITY_MAX_NEXT_SLOTS', 50)
+        limit = max(1, min(limit, max_limit))
+        horizonte = getattr(settings, 'AVAILABILITY_SEARCH_HORIZON_DAYS', 60)
+        
+        slots = proximos_slots_livres(union_id, after, limit, horizonte)
+        
+        return Response({'after': after.isoformat(), 'limit': limit, 'slots': slots})
+
+    @action(detail=False, methods=['get'], url_path='availability-cache-stats', permission_classes=[IsSuperAdmin])
+    def availability_cache_stats(self, request):
+        """Contadores de acertos/falhas do cache de disponibilidade"""
+        return Response(availability_cache.estatisticas())
 
 class AgendaBlockViewSet(viewsets.ModelViewSet):
     queryset = AgendaBlock.objects.all()
@@ -896,9 +896,19 @@ class AgendaBlockViewSet(viewsets.ModelViewSet):
             qs = qs.filter(user_id=user_id)
         return qs
 
-class DemissaoProcessViewSet(viewsets.ModelViewSet):
+class DemissaoProcessViewSet(FullTextSearchMixin, StreamingExportMixin, SparseFieldsetQuerysetMixin,
+                             viewsets.ModelViewSet):
     queryset = DemissaoProcess.objects.all()
     serializer_class = DemissaoProcessSerializer
+    pagination_class = DemissaoProcessPagination
+    search_sources = [('processos', 'pk'), ('funcionarios', 'employee')]
+    export_filename = 'processos'
+    export_fields = [
+        ('id', 'id'), ('funcionario', 'nome_funcionario'), ('email', 'email_funcionario'),
+        ('telefone', 'telefone_funcionario'), ('motivo', 'motivo'), ('exame', 'exame'), ('status', 'status'),
+        ('empresa', 'empresa__name'), ('sindicato', 'sindicato__name'),
+        ('data_inicio', 'data_inicio'), ('data_termino', 'data_termino'),
+    ]
     # Permitir autenticação geral; o escopo real é aplicado em get_queryset
     permission_classes = [IsAuthenticated]
     throttle_classes = [ScopedRateThrottle]
@@ -925,8 +935,23 @@ class DemissaoProcessViewSet(viewsets.ModelViewSet):
             qs = qs.filter(empresa_id=empresa_id)
         if sindicato_id:
             qs = qs.filter(sindicato_id=sindicato_id)
-        
-        return qs
+
+        # Listagem leve: contagem de documentos por status no lugar dos documentos aninhados
+        if self.action == 'list':
+            qs = qs.annotate(
+                documentos_total=Count('documents'),
+                documentos_pendentes=Count('documents', filter=Q(documents__status='PENDENTE')),
+                documentos_aprovados=Count('documents', filter=Q(documents__status='APROVADO')),
+                documentos_recusados=Count('documents', filter=Q(documents__status='RECUSADO')),
+            )
+
+        # Grafo da resposta carregado com número fixo de consultas
+        return self.otimizar_queryset(qs)
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return DemissaoProcessListSerializer
+        return DemissaoProcessSerializer
 
     def create(self, request, *args, **kwargs):
         """Criar processo de demissão"""
@@ -1091,10 +1116,73 @@ class DemissaoProcessViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @action(detail=True, methods=['post'], url_path='reservar-horario', parser_classes=[JSONParser])
+    def reservar_horario_homologacao(self, request, pk=None):
+        """Reserva temporariamente um horário enquanto o usuário confirma o agendamento"""
+        processo = self.get_object()
+        user_id = request.data.get('user_id')
+        start = request.data.get('start')
+        end = request.data.get('end')
+        date = request.data.get('date')
+
+        if not all([start, end, date]):
+            return Response(
+                {'error': 'Campos obrigatórios: start, end, date'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if processo.status != 'documentos_aprovados':
+            return Response(
+                {'error': 'Processo deve estar com documentos aprovados para agendar'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            start_time = datetime.fromisoformat(start).time()
+            end_time = datetime.fromisoformat(end).time()
+            date_obj = datetime.fromisoformat(date).date()
+        except ValueError:
+            return Response(
+                {'error': 'Formato inválido. Use ISO 8601 (YYYY-MM-DD / YYYY-MM-DDTHH:MM)'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if user_id and not User.objects.filter(id=user_id, union_id=processo.sindicato_id).exists():
+            return Response(
+                {'error': 'Usuário não encontrado ou não pertence ao sindicato do processo'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        try:
+            reserva = reservar_com_atribuicao(
+                processo.sindicato_id, date_obj, start_time, end_time,
+                union_user_id=user_id, criado_por=request.user, processo=processo,
+            )
+        except HorarioIndisponivel as e:
+            return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+
+        return Response({
+            'hold_token': reserva.token,
+            'expires_at': reserva.expires_at,
+            'user_id': reserva.union_user_id,
+            'date': reserva.date,
+            'start_time': reserva.start_time,
+            'end_time': reserva.end_time,
+        }, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['post'], url_path='liberar-reserva', parser_classes=[JSONParser])
+    def liberar_reserva_horario(self, request, pk=None):
+        """Libera uma reserva temporária (usuário desistiu do horário)"""
+        processo = self.get_object()
+        hold_token = request.data.get('hold_token')
+        if not hold_token:
+            return Response({'error': 'hold_token é obrigatório'}, status=status.HTTP_400_BAD_REQUEST)
+        if not liberar_reserva(hold_token, processo=processo):
+            return Response({'error': 'Reserva não encontrada'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
     @action(detail=True, methods=['post'], url_path='agendar')
     def agendar_homologacao(self, request, pk=None):
         """Agendar homologação após aprovação dos documentos"""
         processo = self.get_object()
+        reserva = None
         
         try:
             # user_id agora é opcional - se não fornecido, será selecionado automaticamente
@@ -1103,6 +1191,7 @@ class DemissaoProcessViewSet(viewsets.ModelViewSet):
             end = request.data.get('end')
             date = request.data.get('date')
             video_link = request.data.get('video_link')
+            hold_token = request.data.get('hold_token')  # reserva obtida em reservar-horario
             manual_video_link = request.data.get('manual_video_link')  # usado por sindicato
             if manual_video_link:
                 manual_video_link = manual_video_link.strip()
@@ -1128,204 +1217,195 @@ class DemissaoProcessViewSet(viewsets.ModelViewSet):
             end_time = datetime.fromisoformat(end).time()
             date_obj = datetime.fromisoformat(date).date()
             
-            # Seleção automática de homologador se user_id não foi fornecido
-            if not user_id:
-                weekday = date_obj.weekday()
-                
-                # Buscar configurações dos homologadores do sindicato para este dia
-                available_configs = ScheduleConfig.objects.filter(
-                    union_user__union=processo.sindicato,
-                    weekday=weekday,
-                    start_time__lte=start_time,
-                    end_time__gte=end_time
-                )
-                
-                # Filtrar homologadores que não têm conflito de horário
-                available_homologadores = []
-                for config in available_configs:
-                    # Verificar se já existe agendamento para este usuário neste horário
-                    existing_schedule = Schedule.objects.filter(
-                        union_user=config.union_user,
-                        date=date_obj,
-                        start_time__lt=end_time,
-                        end_time__gt=start_time
-                    ).first()
-                    
-                    if not existing_schedule:
-                        available_homologadores.append(config.union_user)
-                
-                if not available_homologadores:
-                    return Response({'error': 'Nenhum homologador disponível para este horário'}, status=400)
-                
-                # Selecionar homologador aleatório para distribuição equilibrada
-                import random
-                selected_homologador = random.choice(available_homologadores)
-                user_id = selected_homologador.id
+            # Reservar o horário antes de criar a reunião: usa a reserva feita pelo frontend
+            # (hold_token) ou cria uma agora, com seleção automática se user_id não foi fornecido
+            if hold_token:
+                try:
+                    reserva = obter_reserva(hold_token, processo=processo)
+                except ReservaInvalida as e:
+                    return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+                if ((reserva.date, reserva.start_time, reserva.end_time) != (date_obj, start_time, end_time)
+                        or (user_id and str(user_id) != str(reserva.union_user_id))):
+                    return Response(
+                        {'error': 'A reserva não corresponde ao horário informado'},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+            else:
+                try:
+                    reserva = reservar_com_atribuicao(
+                        processo.sindicato_id, date_obj, start_time, end_time,
+                        union_user_id=user_id, criado_por=request.user, processo=processo,
+                    )
+                except HorarioIndisponivel as e:
+                    return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+            user_id = reserva.union_user_id
             
-            # Buscar funcionário do processo
-            employee = Employee.objects.filter(
-                name=processo.nome_funcionario,
-                company=processo.empresa
-            ).first()
+            # Funcionário do processo
+            employee = processo.employee
             
             if not employee:
-                # Criar funcionário se não existir
+                # Criar funcionário e vincular ao processo
                 employee = Employee.objects.create(
                     name=processo.nome_funcionario,
                     company=processo.empresa,
                     union=processo.sindicato,
                     status='ativo'
                 )
+                processo.employee = employee
+                processo.save(update_fields=['employee'])
             
-            # Se o usuário for do sindicato e forneceu link manual, usar esse link imediatamente
-            meet_info = None
-            if manual_video_link and request.user and getattr(request.user, 'role', '').startswith('union_'):
+            # Link manual do sindicato é usado imediatamente; caso contrário a sala do
+            # Google Meet é criada em segundo plano pela fila de jobs do Google Calendar
+            usar_link_manual = bool(
+                manual_video_link and request.user and getattr(request.user, 'role', '').startswith('union_')
+            )
+            if usar_link_manual:
                 video_link = manual_video_link
-            else:
-                # Criar sala real do Google Meet usando o novo serviço por homologador
-                try:
-                    from app_google.services.google_meet_service import criar_meet_para_homologador, verificar_disponibilidade_homologador
-                    from django.utils import timezone as django_timezone
-                    import pytz
-                    
-                    # Buscar o usuário do sindicato que será responsável
-                    union_user = User.objects.get(id=user_id)
-                    
-                    # Converter para datetime com timezone
-                    start_dt = datetime.fromisoformat(f"{date}T{start.split('T')[-1]}") if 'T' in start else datetime.fromisoformat(start)
-                    end_dt = datetime.fromisoformat(f"{date}T{end.split('T')[-1]}") if 'T' in end else datetime.fromisoformat(end)
-                    
-                    # Adicionar timezone se não tiver
-                    if start_dt.tzinfo is None:
-                        tz = pytz.timezone('America/Sao_Paulo')
-                        start_dt = tz.localize(start_dt)
-                        end_dt = tz.localize(end_dt)
-                    
-                    # Verificar disponibilidade do homologador antes de criar o evento
-                    try:
-                        disponivel = verificar_disponibilidade_homologador(
-                            homologador_id=union_user.id,
-                            inicio_local=start_dt,
-                            fim_local=end_dt
-                        )
-                        
-                        if not disponivel:
-                            logging.warning(f"Homologador {union_user.id} não está disponível no horário {start_dt} - {end_dt}")
-                            # Continuar sem Google Meet - será usado link genérico
-                            meet_info = None
-                        else:
-                            logging.info(f"Homologador {union_user.id} está disponível no horário {start_dt} - {end_dt}")
-                            
-                            titulo = f"Homologação – {processo.nome_funcionario} – {processo.empresa.name}"
-                            
-                            # Preparar lista de participantes
-                            attendees = []
-                            if getattr(processo, 'email_funcionario', None):
-                                attendees.append(processo.email_funcionario)
-                            if request.user and request.user.is_authenticated:
-                                attendees.append(request.user.email)
-                            
-                            logging.info(f"Criando reunião para homologador {union_user.id}: {titulo} - {start_dt} até {end_dt}")
-                            
-                            meet_info = criar_meet_para_homologador(
-                                homologador_id=union_user.id,
-                                titulo=titulo,
-                                inicio_local=start_dt,
-                                fim_local=end_dt,
-                                attendees_emails=attendees,
-                            )
-                            
-                            if meet_info:
-                                logging.info(f"Sala do Google Meet criada com sucesso: {meet_info.get('meet_link')}")
-                            else:
-                                logging.warning("Falha ao criar sala do Google Meet - meet_info é None")
-                                
-                    except PermissionError as e:
-                        logging.warning(f"Homologador {union_user.id} sem Google conectado: {str(e)}")
-                        # Continuar sem Google Meet - será usado link genérico
-                        meet_info = None
-                        
-                except Exception as e:
-                    logging.error(f"Falha ao gerar link do Google Meet: {str(e)}")
-                    logging.error(f"Tipo do erro: {type(e).__name__}")
-                    import traceback
-                    logging.error(f"Traceback completo: {traceback.format_exc()}")
-                    meet_info = None
-            
-            # Se não conseguiu criar no Google, mantém fallback público
-            # Normaliza link final (garante protocolo)
-            video_link = video_link or (meet_info.get('meet_link') if meet_info else "https://meet.google.com")
+            
+            # Fallback público até a sala ser criada; normaliza link final (garante protocolo)
+            video_link = video_link or "https://meet.google.com"
             if video_link and not (str(video_link).startswith('http://') or str(video_link).startswith('https://')):
                 video_link = f'https://{str(video_link).lstrip("/")}'
             
             # Buscar o usuário do sindicato que será responsável
             union_user = User.objects.get(id=user_id)
             
-            # Criar agendamento
-            schedule = Schedule.objects.create(
-                employee=employee,
-                company=processo.empresa,
-                union=processo.sindicato,
-                union_user=union_user,  # Vincular o usuário do sindicato
-                date=date_obj,
-                start_time=start_time,
-                end_time=end_time,
-                status='agendado',
-                video_link=video_link
-            )
-            # Persistir metadados do Google se disponíveis
-            if meet_info:
-                schedule.google_calendar_event_id = meet_info.get('event_id')
-                schedule.google_meet_conference_id = meet_info.get('conference_id')
-                schedule.google_meet_link = meet_info.get('meet_link')
-                schedule.google_calendar_link = meet_info.get('html_link')
-                schedule.meeting_created_at = timezone.now()
-                schedule.save(update_fields=[
-                    'google_calendar_event_id', 'google_meet_conference_id',
-                    'google_meet_link', 'google_calendar_link', 'meeting_created_at'
-                ])
-            
-            # Atualizar status do processo
-            # Sempre marcar como agendado quando há agendamento criado
-            processo.status = 'agendado'
-            # Usar o link real do Google Meet se disponível, senão usar o link passado
-            processo.video_link = schedule.google_meet_link if schedule.google_meet_link else video_link
-            processo.save()
-            
-            # Notificações (e-mail e WhatsApp) - não bloqueia o fluxo em caso de falha
+            # Criar agendamento consumindo a reserva, com a agenda do homologador travada
             try:
-                if notify_agendamento:
-                    notify_agendamento(schedule=schedule, processo=processo)
-
-                # Caso não exista meet_info/link real, avisar homologador para criar manualmente
-                if not meet_info or not schedule.video_link or schedule.video_link == 'https://meet.google.com':
-                    try:
-                        from .services.notification_service import notify_homologador_pendente_meet
-                        notify_homologador_pendente_meet(schedule)
-                    except Exception as _n2:
-                        logging.warning(f"Falha ao notificar homologador sobre link pendente: {_n2}")
-            except Exception as _notify_err:
-                logging.error(f"Falha ao enviar notificações do agendamento {schedule.id}: {_notify_err}")
-            
-            # Enviar email para o funcionário sobre o agendamento
-            if EMAIL_SERVICE_AVAILABLE:
-                try:
-                    email_service = EmailService()
-                    email_service.send_agendamento_email(schedule=schedule, processo=processo)
-                except Exception as e:
-                    logging.error(f"Erro ao enviar email de agendamento: {str(e)}")
+                with confirmar_reserva(reserva):
+                    schedule = Schedule.objects.create(
+                        employee=employee,
+                        demissao_process=processo,
+                        company=processo.empresa,
+                        union=processo.sindicato,
+                        union_user=union_user,  # Vincular o usuário do sindicato
+                        date=date_obj,
+                        start_time=start_time,
+                        end_time=end_time,
+                        status='agendado',
+                        video_link=video_link
+                    )
+                    
+                    # Atualizar status do processo, condicional ao status lido antes da trava:
+                    # um agendamento em lote concorrente pode ter agendado o processo
+                    processo.status = 'agendado'
+                    processo.video_link = video_link
+                    if not DemissaoProcess.objects.filter(pk=processo.pk, status='documentos_aprovados').update(
+                            status='agendado', video_link=video_link):
+                        raise ProcessoIndisponivel()
+                    
+                    if not usar_link_manual:
+                        from app_google.services.calendar_jobs import enfileirar_criacao
+                        attendees = [getattr(processo, 'email_funcionario', None)]
+                        if request.user and request.user.is_authenticated:
+                            attendees.append(request.user.email)
+                        enfileirar_criacao(
+                            schedule,
+                            titulo=f"Homologação – {processo.nome_funcionario} – {processo.empresa.name}",
+                            attendees=attendees,
+                            processo=processo,
+                            notificar=True,
+                            verificar_disponibilidade=True,
+                        )
+                    else:
+                        # Notificações gravadas no outbox na mesma transação do agendamento;
+                        # com a sala do Meet pendente, são enfileiradas quando o job concluir
+                        try:
+                            if notify_agendamento:
+                                notify_agendamento(schedule=schedule, processo=processo)
+                        except Exception as _notify_err:
+                            logging.error(f"Falha ao enfileirar notificações do agendamento {schedule.id}: {_notify_err}")
+                        
+                        # Email para o funcionário sobre o agendamento
+                        if EMAIL_SERVICE_AVAILABLE:
+                            try:
+                                email_service = EmailService()
+                                email_service.send_agendamento_email(schedule=schedule, processo=processo)
+                            except Exception as e:
+                                logging.error(f"Erro ao enfileirar email de agendamento: {str(e)}")
+            except ProcessoIndisponivel:
+                return Response(
+                    {'error': 'Processo já foi agendado por outra operação'},
+                    status=status.HTTP_409_CONFLICT
+                )
+            except HorarioIndisponivel:
+                logging.warning(f"Reserva {reserva.id} expirou e o horário foi ocupado antes da confirmação")
+                return Response(
+                    {'error': 'A reserva expirou e o horário foi ocupado. Escolha outro horário.'},
+                    status=status.HTTP_409_CONFLICT
+                )
             
             return Response(
-                {'detail': 'Homologação agendada com sucesso', 'schedule_id': schedule.id, 'video_link': video_link},
+                {'detail': 'Homologação agendada com sucesso', 'schedule_id': schedule.id, 'video_link': video_link,
+                 'meeting_status': schedule.meeting_status},
                 status=status.HTTP_201_CREATED
             )
             
         except Exception as e:
+            # Reserva criada nesta requisição não deve segurar o horário até expirar
+            if reserva and not hold_token:
+                liberar_reserva(reserva.token)
             return Response(
                 {'error': f'Erro ao agendar homologação: {str(e)}'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @action(detail=False, methods=['post'], url_path='agendar-lote', parser_classes=[JSONParser],
+            permission_classes=[IsUnionMasterOrSuperAdmin])
+    def agendar_lote(self, request):
+        """
+        Agenda vários processos de uma vez (demissões em massa) nos primeiros
+        horários livres da janela. Salas do Meet e notificações são geradas em
+        segundo plano; a resposta traz o resultado de cada processo.
+        """
+        process_ids = request.data.get('process_ids')
+        date_from_str = request.data.get('date_from')
+        date_to_str = request.data.get('date_to')
+
+        if not isinstance(process_ids, list) or not process_ids or not date_from_str or not date_to_str:
+            return Response(
+                {'error': 'Campos obrigatórios: process_ids (lista), date_from, date_to'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            process_ids = list(dict.fromkeys(int(pid) for pid in process_ids))
+            date_from = datetime.strptime(date_from_str, '%Y-%m-%d').date()
+            date_to = datetime.strptime(date_to_str, '%Y-%m-%d').date()
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'process_ids deve conter ids numéricos e as datas o formato YYYY-MM-DD'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        max_processos = getattr(settings, 'BULK_SCHEDULING_MAX_PROCESSES', 200)
+        max_dias = getattr(settings, 'AVAILABILITY_MAX_RANGE_DAYS', 31)
+        if len(process_ids) > max_processos:
+            return Response(
+                {'error': f'Máximo de {max_processos} processos por lote'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if date_to < date_from or (date_to - date_from).days + 1 > max_dias:
+            return Response(
+                {'error': f'Intervalo inválido: date_to deve ser >= date_from e o período de no máximo {max_dias} dias'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            resultados = agendar_lote(self.get_queryset(), process_ids, date_from, date_to, solicitante=request.user)
+        except Exception as e:
+            logging.error(f"Erro no agendamento em lote: {str(e)}")
+            return Response(
+                {'error': f'Erro ao agendar homologações em lote: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+        agendados = sum(1 for r in resultados if r['status'] == 'scheduled')
+        return Response({
+            'scheduled': agendados,
+            'failed': len(resultados) - agendados,
+            'results': resultados,
+        }, status=status.HTTP_200_OK)
+
     @action(detail=True, methods=['post'], url_path='set-video-link', parser_classes=[JSONParser])
     def set_video_link(self, request, pk=None):
         """Permite ao usuário do sindicato definir/atualizar manualmente o link da videoconferência.
@@ -1349,11 +1429,7 @@ class DemissaoProcessViewSet(viewsets.ModelViewSet):
             processo.save(update_fields=['video_link', 'status'])
 
             # Atualiza agendamento existente (se houver)
-            schedule = Schedule.objects.filter(
-                employee__name=processo.nome_funcionario,
-                company=processo.empresa,
-                union=processo.sindicato,
-            ).order_by('-date', '-start_time').first()
+            schedule = processo.agendamento_atual()
 
             if schedule:
                 schedule.video_link = video_link
@@ -1382,11 +1458,7 @@ class DemissaoProcessViewSet(viewsets.ModelViewSet):
             logging.info(f"[SYNC] Processo atual - video_link: {processo.video_link}")
             
             # Buscar o agendamento relacionado
-            schedule = Schedule.objects.filter(
-                employee__name=processo.nome_funcionario,
-                company=processo.empresa,
-                union=processo.sindicato,
-            ).order_by('-date', '-start_time').first()
+            schedule = processo.agendamento_atual()
 
             if schedule:
                 logging.info(f"[SYNC] Agendamento encontrado: {schedule.id}")
@@ -1535,13 +1607,7 @@ class DemissaoProcessViewSet(viewsets.ModelViewSet):
                 logging.error(f"Falha ao gerar token público do trabalhador: {_t_err}")
 
             # Atualizar também o agendamento relacionado
-            from .models.schedule import Schedule
-            schedule = Schedule.objects.filter(
-                employee__name=processo.nome_funcionario,
-                company=processo.empresa,
-                union=processo.sindicato,
-                status='agendado'
-            ).first()
+            schedule = processo.schedules.filter(status='agendado').first()
             
             if schedule:
                 schedule.status = 'finalizado'
@@ -1771,98 +1837,52 @@ class DemissaoProcessViewSet(viewsets.ModelViewSet):
                     'video_link': processo.video_link
                 })
             
-            # Gerar novo link do Google Meet usando o novo sistema por homologador
-            try:
-                from app_google.services.google_meet_service import criar_meet_para_homologador
-                from datetime import datetime, timedelta
-                from django.utils import timezone
-                import pytz
-                
-                # Buscar o agendamento relacionado para pegar o homologador
-                schedule = Schedule.objects.filter(
-                    employee__name=processo.nome_funcionario,
-                    company=processo.empresa
-                ).first()
-                
-                if not schedule or not schedule.union_user:
-                    return Response({
-                        'success': False,
-                        'error': 'Processo não possui agendamento com homologador definido'
-                    }, status=400)
-                
-                homologador_id = schedule.union_user.id
-                
-                # Usar data do agendamento se disponível, senão usar data atual
-                if schedule.date and schedule.start_time and schedule.end_time:
-                    # Combinar data e horário do agendamento
-                    start_dt = datetime.combine(schedule.date, schedule.start_time)
-                    end_dt = datetime.combine(schedule.date, schedule.end_time)
-                    
-                    # Adicionar timezone
-                    tz = pytz.timezone('America/Sao_Paulo')
-                    start_dt = tz.localize(start_dt)
-                    end_dt = tz.localize(end_dt)
-                else:
-                    # Fallback para data atual
-                    now = timezone.now()
-                    start_dt = now + timedelta(hours=1)
-                    end_dt = start_dt + timedelta(hours=1)
-                
-                titulo = f"Homologação – {processo.nome_funcionario} – {processo.empresa.name}"
-                
-                # Preparar lista de participantes
-                attendees = []
-                if getattr(processo, 'email_funcionario', None):
-                    attendees.append(processo.email_funcionario)
-                if request.user and request.user.is_authenticated:
-                    attendees.append(request.user.email)
-                
-                meet_info = criar_meet_para_homologador(
-                    homologador_id=homologador_id,
-                    titulo=titulo,
-                    inicio_local=start_dt,
-                    fim_local=end_dt,
-                    attendees_emails=attendees,
-                )
-                
-                if meet_info and meet_info.get('meet_link'):
-                    # Salvar o link no processo e atualizar status
-                    processo.video_link = meet_info.get('meet_link')
-                    processo.status = 'agendado'
-                    processo.save()
-                    
-                    # Atualizar também o agendamento
-                    schedule.video_link = meet_info.get('meet_link')
-                    schedule.google_calendar_event_id = meet_info.get('event_id')
-                    schedule.save()
-                    
-                    return Response({
-                        'success': True,
-                        'message': 'Link do Google Meet gerado com sucesso!',
-                        'video_link': processo.video_link,
-                        'meet_info': meet_info
-                    })
-                else:
-                    return Response({
-                        'success': False,
-                        'error': 'Falha ao gerar link do Google Meet'
-                    }, status=500)
-                    
-            except PermissionError as e:
-                logging.warning(f"Homologador {homologador_id} sem Google conectado: {str(e)}")
+            # Enfileirar a criação do link do Google Meet na agenda do homologador
+            from app_google.services.calendar_jobs import enfileirar_criacao, google_conectado
+            
+            # Buscar o agendamento relacionado para pegar o homologador
+            schedule = processo.agendamento_atual()
+            
+            if not schedule or not schedule.union_user:
+                return Response({
+                    'success': False,
+                    'error': 'Processo não possui agendamento com homologador definido'
+                }, status=400)
+            
+            homologador_id = schedule.union_user.id
+            if not google_conectado(homologador_id):
+                logging.warning(f"Homologador {homologador_id} sem Google conectado")
                 return Response({
                     'success': False,
                     'error': 'Homologador precisa conectar Google para gerar a sala.',
                     'solution': f'Conecte o Google do homologador em: /api/homologadores/{homologador_id}/google/auth-url/'
                 }, status=422)
-            except Exception as e:
-                logging.error(f"Erro ao gerar link do Google Meet: {str(e)}")
-                return Response({
-                    'success': False,
-                    'error': f'Erro ao gerar link: {str(e)}'
-                }, status=500)
+            
+            # Preparar lista de participantes
+            attendees = []
+            if getattr(processo, 'email_funcionario', None):
+                attendees.append(processo.email_funcionario)
+            if request.user and request.user.is_authenticated:
+                attendees.append(request.user.email)
+            
+            # A sala é criada pelo worker; o link e o status 'agendado' são gravados no processo ao concluir
+            job = enfileirar_criacao(
+                schedule,
+                titulo=f"Homologação – {processo.nome_funcionario} – {processo.empresa.name}",
+                attendees=attendees,
+                processo=processo,
+                status_processo='agendado',
+            )
+            
+            return Response({
+                'success': True,
+                'message': 'Geração do link do Google Meet em andamento',
+                'meeting_status': schedule.meeting_status,
+                'job_id': job.id,
+            }, status=status.HTTP_202_ACCEPTED)
             
         except Exception as e:
+            logging.error(f"Erro ao gerar link do Google Meet: {str(e)}")
             return Response({
                 'success': False,
                 'error': f'Erro: {str(e)}'
@@ -1874,15 +1894,12 @@ class DemissaoProcessViewSet(viewsets.ModelViewSet):
         processo = self.get_object()
         
         try:
-            from app_google.services.google_meet_service import remarcar_evento_homologador
+            from app_google.services.calendar_jobs import enfileirar_remarcacao
             from datetime import datetime
             import pytz
             
             # Buscar o agendamento relacionado
-            schedule = Schedule.objects.filter(
-                employee__name=processo.nome_funcionario,
-                company=processo.empresa
-            ).first()
+            schedule = processo.agendamento_atual()
             
             if not schedule or not schedule.union_user or not schedule.google_calendar_event_id:
                 return Response({
@@ -1911,40 +1928,26 @@ class DemissaoProcessViewSet(viewsets.ModelViewSet):
                 novo_start_dt = tz.localize(novo_start_dt)
                 novo_end_dt = tz.localize(novo_end_dt)
             
-            homologador_id = schedule.union_user.id
-            
-            # Remarcar evento no Google Calendar
-            meet_info = remarcar_evento_homologador(
-                homologador_id=homologador_id,
-                event_id=schedule.google_calendar_event_id,
-                novo_inicio_local=novo_start_dt,
-                novo_fim_local=novo_end_dt,
-            )
-            
-            # Atualizar agendamento local
-            schedule.date = novo_start_dt.date()
-            schedule.start_time = novo_start_dt.time()
-            schedule.end_time = novo_end_dt.time()
-            schedule.video_link = meet_info.get('meet_link')
-            schedule.save()
-            
-            # Atualizar processo
-            processo.video_link = meet_info.get('meet_link')
-            processo.save()
+            # Atualizar agendamento local com a agenda do homologador travada;
+            # o evento no Google é atualizado em segundo plano
+            try:
+                with agenda_travada(schedule.union_user_id, novo_start_dt.date(), novo_start_dt.time(),
+                                    novo_end_dt.time(), ignorar_schedule_id=schedule.id):
+                    schedule.date = novo_start_dt.date()
+                    schedule.start_time = novo_start_dt.time()
+                    schedule.end_time = novo_end_dt.time()
+                    schedule.save()
+                    enfileirar_remarcacao(schedule, processo=processo)
+            except HorarioIndisponivel as e:
+                return Response({'success': False, 'error': str(e)}, status=status.HTTP_409_CONFLICT)
             
             return Response({
                 'success': True,
-                'message': 'Evento remarcado com sucesso!',
-                'video_link': meet_info.get('meet_link'),
-                'meet_info': meet_info
-            })
+                'message': 'Remarcação do evento em andamento',
+                'video_link': schedule.video_link,
+                'meeting_status': schedule.meeting_status,
+            }, status=status.HTTP_202_ACCEPTED)
             
-        except PermissionError as e:
-            return Response({
-                'success': False,
-                'error': 'Homologador precisa conectar Google para remarcar o evento.',
-                'solution': f'Conecte o Google do homologador em: /api/homologadores/{homologador_id}/google/auth-url/'
-            }, status=422)
         except Exception as e:
             logging.error(f"Erro ao remarcar evento: {str(e)}")
             return Response({
@@ -1958,13 +1961,10 @@ class DemissaoProcessViewSet(viewsets.ModelViewSet):
         processo = self.get_object()
         
         try:
-            from app_google.services.google_meet_service import cancelar_evento_homologador
+            from app_google.services.calendar_jobs import enfileirar_cancelamento
             
             # Buscar o agendamento relacionado
-            schedule = Schedule.objects.filter(
-                employee__name=processo.nome_funcionario,
-                company=processo.empresa
-            ).first()
+            schedule = processo.agendamento_atual()
             
             if not schedule or not schedule.union_user or not schedule.google_calendar_event_id:
                 return Response({
@@ -1972,35 +1972,25 @@ class DemissaoProcessViewSet(viewsets.ModelViewSet):
                     'error': 'Processo não possui evento do Google Calendar para cancelar'
                 }, status=400)
             
-            homologador_id = schedule.union_user.id
-            
-            # Cancelar evento no Google Calendar
-            cancelar_evento_homologador(
-                homologador_id=homologador_id,
-                event_id=schedule.google_calendar_event_id
-            )
-            
-            # Atualizar status do agendamento
-            schedule.status = 'cancelado'
-            schedule.google_calendar_event_id = None
-            schedule.save()
-            
-            # Atualizar processo
-            processo.status = 'cancelado'
-            processo.video_link = None
-            processo.save()
+            with transaction.atomic():
+                # Remover o evento no Google Calendar em segundo plano
+                enfileirar_cancelamento(schedule, schedule.union_user_id, schedule.google_calendar_event_id)
+                
+                # Atualizar status do agendamento
+                schedule.status = 'cancelado'
+                schedule.google_calendar_event_id = None
+                schedule.save()
+                
+                # Atualizar processo
+                processo.status = 'cancelado'
+                processo.video_link = None
+                processo.save()
             
             return Response({
                 'success': True,
                 'message': 'Evento cancelado com sucesso!'
             })
             
-        except PermissionError as e:
-            return Response({
-                'success': False,
-                'error': 'Homologador precisa conectar Google para cancelar o evento.',
-                'solution': f'Conecte o Google do homologador em: /api/homologadores/{homologador_id}/google/auth-url/'
-            }, status=422)
         except Exception as e:
             logging.error(f"Erro ao cancelar evento: {str(e)}")
             return Response({
@@ -2294,6 +2284,8 @@ class CustomLoginView(APIView):
                 # Login bem-sucedido
                 refresh = RefreshToken.for_user(user)
                 access_token = refresh.access_token
+                # Atualiza last_login (e o buffer de últimos acessos do painel)
+                user_logged_in.send(sender=user.__class__, request=request, user=user)
                 
                 # Log de login bem-sucedido
                 security_logger.info(
@@ -2394,10 +2386,18 @@ class PublicUploadView(APIView):
             return Response({'error': f'Erro no upload: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class SystemLogViewSet(viewsets.ReadOnlyModelViewSet):
+class SystemLogViewSet(FullTextSearchMixin, StreamingExportMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet para logs do sistema - apenas leitura para administradores"""
     queryset = SystemLog.objects.all()
     serializer_class = SystemLogSerializer
+    pagination_class = SystemLogPagination
+    search_sources = [('logs', 'pk')]
+    export_filename = 'logs'
+    export_fields = [
+        ('id', 'id'), ('timestamp', 'timestamp'), ('level', 'level'), ('action', 'action'), ('message', 'message'),
+        ('usuario', 'user__email'), ('ip_address', 'ip_address'), ('empresa', 'company_id'),
+        ('sindicato', 'union_id'), ('agendamento', 'schedule_id'),
+    ]
     permission_classes = [IsAuthenticated, IsSuperAdmin]
     
     def get_queryset(self):
@@ -2428,42 +2428,66 @@ class SystemLogViewSet(viewsets.ReadOnlyModelViewSet):
             queryset = queryset.filter(timestamp__lte=date_to)
             
         return queryset.order_by('-timestamp')
-    
+
+    @staticmethod
+    def _momento(valor, fim=False):
+        """date_from/date_to (data ou data e hora) como datetime com fuso"""
+        if not valor:
+            return None
+        momento = parse_datetime(valor)
+        if momento is None:
+            dia = parse_date(valor)
+            if dia is None:
+                return None
+            momento = datetime.combine(dia, time.max if fim else time.min)
+        return timezone.make_aware(momento) if timezone.is_naive(momento) else momento
+
+    def list(self, request, *args, **kwargs):
+        params = request.query_params
+        inicio = self._momento(params.get('date_from'))
+        # A busca textual (?q=) cobre apenas os logs da tabela, que estão no índice
+        if inicio is None or inicio >= inicio_janela_quente() or self.termo_busca():
+            return super().list(request, *args, **kwargs)
+
+        # Período alcança dias já arquivados: tabela + arquivos, com cursor (timestamp, id) só para frente
+        maximo = getattr(settings, 'SYSTEMLOG_ARCHIVE_SEARCH_LIMIT', 1000)
+        try:
+            limite = max(1, min(int(params.get('page_size', maximo)), maximo))
+        except ValueError:
+            return Response({'error': 'page_size inválido'}, status=status.HTTP_400_BAD_REQUEST)
+        apos = None
+        if params.get('cursor'):
+            apos = self._posicao_arquivo(params['cursor'])
+            if apos is None:
+                return Response({'error': 'Cursor inválido'}, status=status.HTTP_400_BAD_REQUEST)
+        logs = buscar_logs(
+            inicio, self._momento(params.get('date_to'), fim=True), limite, apos,
+            level=params.get('level'), action=params.get('action'), user=params.get('user'),
+            company=params.get('company'), union=params.get('union'),
+        )
+        proxima = None
+        if len(logs) == limite:
+            ultimo = logs[-1]
+            conteudo = json.dumps({'p': [ultimo['timestamp'].isoformat(), ultimo['id']]}, separators=(',', ':'))
+            cursor = base64.urlsafe_b64encode(conteudo.encode()).decode().rstrip('=')
+            proxima = replace_query_param(request.build_absolute_uri(), 'cursor', cursor)
+        return Response({'next': proxima, 'previous': None, 'results': logs, 'archived': True})
+
+    @staticmethod
+    def _posicao_arquivo(cursor):
+        """(timestamp, id) do cursor da busca com arquivos; None se inválido"""
+        try:
+            momento, log_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))['p']
+            momento = parse_datetime(momento)
+            return (momento, int(log_id)) if momento and timezone.is_aware(momento) else None
+        except (ValueError, TypeError, KeyError):
+            return None
+
     @action(detail=False, methods=['get'])
     def stats(self, request):
         """Retorna estatísticas dos logs"""
-        queryset = self.get_queryset()
-        
-        # Contagem por nível
-        level_counts = {}
-        for level, _ in SystemLog.LEVEL_CHOICES:
-            level_counts[level] = queryset.filter(level=level).count()
-        
-        # Contagem por ação (top 10)
-        action_counts = {}
-        for action, _ in SystemLog.ACTION_CHOICES:
-            count = queryset.filter(action=action).count()
-            if count > 0:
-                action_counts[action] = count
-        
-        # Ordenar por contagem
-        top_actions = dict(sorted(action_counts.items(), key=lambda x: x[1], reverse=True)[:10])
-        
-        # Logs por dia (últimos 30 dias)
-        from django.db.models import Count
-        from django.db.models.functions import TruncDate
-        
-        daily_logs = queryset.filter(
-            timestamp__gte=timezone.now() - timedelta(days=30)
-        ).annotate(
-            date=TruncDate('timestamp')
-        ).values('date').annotate(
-            count=Count('id')
-        ).order_by('date')
-        
-        return Response({
-            'total_logs': queryset.count(),
-            'level_counts': level_counts,
-            'top_actions': top_actions,
-            'daily_logs': list(daily_logs)
-        })
+        params = request.query_params
+        # Sem filtros além de nível/ação: rollup pré-agregado (custo independe do volume de logs)
+        if not any(params.get(filtro) for filtro in ['user', 'company', 'union', 'date_from', 'date_to']):
+            return Response(estatisticas_rollup(level=params.get('level'), action=params.get('action')))
+        return Response(estatisticas_consulta(self.get_queryset()))
@@ -72,7 +72,8 @@ export default function DocumentacoesSindicato() {
         return;
       }
       
-      const resp = await fetch(`${API_ENDPOINTS.DEMISSAO_PROCESSES}?sindicato=${tokens.union}`, {
+      // A listagem só traz os documentos de cada processo com expand=documents (cards e modal usam a lista)
+      const resp = await fetch(`${API_ENDPOINTS.DEMISSAO_PROCESSES}?sindicato=${tokens.union}&expand=documents`, {
         headers: {
           'Authorization': `Bearer ${tokens.access}`,
           'Content-Type': 'application/json',
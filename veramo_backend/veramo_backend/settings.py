@@ -54,7 +54,8 @@ ROOT_URLCONF = 'veramo_backend.urls'
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': [BASE_DIR / 'templates'],
+        # Templates do projeto ficam em veramo_backend/templates (BASE_DIR é a raiz do repositório)
+        'DIRS': [BASE_DIR / 'templates', BASE_DIR / 'veramo_backend' / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
@@ -107,6 +108,25 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20
 }
+# Paginação por cursor: validade (s) do total aproximado (?count=1) em cache
+PAGINATION_COUNT_CACHE_SECONDS = int(os.getenv('PAGINATION_COUNT_CACHE_SECONDS', '60'))
+# Busca textual (?q=): 'auto' (FTS5 no SQLite, senão icontains), 'fts5', 'simples' ou caminho de uma classe
+SEARCH_BACKEND = os.getenv('SEARCH_BACKEND', 'auto')
+# Exportação em streaming (.../export/): linhas lidas do banco por lote
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', '2000'))
+# Painel administrativo: quantidade de últimos acessos exibidos
+DASHBOARD_RECENT_ACCESSES = int(os.getenv('DASHBOARD_RECENT_ACCESSES', '10'))
+# Gravação dos logs do sistema em lote por thread de fundo: fila máxima, lote, intervalo (s) e
+# política com a fila cheia ('drop' descarta; 'block' espera SYSTEMLOG_BUFFER_BLOCK_SECONDS e grava na hora)
+# Desligado por padrão (gravação síncrona); ligar em produção com SYSTEMLOG_BUFFER_ENABLED=true
+SYSTEMLOG_BUFFER_ENABLED = os.getenv('SYSTEMLOG_BUFFER_ENABLED', 'false').lower() in ('true', '1', 'yes')
+SYSTEMLOG_BUFFER_MAX_SIZE = int(os.getenv('SYSTEMLOG_BUFFER_MAX_SIZE', '10000'))
+SYSTEMLOG_BUFFER_BATCH_SIZE = int(os.getenv('SYSTEMLOG_BUFFER_BATCH_SIZE', '200'))
+SYSTEMLOG_BUFFER_FLUSH_SECONDS = float(os.getenv('SYSTEMLOG_BUFFER_FLUSH_SECONDS', '1.0'))
+SYSTEMLOG_BUFFER_OVERFLOW = os.getenv('SYSTEMLOG_BUFFER_OVERFLOW', 'drop')
+SYSTEMLOG_BUFFER_BLOCK_SECONDS = float(os.getenv('SYSTEMLOG_BUFFER_BLOCK_SECONDS', '2.0'))
+# Rollup dos logs (comando compactar_logs): logs mais recentes que isto (s) ficam para a próxima compactação
+SYSTEMLOG_ROLLUP_LAG_SECONDS = int(os.getenv('SYSTEMLOG_ROLLUP_LAG_SECONDS', '60'))
 
 # JWT Settings
 from datetime import timedelta
@@ -114,6 +134,7 @@ SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
     'ROTATE_REFRESH_TOKENS': True,
+    'UPDATE_LAST_LOGIN': True,
 }
 
 # Djoser
@@ -162,15 +183,72 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Retenção dos logs (comando arquivar_logs): dias mantidos na tabela; os mais antigos vão para
+# arquivos JSONL compactados em SYSTEMLOG_ARCHIVE_DIR (dados internos, não servir publicamente)
+SYSTEMLOG_RETENTION_DAYS = int(os.getenv('SYSTEMLOG_RETENTION_DAYS', '90'))
+SYSTEMLOG_ARCHIVE_DIR = Path(os.getenv('SYSTEMLOG_ARCHIVE_DIR', str(MEDIA_ROOT / 'arquivo_logs')))
+# Máximo de logs devolvidos por uma consulta que alcança dias arquivados
+SYSTEMLOG_ARCHIVE_SEARCH_LIMIT = int(os.getenv('SYSTEMLOG_ARCHIVE_SEARCH_LIMIT', '1000'))
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Cache: Redis compartilhado entre workers quando REDIS_URL estiver definido
+REDIS_URL = os.getenv('REDIS_URL', '')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': REDIS_URL,
+            'OPTIONS': {'CLIENT_CLASS': 'django_redis.client.DefaultClient'},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Disponibilidade de agenda (homologações)
+# O cache só é seguro entre vários workers com um backend compartilhado (Redis)
+AVAILABILITY_CACHE_ENABLED = os.getenv('AVAILABILITY_CACHE_ENABLED', 'true' if REDIS_URL else 'false').lower() in ('true', '1', 'yes')
+AVAILABILITY_CACHE_TIMEOUT = int(os.getenv('AVAILABILITY_CACHE_TIMEOUT', '300'))
+AVAILABILITY_MAX_RANGE_DAYS = int(os.getenv('AVAILABILITY_MAX_RANGE_DAYS', '31'))
+AVAILABILITY_MAX_NEXT_SLOTS = int(os.getenv('AVAILABILITY_MAX_NEXT_SLOTS', '50'))
+AVAILABILITY_SEARCH_HORIZON_DAYS = int(os.getenv('AVAILABILITY_SEARCH_HORIZON_DAYS', '60'))
+# Política de atribuição automática: menor_carga_dia, menor_carga_semana, rodizio ou aleatorio
+HOMOLOGADOR_ASSIGNMENT_POLICY = os.getenv('HOMOLOGADOR_ASSIGNMENT_POLICY', 'menor_carga_dia')
+# Tempo (s) que uma reserva temporária de horário segura o homologador
+SLOT_HOLD_TTL_SECONDS = int(os.getenv('SLOT_HOLD_TTL_SECONDS', '300'))
+BULK_SCHEDULING_MAX_PROCESSES = int(os.getenv('BULK_SCHEDULING_MAX_PROCESSES', '200'))
+
 # Email settings (configurar conforme necessário)
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+# Outbox de notificações (comando despachar_notificacoes): tentativas, backoff (s) e tempo até liberar envio preso (s)
+NOTIFICATION_MAX_ATTEMPTS = int(os.getenv('NOTIFICATION_MAX_ATTEMPTS', '5'))
+NOTIFICATION_BACKOFF_SECONDS = int(os.getenv('NOTIFICATION_BACKOFF_SECONDS', '60'))
+NOTIFICATION_BACKOFF_MAX_SECONDS = int(os.getenv('NOTIFICATION_BACKOFF_MAX_SECONDS', '3600'))
+NOTIFICATION_LOCK_TIMEOUT_SECONDS = int(os.getenv('NOTIFICATION_LOCK_TIMEOUT_SECONDS', '600'))
+# WhatsApp Cloud API: mensagens/s do número remetente, envios paralelos e timeout (s)
+WHATSAPP_API_URL = os.getenv('WHATSAPP_API_URL', 'https://graph.facebook.com/v17.0')
+WHATSAPP_RATE_PER_SECOND = float(os.getenv('WHATSAPP_RATE_PER_SECOND', '20'))
+WHATSAPP_MAX_WORKERS = int(os.getenv('WHATSAPP_MAX_WORKERS', '8'))
+WHATSAPP_TIMEOUT = int(os.getenv('WHATSAPP_TIMEOUT', '10'))
 
 # Google OAuth settings
 GOOGLE_CLIENT_ID = os.getenv('GOOGLE_CLIENT_ID', '')
 GOOGLE_CLIENT_SECRET = os.getenv('GOOGLE_CLIENT_SECRET', '')
+# Validade (s) do free/busy dos homologadores consultado no Google Calendar
+GOOGLE_FREEBUSY_CACHE_TIMEOUT = int(os.getenv('GOOGLE_FREEBUSY_CACHE_TIMEOUT', '120'))
+# Clientes da API do Calendar mantidos por worker (LRU) e timeout das chamadas (s)
+GOOGLE_CLIENT_POOL_SIZE = int(os.getenv('GOOGLE_CLIENT_POOL_SIZE', '64'))
+GOOGLE_API_TIMEOUT = int(os.getenv('GOOGLE_API_TIMEOUT', '30'))
+# Fila de jobs do Google Calendar: tentativas, backoff exponencial (s) e tempo até liberar job preso (s)
+GOOGLE_JOB_MAX_ATTEMPTS = int(os.getenv('GOOGLE_JOB_MAX_ATTEMPTS', '6'))
+GOOGLE_JOB_BACKOFF_SECONDS = int(os.getenv('GOOGLE_JOB_BACKOFF_SECONDS', '30'))
+GOOGLE_JOB_BACKOFF_MAX_SECONDS = int(os.getenv('GOOGLE_JOB_BACKOFF_MAX_SECONDS', '3600'))
+GOOGLE_JOB_LOCK_TIMEOUT_SECONDS = int(os.getenv('GOOGLE_JOB_LOCK_TIMEOUT_SECONDS', '600'))
 
 # Security settings para produção
 if not DEBUG: